@@ -1,13 +1,8 @@
 import argparse
-import glob
 import subprocess
 import sys
 from pathlib import Path
 from typing import List
-import hydra
-from hydra import initialize, compose
-import hydra.utils
-from omegaconf import OmegaConf
 
 
 def collect_sources(path: Path, pattern: str, recursive: bool) -> List[Path]:
@@ -43,6 +38,10 @@ def main() -> None:
         # load/compose config. support two cases:
         # 1) user passed a config name present under ../configs -> use hydra.compose
         # 2) user passed an arbitrary file path -> load with OmegaConf
+        # Hydra/OmegaConf are only needed here; --source runs skip the import entirely
+        from hydra import compose, initialize
+        from omegaconf import OmegaConf
+
         configs_dir = Path(__file__).parents[1] / "configs"
         cfg = None
         cfg_arg_path = Path(args.config_name)
@@ -0,0 +1,101 @@
+"""Per-call predict latency: sklearn estimators vs their compiled NumPy counterparts.
+
+Fits ``make_model(kind)`` on features.parquet (or, with ``--synthetic``, on random
+features of the same width as the ReVeRs preset), compiles it with
+traffic.classify.compiled and times ``predict`` for each batch size. Prediction
+agreement with sklearn is reported alongside the timings.
+
+    python scripts/bench_inference.py --features data/processed/<scene>/features.parquet
+    python scripts/bench_inference.py --synthetic --kinds mlp knn --batches 1 16 256 1024
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.classify.compiled import compile_model, load_compiled, save_compiled
+from traffic.classify.models import make_model
+
+
+def load_xy(args) -> tuple[np.ndarray, np.ndarray]:
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        centers = rng.normal(0, 1, size=(8, 24))
+        y = rng.integers(0, 8, args.n_train)
+        X = centers[y] + rng.normal(0, 0.6, size=(args.n_train, 24))
+        return X.astype(np.float32), y
+    from traffic.io.serialization import read_parquet
+
+    path = Path(args.features)
+    Xdf = read_parquet(path)
+    ydf = read_parquet(path.with_name("exit_groups.parquet"))
+    ymap = dict(zip(ydf["track_id"], ydf["exit_group"]))
+    y = np.array([ymap.get(t, -1) for t in Xdf["track_id"]], dtype=int)
+    return Xdf.drop(columns=["track_id"]).to_numpy(np.float32), y
+
+
+def per_call_us(fn, X: np.ndarray, min_time: float = 0.2, max_calls: int = 2000) -> float:
+    """Median wall time of one ``fn(X)`` call in microseconds."""
+    fn(X)  # warm-up
+    times = []
+    t_end = time.perf_counter() + min_time
+    while len(times) < max_calls and (len(times) < 5 or time.perf_counter() < t_end):
+        t0 = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1e6
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--features", help="features.parquet (labels from exit_groups.parquet)")
+    p.add_argument("--synthetic", action="store_true", help="random 24-d features instead")
+    p.add_argument("--n-train", type=int, default=5000)
+    p.add_argument("--kinds", nargs="+", default=["mlp", "knn"])
+    p.add_argument("--batches", nargs="+", type=int, default=[1, 4, 16, 64, 256, 1024])
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out", default="data/bench", help="output directory")
+    args = p.parse_args()
+    if not args.synthetic and not args.features:
+        p.error("pass --features or --synthetic")
+
+    X, y = load_xy(args)
+    rng = np.random.default_rng(args.seed)
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    records = []
+    for kind in args.kinds:
+        clf = make_model(kind).fit(X, y)
+        path = out_dir / f"compiled_{kind}.npz"
+        save_compiled(compile_model(clf), path)
+        t0 = time.perf_counter()
+        compiled = load_compiled(path)
+        load_ms = (time.perf_counter() - t0) * 1e3
+        print(f"{kind}: {path.stat().st_size / 1024:.0f} KiB, load {load_ms:.1f} ms")
+        for b in args.batches:
+            Xb = X[rng.integers(0, len(X), b)]
+            sk = per_call_us(clf.predict, Xb)
+            np_ = per_call_us(compiled.predict, Xb)
+            records.append(
+                dict(
+                    kind=kind,
+                    batch=b,
+                    sklearn_us=sk,
+                    compiled_us=np_,
+                    speedup=sk / np_,
+                    agreement=float((clf.predict(Xb) == compiled.predict(Xb)).mean()),
+                    load_ms=load_ms,
+                )
+            )
+
+    df = pd.DataFrame(records)
+    df.to_csv(out_dir / "inference_latency.csv", index=False)
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    print(f"\nWrote {len(df)} rows -> {out_dir / 'inference_latency.csv'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Size and read time of tracks.parquet: plain int64/float64 layout vs the compact layouts.
+
+    python scripts/bench_tracks_io.py --detections 1e6
+    python scripts/bench_tracks_io.py --input data/interim/<scene>/tracks.parquet
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.io.tracks_store import load_tracks, read_tracks, write_tracks
+
+PLAIN_DTYPES = dict(
+    frame="int64", track_id="int64", cls="int64", conf="float64", cx="float64", cy="float64"
+)
+
+
+def best_of(fn, repeats: int = 3) -> float:
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--input", help="existing tracks.parquet (either layout)")
+    p.add_argument("--detections", type=float, default=1e6, help="synthetic size otherwise")
+    p.add_argument("--normalized", action="store_true", help="synthetic coords in [0, 1]")
+    args = p.parse_args()
+
+    if args.input:
+        df = read_tracks(args.input)
+    else:
+        from traffic.synth.intersection import IntersectionSpec, generate_detections
+
+        spec = IntersectionSpec(normalized=args.normalized)
+        df, _ = generate_detections(int(args.detections), spec, seed=0)
+    df = df.astype({**PLAIN_DTYPES, "w": "float64", "h": "float64"})
+    ref = df.sort_values(["track_id", "frame"]).reset_index(drop=True)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {k: Path(tmp) / f"{k}.parquet" for k in ("plain", "float32", "fixed")}
+        df.to_parquet(paths["plain"], index=False)
+        write_tracks(df, paths["float32"])
+        write_tracks(df, paths["fixed"], coords="fixed")
+        for name, path in paths.items():
+            back = read_tracks(path)
+            if name != "plain":
+                back = back.reset_index(drop=True)
+                err = max(float(np.abs(back[c] - ref[c]).max()) for c in ("cx", "cy", "w", "h"))
+            else:
+                err = 0.0
+            rows.append(
+                dict(
+                    layout=name,
+                    size_mb=path.stat().st_size / 1e6,
+                    read_tracks_s=best_of(lambda: read_tracks(path)),
+                    load_tracks_s=best_of(lambda: load_tracks(path)),
+                    dataframe_mb=back.memory_usage(index=False).sum() / 1e6,
+                    max_coord_err=err,
+                )
+            )
+    out = pd.DataFrame(rows)
+    print(f"{len(df):,} detections, {df['track_id'].nunique():,} tracks")
+    print(out.to_string(index=False, float_format=lambda v: f"{v:.3g}"))
+
+
+if __name__ == "__main__":
+    main()
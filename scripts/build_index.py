@@ -0,0 +1,46 @@
+"""Build the trajectory similarity index for a scene.
+
+    python scripts/build_index.py dataset=bellevue_116th_ne12th
+    python scripts/build_index.py dataset=bellevue_116th_ne12th +similar_to=123 +k=10
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from traffic.features.knn_index import TrajectoryIndex
+from traffic.io.dataset_loader import get_paths
+from traffic.io.serialization import read_parquet
+from traffic.io.sources import fingerprint
+from traffic.trajectories.flat import flatten_tracks
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("build_index", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.features.get("embed", {})
+    src = processed / "trajectories.parquet"
+    with stage("load"):
+        trajs = read_parquet(src, columns=["track_id", "frame", "x", "y"])
+        flat = flatten_tracks(trajs, ("frame", "x", "y"))
+    with stage("index", items=len(flat)):
+        index = TrajectoryIndex.from_tracks(
+            flat,
+            n_points=int(opts.get("n_points", 16)),
+            n_components=opts.get("n_components", 12),
+        )
+    index.source = fingerprint(src)
+    out = processed / "trajectory_index.pkl"
+    index.save(out)
+    metrics.count("tracks", len(index))
+    metrics.write(processed)
+    print(f"Indexed {len(index)} trajectories -> {out}")
+
+    track_id = cfg.get("similar_to", None)
+    if track_id is not None:
+        print(index.similar(track_id, k=int(cfg.get("k", 10))).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Build or incrementally update the turning-movement cube of a scene.
+
+Joins trajectories.parquet (and any partitions under processed/trajectories/) to the
+labels written by run_cluster.py and merges per-track counts, speeds and travel times into
+processed/movement_cube.npz; partitions already in the cube are skipped. The cube table
+(one row per movement and time bin) goes to processed/movements.parquet.
+
+Settings come from ``dataset.movements``: ``by`` (label columns, default ``[cluster]``),
+``bin_s`` (default 900), ``alpha`` (quantile relative error, default 0.01) and
+``quantiles`` (default ``[50, 85]``).
+
+    python scripts/build_movements.py dataset=bellevue_116th_ne12th
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from traffic.cluster.movements import update_movement_cube
+from traffic.io.dataset_loader import get_paths
+from traffic.io.serialization import write_parquet
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("build_movements", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.dataset.get("movements", {}) or {}
+    with stage("aggregate"):
+        cube = update_movement_cube(
+            processed,
+            by=tuple(opts.get("by", ("cluster",))),
+            bin_s=float(opts.get("bin_s", 900)),
+            fps=float(cfg.dataset.fps),
+            alpha=float(opts.get("alpha", 0.01)),
+        )
+    with stage("table", items=len(cube)):
+        table = cube.to_frame(tuple(opts.get("quantiles", (50, 85))))
+    out = processed / "movements.parquet"
+    write_parquet(table, out)
+    metrics.count("cells", len(cube))
+    metrics.count("tracks", int(cube.stats["count"].sum()))
+    metrics.count("unlabeled_tracks", len(cube.unlabeled))
+    metrics.write(processed)
+    print(
+        f"{len(cube.ingested)} partition(s), {int(cube.stats['count'].sum())} tracks in "
+        f"{len(cube)} (movement, bin) cells -> {out}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""Build or incrementally update the density rasters of a scene.
+
+Bins trajectories.parquet (and any partitions under processed/trajectories/) into
+processed/rasters.npz: point, entry/exit and velocity rasters overall and per cluster.
+Partitions already in the cache are skipped; the cache is rebuilt when clusters.parquet
+changes. Grid settings come from ``dataset.raster`` (``shape``, optional ``bounds``).
+
+    python scripts/build_rasters.py dataset=bellevue_116th_ne12th
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from traffic.io.dataset_loader import get_paths
+from traffic.utils.metrics import stage, start_run
+from traffic.viz.raster import update_scene_rasters
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("build_rasters", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.dataset.get("raster", {}) or {}
+    bounds = opts.get("bounds", None)
+    with stage("rasterize"):
+        rasters = update_scene_rasters(
+            processed,
+            shape=tuple(opts.get("shape", (256, 256))),
+            bounds=tuple(bounds) if bounds is not None else None,
+        )
+    metrics.gauge("raster_points", int(rasters.layers["points"].sum()))
+    metrics.write(processed)
+    print(
+        f"{len(rasters.ingested)} partition(s), {len(rasters.clusters())} cluster layer(s), "
+        f"{rasters.n_out_of_bounds} samples outside {rasters.bounds} -> {processed / 'rasters.npz'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
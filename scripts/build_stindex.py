@@ -0,0 +1,57 @@
+"""Build or incrementally update the spatio-temporal segment index of a scene, and query it.
+
+Indexes trajectories.parquet and any partitions under processed/trajectories/ into
+processed/stindex/ (see traffic.trajectories.stindex). Sources already indexed are skipped.
+The grid comes from ``dataset.stindex.shape`` (default 64x64 per source).
+
+    python scripts/build_stindex.py dataset=bellevue_116th_ne12th
+    python scripts/build_stindex.py dataset=bellevue_116th_ne12th \\
+        '+polygon=[[410,300],[520,300],[520,340],[410,340]]' '+seconds=[3600,7200]'
+
+``+frames=[a,b]`` gives the window in frames instead; ``+seconds`` uses ``dataset.fps``.
+Matching slices are written to processed/stindex_query.parquet.
+"""
+
+import hydra
+from omegaconf import DictConfig
+
+from traffic.io.dataset_loader import get_paths
+from traffic.io.serialization import write_parquet
+from traffic.trajectories.stindex import update_segment_index
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("build_stindex", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.dataset.get("stindex", {}) or {}
+    with stage("index"):
+        index = update_segment_index(processed, shape=tuple(opts.get("shape", (64, 64))))
+    metrics.count("segments", len(index))
+    print(f"{len(index.shards)} source(s), {len(index)} segments -> {index.root}")
+
+    polygon = cfg.get("polygon", None)
+    if polygon is not None:
+        frames = cfg.get("frames", None)
+        if cfg.get("seconds", None) is not None:
+            fps = float(cfg.dataset.fps)
+            frames = [int(s * fps) for s in cfg.seconds]
+        with stage("query"):
+            hits = index.query(
+                [list(p) for p in polygon], tuple(frames) if frames is not None else None
+            )
+        for k, v in index.last_scan.items():
+            metrics.gauge(f"query_{k}", v)
+        out = processed / "stindex_query.parquet"
+        write_parquet(hits, out)
+        print(
+            f"{hits['track_id'].nunique()} track(s), {len(hits)} slice(s) "
+            f"(read {index.last_scan['records']} records in {index.last_scan['cells']} cells) "
+            f"-> {out}"
+        )
+    metrics.write(processed)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,38 @@
 import hydra
-import pandas as pd
 from omegaconf import DictConfig
 
 from traffic.io.dataset_loader import get_paths
-from traffic.io.serialization import read_parquet, write_parquet
-from traffic.trajectories.build import build_trajectories
+from traffic.io.serialization import write_parquet
+from traffic.io.tracks_store import read_tracks, tracks_source
+from traffic.trajectories.build import build_trajectories, trajectories_to_frame
+from traffic.utils.metrics import stage, start_run
 
 
 @hydra.main(config_path="../configs", config_name="defaults", version_base=None)
 def main(cfg: DictConfig):
+    metrics = start_run("build_trajectories", cfg)
     _, interim, processed = get_paths(cfg.dataset)
-    df = read_parquet(interim / "tracks.parquet")
+    stitch = bool(cfg.get("stitch", {}).get("enabled", False))
+    src = tracks_source(interim, stitch)
+    if stitch and src.name == "tracks.parquet":
+        print(f"No tracks_stitched.parquet in {interim}, using {src.name}")
+    with stage("load"):
+        df = read_tracks(src)
     fps = cfg.dataset.fps
-    trajs = build_trajectories(df, fps=fps)
+    with stage("build", items=len(df)):
+        trajs = build_trajectories(df, fps=fps)
     # flatten to long table
-    rows = []
-    for t in trajs:
-        for f, x, y, vx, vy, ax, ay in zip(
-            t["frame"], t["x"], t["y"], t["vx"], t["vy"], t["ax"], t["ay"]
-        ):
-            rows.append(
-                dict(
-                    track_id=t["track_id"],
-                    frame=int(f),
-                    x=float(x),
-                    y=float(y),
-                    vx=float(vx),
-                    vy=float(vy),
-                    ax=float(ax),
-                    ay=float(ay),
-                )
-            )
+    with stage("flatten") as st:
+        out_df = trajectories_to_frame(trajs)
+        st.items = len(out_df)
     out = processed / "trajectories.parquet"
-    write_parquet(pd.DataFrame(rows), out)
+    with stage("write"):
+        write_parquet(out_df, out)
+    metrics.count("tracks", len(trajs))
+    metrics.count("points", len(out_df))
+    metrics.write(processed)
     print(f"Wrote trajectories -> {out}")
+    print(metrics.summary())
 
 
 if __name__ == "__main__":
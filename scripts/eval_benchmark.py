@@ -1 +1,189 @@
-print("TODO: implement RAM/CPU benchmarking and dominance tables here.")
+"""Scaling benchmark of the offline pipeline on synthetic intersections.
+
+Generates ``tracks.parquet``-compatible detections with traffic.synth.intersection and runs
+build_trajectories -> gen_features -> optics_cluster -> consolidate_by_exit ->
+crossval_scores at increasing detection counts. Every size runs in a fresh process so
+peak RSS is attributable to that size. Results are appended to ``<out>/scaling.jsonl``
+(tagged with the git revision, so curves from different commits can be compared) and the
+current run is written to ``<out>/scaling.csv``.
+
+    python scripts/eval_benchmark.py
+    python scripts/eval_benchmark.py --sizes 1e3 1e4 1e5 --stages build_trajectories gen_features
+"""
+
+import argparse
+import json
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+STAGES = [
+    "build_trajectories",
+    "gen_features",
+    "optics_cluster",
+    "consolidate_by_exit",
+    "crossval_scores",
+]
+
+
+def run_size(
+    n_detections: int,
+    stages: list[str],
+    seed: int = 42,
+    clf: str = "mlp",
+    preset: str = "ReVeRs",
+    trace_memory: bool = False,
+) -> list[dict]:
+    """Run the selected stages once at one size and return one record per stage."""
+    from traffic.classify.evaluate import crossval_scores
+    from traffic.classify.models import make_model
+    from traffic.cluster.consolidate import consolidate_by_exit
+    from traffic.cluster.optics import optics_cluster
+    from traffic.features.vector_specs import FVS
+    from traffic.features.vectorize import featurize
+    from traffic.synth.intersection import IntersectionSpec, generate_detections
+    from traffic.trajectories.build import build_trajectories, trajectories_to_frame
+    from traffic.utils.metrics import metrics, stage
+
+    # pay the deferred sklearn/scipy imports up front instead of in the first timed stage
+    for mod in ("scipy.signal", "sklearn.cluster", "sklearn.model_selection", "sklearn.metrics"):
+        __import__(mod)
+    metrics.reset("eval_benchmark", labels={"size": n_detections}, trace_memory=trace_memory)
+    spec = IntersectionSpec(normalized=True)
+    with stage("synth"):
+        df, _ = generate_detections(n_detections, spec, seed=seed)
+
+    # upstream products are always computed; only the selected stages are reported
+    with stage("build_trajectories", items=len(df)):
+        trajs = trajectories_to_frame(build_trajectories(df, fps=spec.fps))
+    g = trajs.sort_values("frame").groupby("track_id")
+    entry = g.first()[["x", "y"]].to_numpy()
+    exit_ = g.last()[["x", "y"]].to_numpy()
+    if "gen_features" in stages or "crossval_scores" in stages:
+        with stage("gen_features", items=len(trajs)):
+            X = featurize(trajs, FVS[preset]).drop(columns=["track_id"]).to_numpy(np.float32)
+    if "optics_cluster" in stages:
+        with stage("optics_cluster", items=len(entry)):
+            # clamp to tiny inputs so the smallest sizes still exercise every stage
+            min_samples = int(np.clip(len(entry) // 10, 2, 40))
+            optics_cluster(np.hstack([entry, exit_]), min_samples=min_samples, xi=0.06, max_eps=0.1)
+    if "consolidate_by_exit" in stages or "crossval_scores" in stages:
+        with stage("consolidate_by_exit", items=len(exit_)):
+            y, _ = consolidate_by_exit(exit_, k=min(8, len(exit_)))
+    folds = min(5, int(np.bincount(y).min())) if "crossval_scores" in stages else 0
+    if folds >= 2:
+        with stage("crossval_scores", items=len(X)):
+            crossval_scores(make_model(clf), X, y, k=folds, repeats=1, seed=seed)
+
+    snap = metrics.snapshot()
+    records = []
+    for name in stages:
+        st = snap["stages"].get(name)
+        if st is None:
+            continue
+        records.append(
+            dict(
+                size=n_detections,
+                n_detections=len(df),
+                n_tracks=len(entry),
+                stage=name,
+                wall_s=st["wall_s"],
+                cpu_s=st["cpu_s"],
+                items_per_s=st["items_per_s"],
+                peak_rss_mb=st["peak_rss_mb"],
+                py_peak_mb=st["py_peak_mb"],
+            )
+        )
+    return records
+
+
+def git_rev() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=Path(__file__).parent,
+        )
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def scaling_exponents(df: pd.DataFrame) -> pd.Series:
+    """Least-squares slope of log(wall_s) vs log(n_detections) per stage."""
+    out = {}
+    for name, g in df.groupby("stage"):
+        g = g[g["wall_s"] > 0]
+        if len(g) >= 2:
+            out[name] = np.polyfit(np.log(g["n_detections"]), np.log(g["wall_s"]), 1)[0]
+    return pd.Series(out, name="exponent")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--sizes", nargs="+", default=["1e3", "1e4", "1e5", "1e6", "1e7"])
+    p.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    p.add_argument("--clf", default="mlp", help="make_model kind used for crossval_scores")
+    p.add_argument("--preset", default="ReVeRs", help="FVS preset used for gen_features")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--trace-memory", action="store_true", help="per-stage tracemalloc peaks")
+    p.add_argument(
+        "--max-stage-seconds",
+        type=float,
+        default=600.0,
+        help="drop a stage from larger sizes once it exceeds this wall time",
+    )
+    p.add_argument("--out", default="data/bench", help="output directory")
+    args = p.parse_args()
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rev = git_rev()
+    stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+    stages = list(args.stages)
+    records: list[dict] = []
+    for size in sorted(int(float(s)) for s in args.sizes):
+        if not stages:
+            break
+        print(f"size={size:,}: {', '.join(stages)}")
+        # fresh interpreter per size so peak RSS is not inherited from smaller runs
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as ex:
+            recs = ex.submit(
+                run_size, size, stages, args.seed, args.clf, args.preset, args.trace_memory
+            ).result()
+        for r in recs:
+            r.update(rev=rev, timestamp=stamp)
+            print(
+                f"  {r['stage']:<20} {r['wall_s']:9.3f}s  "
+                f"peak RSS {r['peak_rss_mb'] or float('nan'):8.0f} MiB"
+            )
+            if r["wall_s"] > args.max_stage_seconds and r["stage"] in stages:
+                print(
+                    f"  -> {r['stage']} exceeded {args.max_stage_seconds:.0f}s, skipped from here"
+                )
+                stages.remove(r["stage"])
+        records.extend(recs)
+
+    with open(out_dir / "scaling.jsonl", "a", encoding="utf-8") as fh:
+        for r in records:
+            fh.write(json.dumps(r) + "\n")
+    df = pd.DataFrame(records)
+    df.to_csv(out_dir / "scaling.csv", index=False)
+    if len(df):
+        print("\nWall time (s):")
+        print(df.pivot(index="n_detections", columns="stage", values="wall_s").to_string())
+        print("\nPeak RSS (MiB):")
+        print(df.pivot(index="n_detections", columns="stage", values="peak_rss_mb").to_string())
+        print("\nScaling exponent (t ~ n^k):")
+        print(scaling_exponents(df).to_string())
+    print(f"\nWrote {len(df)} records -> {out_dir / 'scaling.csv'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,45 @@ which often represent unusual or anomalous traffic patterns.
 """
 
 import hydra
-import matplotlib.pyplot as plt
 from omegaconf import DictConfig
 
+from traffic.features.knn_index import TrajectoryIndex
 from traffic.io.dataset_loader import get_paths
 from traffic.io.serialization import read_parquet, write_parquet
+from traffic.io.sources import fingerprint
+from traffic.trajectories.flat import flatten_tracks
+from traffic.viz.raster import DensityRasters, update_scene_rasters
+
+
+def load_index(cfg: DictConfig, processed, trajs) -> TrajectoryIndex:
+    """Load trajectory_index.pkl (scripts/build_index.py), or build it in memory.
+
+    The saved index is only used while it was built from the current trajectories.parquet;
+    otherwise its track ids and neighbours are stale and the index is rebuilt.
+    """
+    path = processed / "trajectory_index.pkl"
+    if path.exists():
+        index = TrajectoryIndex.load(path)
+        if index.source == fingerprint(processed / "trajectories.parquet"):
+            return index
+        print(f"{path.name} is older than trajectories.parquet; rebuilding it in memory")
+    opts = cfg.features.get("embed", {})
+    return TrajectoryIndex.from_tracks(
+        flatten_tracks(trajs, ("frame", "x", "y")),
+        n_points=int(opts.get("n_points", 16)),
+        n_components=opts.get("n_components", 12),
+    )
+
+
+def load_rasters(cfg: DictConfig, processed) -> DensityRasters:
+    """Scene density rasters from the rasters.npz cache (see scripts/build_rasters.py)."""
+    opts = cfg.dataset.get("raster", {}) or {}
+    bounds = opts.get("bounds", None)
+    return update_scene_rasters(
+        processed,
+        shape=tuple(opts.get("shape", (256, 256))),
+        bounds=tuple(bounds) if bounds is not None else None,
+    )
 
 
 @hydra.main(config_path="../configs", config_name="defaults", version_base=None)
@@ -32,6 +66,15 @@ def main(cfg: DictConfig):
     print(f"Clustered: {n_clustered} ({100.0*n_clustered/n_total:.1f}%)")
     print(f"Outliers: {n_outliers} ({100.0*n_outliers/n_total:.1f}%)")
 
+    index = None
+    similar_to = cfg.get("similar_to", None)
+    if similar_to is not None:
+        index = load_index(cfg, processed, trajs)
+        sim = index.similar(similar_to, k=int(cfg.get("k", 10)))
+        sim = sim.merge(clusters, on="track_id", how="left")
+        print(f"\nTrajectories most similar to track {similar_to}:")
+        print(sim.to_string(index=False))
+
     if n_outliers == 0:
         print("\nNo outliers found!")
         return
@@ -52,9 +95,9 @@ def main(cfg: DictConfig):
 
     # Top outliers
     print("\nTop 10 Most Anomalous Tracks (highest reachability):")
+    durations = trajs["track_id"].value_counts()
     for idx, row in outliers.head(10).iterrows():
-        track_traj = trajs[trajs["track_id"] == row["track_id"]]
-        duration = len(track_traj)
+        duration = int(durations.get(row["track_id"], 0))
         print(
             f"  Track {row['track_id']:4d}: reach={row['reachability']:6.3f}, "
             f"duration={duration:3d} frames, "
@@ -62,64 +105,51 @@ def main(cfg: DictConfig):
             f"exit=({row['x_exit']:.3f},{row['y_exit']:.3f})"
         )
 
-    # Create visualizations
-    fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-
-    # 1. Entry points colored by reachability
-    ax = axes[0, 0]
-    scatter = ax.scatter(
-        outliers["x_entry"],
-        outliers["y_entry"],
-        c=outliers["reachability"],
-        cmap="hot",
-        alpha=0.6,
-        s=50,
-    )
-    ax.set_xlabel("Entry X")
-    ax.set_ylabel("Entry Y")
-    ax.set_title("Outlier Entry Points (colored by reachability)")
-    plt.colorbar(scatter, ax=ax, label="Reachability")
-    ax.grid(True, alpha=0.3)
+    # Whole-path nearest neighbours: which clustered manoeuvres do the outliers resemble?
+    index = index or load_index(cfg, processed, trajs)
+    cluster_of = dict(zip(clusters["track_id"], clusters["cluster"]))
+    print("\nNearest trajectories to the top 5 outliers (arc-length embedding distance):")
+    for tid in outliers.head(5)["track_id"]:
+        sim = index.similar(tid, k=5)
+        near = ", ".join(
+            f"{t} (c={cluster_of.get(t, '?')}, d={d:.3f})"
+            for t, d in zip(sim["track_id"], sim["distance"])
+        )
+        print(f"  Track {tid:4d}: {near}")
 
-    # 2. Exit points colored by reachability
-    ax = axes[0, 1]
-    scatter = ax.scatter(
-        outliers["x_exit"],
-        outliers["y_exit"],
-        c=outliers["reachability"],
-        cmap="hot",
-        alpha=0.6,
-        s=50,
-    )
-    ax.set_xlabel("Exit X")
-    ax.set_ylabel("Exit Y")
-    ax.set_title("Outlier Exit Points (colored by reachability)")
-    plt.colorbar(scatter, ax=ax, label="Reachability")
-    ax.grid(True, alpha=0.3)
+    # Create visualizations (matplotlib is only imported once there is something to plot)
+    import matplotlib.pyplot as plt
 
-    # 3. Entry-exit flow (arrows)
+    fig, axes = plt.subplots(2, 2, figsize=(14, 12))
+    rasters = load_rasters(cfg, processed)
+    lvl = int(cfg.get("raster_level", 0))
+    has_outliers = "points@c-1" in rasters.layers
+
+    # 1-2. Outlier entry/exit density over the density of all tracks
+    for ax, kind in ((axes[0, 0], "entry"), (axes[0, 1], "exit")):
+        rasters.show(ax, kind, lvl, cmap="Greys", alpha=0.5)
+        if has_outliers:
+            im = rasters.show(ax, f"{kind}@c-1", lvl, cmap="hot")
+            plt.colorbar(im, ax=ax, label="log(1 + outlier tracks)")
+        ax.set_xlabel(f"{kind.capitalize()} X")
+        ax.set_ylabel(f"{kind.capitalize()} Y")
+        ax.set_title(f"Outlier {kind.capitalize()} Density (grey: all tracks)")
+        ax.grid(True, alpha=0.3)
+
+    # 3. Outlier path density with the mean flow field of all tracks
     ax = axes[1, 0]
-    # Sample top 50 to avoid overcrowding
-    sample = outliers.head(50)
-    for _, row in sample.iterrows():
-        ax.arrow(
-            row["x_entry"],
-            row["y_entry"],
-            row["x_exit"] - row["x_entry"],
-            row["y_exit"] - row["y_entry"],
-            alpha=0.3,
-            head_width=0.02,
-            head_length=0.02,
-            fc="red",
-            ec="red",
-            linewidth=0.5,
-        )
-    ax.scatter(sample["x_entry"], sample["y_entry"], c="blue", s=30, alpha=0.6, label="Entry")
-    ax.scatter(sample["x_exit"], sample["y_exit"], c="green", s=30, alpha=0.6, label="Exit")
+    rasters.show(ax, "points", lvl, cmap="Greys", alpha=0.5)
+    if has_outliers:
+        im = rasters.show(ax, "points@c-1", lvl, cmap="hot")
+        plt.colorbar(im, ax=ax, label="log(1 + outlier samples)")
+    if "vx" in rasters.layers:
+        qlvl = lvl + 3  # one arrow per 8x8 cells keeps the field legible
+        qx, qy = rasters.cell_centers(qlvl)
+        u, v = rasters.mean_velocity(qlvl)
+        ax.quiver(qx, qy, u, v, color="tab:blue", alpha=0.6, angles="xy", pivot="mid")
     ax.set_xlabel("X")
     ax.set_ylabel("Y")
-    ax.set_title(f"Top {len(sample)} Outlier Trajectories (Entry→Exit)")
-    ax.legend()
+    ax.set_title("Outlier Trajectory Density and Mean Flow")
     ax.grid(True, alpha=0.3)
 
     # 4. Reachability distribution
@@ -5,7 +5,7 @@ from omegaconf import DictConfig
 
 from traffic.io.dataset_loader import get_paths
 from traffic.io.legacy_io import load_legacy_json
-from traffic.io.serialization import write_parquet
+from traffic.io.tracks_store import write_tracks
 
 
 @hydra.main(config_path="../configs", config_name="defaults", version_base=None)
@@ -57,7 +57,7 @@ def main(cfg: DictConfig):
     df = load_legacy_json(source, class_map=class_map)
 
     out = interim / "tracks.parquet"
-    write_parquet(df, out)
+    write_tracks(df, out)
     print(f"Imported {len(df)} rows from {source} -> {out}")
 
 
@@ -10,16 +10,19 @@ from traffic.cluster.consolidate import consolidate_by_exit
 from traffic.cluster.optics import optics_cluster
 from traffic.io.dataset_loader import get_paths
 from traffic.io.serialization import read_parquet, write_parquet
+from traffic.utils.metrics import stage, start_run
 
 
 @hydra.main(config_path="../configs", config_name="defaults", version_base=None)
 def main(cfg: DictConfig):
+    metrics = start_run("run_cluster", cfg)
     # Get paths relative to original working directory
     orig_cwd = Path(get_original_cwd())
     _, _, processed = get_paths(cfg.dataset)
     processed = orig_cwd / processed
 
-    trajs = read_parquet(processed / "trajectories_cleaned.parquet")
+    with stage("load"):
+        trajs = read_parquet(processed / "trajectories_cleaned.parquet")
     # entry/exit per track
     g = trajs.sort_values("frame").groupby("track_id")
     entry = g.first()[["x", "y"]].to_numpy()
@@ -74,7 +77,12 @@ def main(cfg: DictConfig):
     exit_labels, _ = consolidate_by_exit(exit_, k=8)
     df2 = pd.DataFrame(dict(track_id=track_ids, exit_group=exit_labels))
     write_parquet(df2, processed / "exit_groups.parquet")
+    metrics.count("tracks", len(track_ids))
+    metrics.gauge("clusters", outlier_stats["n_clusters"])
+    metrics.gauge("outlier_pct", outlier_stats["pct_outliers"])
+    metrics.write(processed)
     print("\nWrote cluster and exit-group tables.")
+    print(metrics.summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+"""Run the offline pipeline for every scene config, several scenes at a time.
+
+Scenes are the top-level ``configs/*.yaml`` files (everything but ``defaults.yaml``).
+Each scene runs its stages in order as child processes (``scripts/<stage>.py
+--config-name <scene>``); up to ``--jobs`` scenes run concurrently. Before a stage
+starts it reserves its expected peak RSS from ``--mem-budget-mb``: the largest
+``peak_rss_mb`` of earlier runs of that stage for the scene (metrics.jsonl) times
+``--headroom``, or ``--default-mem-mb`` for stages never run. Reservations are served
+in arrival order: a stage waits until its reservation fits and every earlier one has
+started, so small stages cannot starve a large one. A reservation larger than the whole
+budget runs once nothing else is running, and alone.
+
+Afterwards the latest metrics.jsonl record of each stage is collected into a
+cross-scene summary (tracks, clusters, outlier %, balanced accuracy, per-stage wall
+time, peak RSS) written to ``<out>/scenes_summary.csv``.
+
+    python scripts/run_scenes.py --jobs 3 --mem-budget-mb 24000
+    python scripts/run_scenes.py --scenes bellevue_116th_ne12th --stages run_cluster
+    python scripts/run_scenes.py --jobs 4 metrics.trace_memory=true
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+STAGES = ["stitch_tracks", "build_trajectories", "gen_features", "run_cluster", "train_classifiers"]
+SCRIPTS = Path(__file__).parent
+_print_lock = threading.Lock()
+
+
+def log(msg: str) -> None:
+    with _print_lock:
+        print(msg, flush=True)
+
+
+class MemoryBudget:
+    """Blocking first-come, first-served reservations against a fixed MiB budget."""
+
+    def __init__(self, total_mb: float):
+        self.total_mb = total_mb
+        self.used_mb = 0.0
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def acquire(self, mb: float) -> None:
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            # an oversized stage still runs, but only on its own; later stages queue behind it
+            self._cond.wait_for(
+                lambda: ticket == self._serving
+                and (self.used_mb == 0 or self.used_mb + mb <= self.total_mb)
+            )
+            self._serving += 1
+            self.used_mb += mb
+            self._cond.notify_all()
+
+    def release(self, mb: float) -> None:
+        with self._cond:
+            self.used_mb -= mb
+            self._cond.notify_all()
+
+
+def discover_scenes(configs_dir: Path) -> List[str]:
+    return sorted(p.stem for p in configs_dir.glob("*.yaml") if p.stem != "defaults")
+
+
+def processed_dir(configs_dir: Path, scene: str, overrides: List[str]) -> Path:
+    from hydra import compose, initialize_config_dir
+
+    with initialize_config_dir(version_base=None, config_dir=str(configs_dir.resolve())):
+        cfg = compose(config_name=scene, overrides=overrides)
+    return Path(cfg.dataset.processed_dir)
+
+
+def read_records(processed: Path) -> List[dict]:
+    path = processed / "metrics.jsonl"
+    if not path.exists():
+        return []
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def expected_mem_mb(records: List[dict], stage: str, default_mb: float, headroom: float) -> float:
+    peaks = [r["peak_rss_mb"] for r in records if r["run"] == stage and r.get("peak_rss_mb")]
+    return max(peaks) * headroom if peaks else default_mb
+
+
+def run_scene(
+    scene: str,
+    stages: List[str],
+    args: argparse.Namespace,
+    budget: MemoryBudget,
+    processed: Path,
+) -> dict:
+    history = read_records(processed)
+    status = dict(scene=scene, status="ok", failed_stage=None)
+    for stage in stages:
+        mb = expected_mem_mb(history, stage, args.default_mem_mb, args.headroom)
+        budget.acquire(mb)
+        try:
+            cmd = [
+                sys.executable,
+                str(SCRIPTS / f"{stage}.py"),
+                "--config-path",
+                str(Path(args.configs).resolve()),
+                "--config-name",
+                scene,
+                *args.overrides,
+            ]
+            log_path = processed / "logs" / f"{stage}.log"
+            log_path.parent.mkdir(parents=True, exist_ok=True)
+            log(f"[{scene}] {stage} (reserved {mb:.0f} MiB)")
+            with open(log_path, "w", encoding="utf-8") as fh:
+                rc = subprocess.run(cmd, stdout=fh, stderr=subprocess.STDOUT).returncode
+        finally:
+            budget.release(mb)
+        if rc != 0:
+            log(f"[{scene}] {stage} failed (exit {rc}), see {log_path}")
+            status.update(status="failed", failed_stage=stage)
+            break
+    return status
+
+
+def summarize(status: dict, processed: Path, stages: List[str], since: float) -> dict:
+    """One summary row from the scene's metrics records written since ``since``."""
+    latest: Dict[str, dict] = {}
+    for r in read_records(processed):
+        if r["run"] in stages and r.get("started", 0) >= since:
+            latest[r["run"]] = r
+    row = dict(status)
+
+    def pick(run: str, kind: str, key: str) -> Optional[float]:
+        return latest.get(run, {}).get(kind, {}).get(key)
+
+    row["tracks"] = pick("run_cluster", "counters", "tracks") or pick(
+        "build_trajectories", "counters", "tracks"
+    )
+    row["clusters"] = pick("run_cluster", "gauges", "clusters")
+    row["outlier_pct"] = pick("run_cluster", "gauges", "outlier_pct")
+    row["balanced_accuracy"] = pick("train_classifiers", "gauges", "balanced_accuracy")
+    for stage in stages:
+        row[f"{stage}_s"] = latest.get(stage, {}).get("elapsed_s")
+    peaks = [r.get("peak_rss_mb") or 0 for r in latest.values()]
+    row["peak_rss_mb"] = max(peaks) if peaks else None
+    return row
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--configs", default=str(SCRIPTS.parent / "configs"), help="configs dir")
+    p.add_argument("--scenes", nargs="+", help="scene config names (default: all)")
+    p.add_argument("--stages", nargs="+", default=STAGES, help="scripts to run per scene")
+    p.add_argument("--jobs", type=int, default=2, help="scenes running concurrently")
+    p.add_argument("--mem-budget-mb", type=float, default=16000.0)
+    p.add_argument("--default-mem-mb", type=float, default=2000.0)
+    p.add_argument("--headroom", type=float, default=1.25)
+    p.add_argument("--out", default="data/processed", help="where scenes_summary.csv goes")
+    p.add_argument("overrides", nargs="*", help="hydra overrides applied to every stage")
+    args = p.parse_args()
+
+    configs_dir = Path(args.configs)
+    scenes = args.scenes or discover_scenes(configs_dir)
+    if not scenes:
+        raise SystemExit(f"No scene configs found in {configs_dir}")
+    dirs = {s: processed_dir(configs_dir, s, args.overrides) for s in scenes}
+    budget = MemoryBudget(args.mem_budget_mb)
+    t0 = time.time()
+    with ThreadPoolExecutor(max_workers=args.jobs) as ex:
+        futures = {s: ex.submit(run_scene, s, args.stages, args, budget, dirs[s]) for s in scenes}
+        statuses = {s: f.result() for s, f in futures.items()}
+
+    df = pd.DataFrame([summarize(statuses[s], dirs[s], args.stages, t0) for s in scenes])
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out / "scenes_summary.csv", index=False)
+    print(f"\nCross-scene summary ({time.time() - t0:.1f}s):")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(f"Wrote {out / 'scenes_summary.csv'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,75 @@
 import os
-import cv2
-import numpy as np
-from visualize import draw_annotations, show_frame
+import time
+from dataclasses import asdict
+from pathlib import Path
 
 import hydra
+import numpy as np
 import pandas as pd
 from omegaconf import DictConfig
 
+from traffic.detect.cache import DetectionCache, DetectionCacheWriter, cache_path
+from traffic.detect.motion import MotionGate, detection_recall
+from traffic.detect.roi import Roi
 from traffic.detect.ultralytics_runner import UltralyticsDetector
 from traffic.io.dataset_loader import get_paths
-from traffic.io.serialization import write_parquet
+from traffic.io.frame_ring import RingDecoder
+from traffic.io.tracks_store import write_tracks
+from traffic.track.adaptive import AdaptiveController, Level, strided_frames
+from traffic.track.bytetrack import StreamTracker, boxes_to_arrays, replay
+from traffic.track.multistream import video_frames
 from traffic.track.tracker_api import UltralyticsTracker
+from traffic.utils.metrics import metrics, stage, start_run
+
+
+def record_frame(res, n_boxes: int) -> None:
+    """Per-frame throughput and latency breakdown reported by Ultralytics (ms)."""
+    metrics.count("frames")
+    metrics.count("boxes", n_boxes)
+    metrics.observe("boxes_per_frame", n_boxes)
+    for k, v in (getattr(res, "speed", None) or {}).items():
+        if v is not None:
+            metrics.observe(f"{k}_ms", v)
+
+
+def report_gate(gate, cache, interim, processed, source, weights, imgsz, roi) -> None:
+    """Skip ratio, per-frame gate log and recall against a recorded ungated run."""
+    log = gate.to_frame()
+    log.to_parquet(processed / "motion_gate.parquet", index=False)
+    metrics.gauge("gate_skip_ratio", gate.skip_ratio)
+    msg = f"Motion gate skipped {gate.skip_ratio:.1%} of {gate.n_frames} frames"
+    ref_file = None
+    if Path(str(source)).is_file():
+        ref_file = cache_path(interim, source, weights, imgsz, roi)
+    ref = None
+    if ref_file is not None and ref_file.exists():
+        ref = DetectionCache.load(ref_file)
+    problem = None
+    if ref is not None:
+        try:
+            ref.check(cache.meta.get("conf"), cache.meta.get("classes"))
+        except ValueError as e:
+            problem = str(e)
+    if ref is None:
+        msg += "; record an ungated run with detect.cache=true to report recall"
+    elif problem is not None:
+        msg += f"; no recall, the ungated reference does not match this run: {problem}"
+    else:
+        rec = detection_recall(ref, cache)
+        gated = detection_recall(ref, cache, frames=log["frame"][~log["inferred"]])
+        metrics.gauge("gate_recall", rec["recall"])
+        metrics.gauge("gate_recall_gated_frames", gated["recall"])
+        msg += (
+            f"; detection recall vs ungated {rec['recall']:.3f}"
+            f" ({gated['recall']:.3f} on skipped frames)"
+        )
+    print(msg)
 
 
 @hydra.main(config_path="../configs", config_name="defaults", version_base=None)
 def main(cfg: DictConfig):
-    raw, interim, _ = get_paths(cfg.dataset)
+    start_run("run_track", cfg)
+    raw, interim, processed = get_paths(cfg.dataset)
     # Prefer an explicit CLI override 'source'; else use configured video path
     source = getattr(cfg, "source", None)
     if source is None:
@@ -28,6 +82,25 @@ def main(cfg: DictConfig):
     imgsz = cfg.detect.get("imgsz", cfg.detect.get("size", None))
     # visualize flag now comes from the dataset config (per-scene)
     visualize = bool(cfg.dataset.get("visualize", False))
+    if cfg.realtime.get("enabled", False) and not cfg.tracker.get("replay", False):
+        unsupported = [
+            name
+            for name, on in (
+                ("detect.cache", cfg.detect.get("cache", False)),
+                ("dataset.motion_gate", cfg.dataset.get("motion_gate") is not None),
+                ("dataset.visualize", visualize),
+            )
+            if on
+        ]
+        if unsupported:
+            raise ValueError(
+                f"realtime mode does not support {', '.join(unsupported)}; "
+                "disable them or run with realtime=fixed"
+            )
+    if visualize:
+        # OpenCV GUI is only needed for on-screen preview; keep it off the headless path
+        import cv2
+        from visualize import HeadlessRenderer, draw_annotations, show_frame
 
     # colors must be provided per-scene in dataset config as a map label->RGB
     ds_colors = getattr(cfg.dataset, "colors", None)
@@ -46,58 +119,255 @@ def main(cfg: DictConfig):
             raise RuntimeError(f"Missing color for label '{label_name}' in cfg.dataset.colors")
         COLORS[int(cid)] = tuple(map(int, rgb))
 
+    class_names = getattr(cfg.detect, "class_names", None)
+    render = cfg.get("render") or {}
+    renderer = None
+    if visualize and render.get("mode", "window") == "headless":
+        out_video = render.get("out") or processed / f"{Path(str(source)).stem}_annotated.mp4"
+        renderer = HeadlessRenderer(
+            out_video,
+            COLORS,
+            class_names=class_names,
+            fps=float(cfg.dataset.fps),
+            every=int(render.get("every", 1)),
+            queue_size=int(render.get("queue_size", 32)),
+            drop_if_full=bool(render.get("drop_if_full", False)),
+        )
+
+    use_cache = bool(cfg.detect.get("cache", False))
+    roi = Roi.from_cfg(cfg.dataset)
+    gate = MotionGate.from_cfg(cfg.dataset, roi)
+    tracker_params = dict(cfg.tracker.get("params") or {})
+    frame_rate = float(cfg.tracker.get("frame_rate", 30))
+    decoder = None
     rows = []
-    if cfg.tracker.name == "none":
-        det = UltralyticsDetector(weights, device=device, conf=conf, classes=classes, imgsz=imgsz)
-        stop = False
-        for i, res in enumerate(det.detect(source=source)):
-            if not hasattr(res, "boxes") or res.boxes is None:
-                continue
-            img = getattr(res, "orig_img", None)
-            annos = []
-            for b in res.boxes:
-                x1, y1, x2, y2 = map(float, b.xyxy[0].tolist())
-                cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-                cls = int(b.cls[0].item()) if b.cls is not None else -1
-                c = float(b.conf[0].item()) if b.conf is not None else 0.0
-                rows.append(dict(frame=i, track_id=-1, cls=cls, conf=c, cx=cx, cy=cy, w=x2 - x1, h=y2 - y1))
-                annos.append((x1, y1, x2, y2, cls, c, None))
-            if visualize and img is not None:
-                draw_annotations(img, annos, COLORS, class_names=getattr(cfg.detect, "class_names", None))
-                if show_frame("detections", img):
-                    stop = True
-            if stop:
-                break
-    else:
-        tracker_yaml = cfg.tracker.yaml_path
-        tr = UltralyticsTracker(weights, tracker_yaml, device=device, conf=conf, classes=classes, imgsz=imgsz)
-        stop = False
-        for i, res in enumerate(tr.track(source=source)):
-            if not hasattr(res, "boxes") or res.boxes is None:
-                continue
-            img = getattr(res, "orig_img", None)
-            ids = res.boxes.id
-            annos = []
-            for j, b in enumerate(res.boxes):
-                x1, y1, x2, y2 = map(float, b.xyxy[0].tolist())
-                cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
-                cls = int(b.cls[0].item()) if b.cls is not None else -1
-                c = float(b.conf[0].item()) if b.conf is not None else 0.0
-                tid = int(ids[j].item()) if ids is not None else -1
-                rows.append(dict(frame=i, track_id=tid, cls=cls, conf=c, cx=cx, cy=cy, w=x2 - x1, h=y2 - y1))
-                annos.append((x1, y1, x2, y2, cls, c, tid))
-            if visualize and img is not None:
-                draw_annotations(img, annos, COLORS, class_names=getattr(cfg.detect, "class_names", None))
-                if show_frame("tracking", img):
-                    stop = True
-            if stop:
-                break
+    with stage("track") as st:
+        if cfg.tracker.get("replay", False):
+            # tracker-only: recorded detections through the tracker, no YOLO involved
+            cache_file = cache_path(interim, source, weights, imgsz, roi)
+            if not cache_file.exists():
+                raise FileNotFoundError(
+                    f"No detection cache {cache_file}; record one with detect.cache=true first"
+                )
+            cache = DetectionCache.load(cache_file)
+            # same boxes as a live run at detect.conf unless the tracker asks for another cut
+            min_conf = cfg.tracker.get("min_conf")
+            min_conf = float(conf) if min_conf is None else float(min_conf)
+            cache.check(min_conf, classes)
+            if cfg.tracker.name == "none":
+                rows = cache.to_frame(min_conf)
+            else:
+                rows, _ = replay(
+                    cache, cfg.tracker.yaml_path, frame_rate, min_conf, **tracker_params
+                )
+            metrics.count("frames", cache.n_frames)
+            metrics.count("boxes", len(rows))
+        elif cfg.realtime.get("enabled", False):
+            rt = cfg.realtime
+            controller = AdaptiveController(
+                [Level(lv.weights, lv.get("imgsz")) for lv in rt.levels],
+                target_fps=float(rt.get("target_fps") or cfg.dataset.fps),
+                max_stride=int(rt.max_stride),
+                window=int(rt.window),
+                headroom=float(rt.headroom),
+                cooldown=int(rt.cooldown),
+                start_level=int(rt.get("start_level", 0)),
+                reprobe=int(rt.get("reprobe", 600)),
+            )
+            detectors = {}
+            tracker = None
+            if cfg.tracker.name != "none":
+                tracker = StreamTracker(cfg.tracker.yaml_path, frame_rate, **tracker_params)
+            writer = DetectionCacheWriter(None)
+            frame_log = []
+            n_source = 0  # source frames covered, skipped ones included
+            for idx, img in strided_frames(source, controller):
+                n_source = idx + 1
+                level = controller.current
+                if level.weights not in detectors:
+                    detectors[level.weights] = UltralyticsDetector(
+                        level.weights, device=device, conf=conf, classes=classes
+                    )
+                t0 = time.perf_counter()
+                res = detectors[level.weights].predict(
+                    [img if roi is None else roi.crop(img)], imgsz=level.imgsz
+                )[0]
+                xyxy, c, cls = boxes_to_arrays(res)
+                if roi is not None:
+                    xyxy, c, cls = roi.apply(img.shape, xyxy, c, cls)
+                writer.add(idx, xyxy, c, cls)
+                if tracker is not None:
+                    tracker.update(idx, xyxy, c, cls, img)
+                latency = time.perf_counter() - t0
+                record_frame(res, len(c))
+                frame_log.append((idx, controller.level, controller.stride, latency * 1e3))
+                controller.observe(idx, latency)
+            cache = writer.close()
+            rows = cache.to_frame() if tracker is None else tracker.to_frame()
+            decisions = pd.DataFrame([asdict(d) for d in controller.decisions])
+            decisions.to_csv(processed / "realtime_decisions.csv", index=False)
+            pd.DataFrame(
+                frame_log, columns=["frame", "level", "stride", "latency_ms"]
+            ).to_parquet(processed / "realtime_frames.parquet", index=False)
+            metrics.count("adaptations", len(decisions))
+            metrics.gauge("final_stride", controller.stride)
+            metrics.gauge("processed_fraction", len(frame_log) / max(1, n_source))
+            print(f"{len(decisions)} adaptations -> {processed / 'realtime_decisions.csv'}")
+        elif use_cache or roi is not None or gate is not None:
+            # predict, then track in-process: boxes can be recorded, ROI-filtered or gated
+            cache_file = None
+            if use_cache and gate is not None:
+                raise ValueError(
+                    "detect.cache records the ungated reference; disable dataset.motion_gate"
+                )
+            if use_cache:
+                if not Path(str(source)).is_file():
+                    raise ValueError(f"detect.cache needs a video file, got source={source!r}")
+                cache_file = cache_path(interim, source, weights, imgsz, roi)
+            writer = DetectionCacheWriter(
+                cache_file,
+                video=str(source),
+                weights=str(weights),
+                imgsz=imgsz,
+                conf=float(conf),
+                classes=None if classes is None else list(classes),
+                roi=None if roi is None else roi.polygon.tolist(),
+            )
+            det = UltralyticsDetector(
+                weights, device=device, conf=conf, classes=classes, imgsz=imgsz
+            )
+            tracker = None
+            if cfg.tracker.name != "none":
+                tracker = StreamTracker(cfg.tracker.yaml_path, frame_rate, **tracker_params)
+            # (frame, what the renderer gets): with a ring both come from one decoded slot
+            # and the renderer takes the held slot, so no consumer copies the frame first
+            ring_slots = int(render.get("ring_slots") or 0)
+            if renderer is not None and ring_slots > 0:
+                decoder = RingDecoder(source, ring_slots)
+                frames = ((ref.array, ref) for ref in decoder)
+            else:
+                frames = ((f, f) for f in video_frames(source))
+            crop = (lambda f: f) if roi is None else roi.crop
+            if gate is not None:
+                # res None: no motion since the last inferred frame, its boxes are held
+                results = (
+                    (det.predict([crop(f)])[0] if gate.update(f) else None, f, shown)
+                    for f, shown in frames
+                )
+            elif roi is None and decoder is None:
+                results = (
+                    (res, getattr(res, "orig_img", None), getattr(res, "orig_img", None))
+                    for res in det.detect(source)
+                )
+            else:
+                results = ((det.predict([crop(f)])[0], f, shown) for f, shown in frames)
+            img = None
+            xyxy, c, cls = np.zeros((0, 4), np.float32), np.zeros(0), np.zeros(0, int)
+            for i, (res, img, shown) in enumerate(results):
+                if res is None:
+                    metrics.count("frames")
+                    metrics.count("gated_frames")
+                else:
+                    xyxy, c, cls = boxes_to_arrays(res)
+                    if roi is not None:
+                        n_raw = len(c)
+                        xyxy, c, cls = roi.apply(img.shape, xyxy, c, cls)
+                        metrics.count("roi_dropped", n_raw - len(c))
+                    record_frame(res, len(c))
+                writer.add(i, xyxy, c, cls)
+                if tracker is not None:
+                    out = tracker.update(i, xyxy, c, cls, img)
+                    annos = [(*r[:4], int(r[6]), r[5], int(r[4])) for r in out.tolist()]
+                else:
+                    annos = [(*b, int(k), s, None) for b, s, k in zip(xyxy.tolist(), c, cls)]
+                if renderer is not None and shown is not None:
+                    renderer.submit(i, shown, annos)
+                elif visualize and img is not None:
+                    draw_annotations(img, annos, COLORS, class_names=class_names)
+                    if show_frame("tracking", img):
+                        break
+            cache = writer.close()
+            if cache_file is not None:
+                print(f"Cached {len(cache)} detections ({cache.n_frames} frames) -> {cache_file}")
+            if roi is not None and img is not None:
+                metrics.gauge("roi_area_fraction", roi.area_fraction(img.shape))
+            if gate is not None:
+                report_gate(gate, cache, interim, processed, source, weights, imgsz, roi)
+            rows = cache.to_frame() if tracker is None else tracker.to_frame()
+        elif cfg.tracker.name == "none":
+            det = UltralyticsDetector(weights, device=device, conf=conf, classes=classes, imgsz=imgsz)
+            stop = False
+            for i, res in enumerate(det.detect(source=source)):
+                if not hasattr(res, "boxes") or res.boxes is None:
+                    record_frame(res, 0)
+                    continue
+                record_frame(res, len(res.boxes))
+                img = getattr(res, "orig_img", None)
+                annos = []
+                for b in res.boxes:
+                    x1, y1, x2, y2 = map(float, b.xyxy[0].tolist())
+                    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+                    cls = int(b.cls[0].item()) if b.cls is not None else -1
+                    c = float(b.conf[0].item()) if b.conf is not None else 0.0
+                    rows.append(dict(frame=i, track_id=-1, cls=cls, conf=c, cx=cx, cy=cy, w=x2 - x1, h=y2 - y1))
+                    annos.append((x1, y1, x2, y2, cls, c, None))
+                if renderer is not None and img is not None:
+                    renderer.submit(i, img, annos)
+                elif visualize and img is not None:
+                    draw_annotations(img, annos, COLORS, class_names=class_names)
+                    if show_frame("detections", img):
+                        stop = True
+                if stop:
+                    break
+        else:
+            tracker_yaml = cfg.tracker.yaml_path
+            tr = UltralyticsTracker(weights, tracker_yaml, device=device, conf=conf, classes=classes, imgsz=imgsz)
+            stop = False
+            for i, res in enumerate(tr.track(source=source)):
+                if not hasattr(res, "boxes") or res.boxes is None:
+                    record_frame(res, 0)
+                    continue
+                record_frame(res, len(res.boxes))
+                img = getattr(res, "orig_img", None)
+                ids = res.boxes.id
+                annos = []
+                for j, b in enumerate(res.boxes):
+                    x1, y1, x2, y2 = map(float, b.xyxy[0].tolist())
+                    cx, cy = (x1 + x2) / 2, (y1 + y2) / 2
+                    cls = int(b.cls[0].item()) if b.cls is not None else -1
+                    c = float(b.conf[0].item()) if b.conf is not None else 0.0
+                    tid = int(ids[j].item()) if ids is not None else -1
+                    rows.append(dict(frame=i, track_id=tid, cls=cls, conf=c, cx=cx, cy=cy, w=x2 - x1, h=y2 - y1))
+                    annos.append((x1, y1, x2, y2, cls, c, tid))
+                if renderer is not None and img is not None:
+                    renderer.submit(i, img, annos)
+                elif visualize and img is not None:
+                    draw_annotations(img, annos, COLORS, class_names=class_names)
+                    if show_frame("tracking", img):
+                        stop = True
+                if stop:
+                    break
+        st.items = metrics.counters["frames"]
 
-    df = pd.DataFrame(rows)
+    df = pd.DataFrame(rows, columns=["frame", "track_id", "cls", "conf", "cx", "cy", "w", "h"])
     out = interim / "tracks.parquet"
-    write_parquet(df, out)
+    with stage("write"):
+        write_tracks(df, out)
+    if st.items_per_s:
+        metrics.gauge("fps", st.items_per_s)
+    if renderer is not None:
+        with stage("render_flush"):
+            renderer.close()
+        metrics.count("rendered_frames", renderer.written)
+        metrics.count("render_dropped", renderer.dropped)
+        metrics.gauge("render_seconds", renderer.render_s)
+        print(f"Wrote annotated video ({renderer.written} frames) -> {renderer.out_path}")
+    if decoder is not None:
+        decoder.close()  # the renderer has released every slot; no frame views are read after
+    metrics.write(processed)
     print(f"Wrote {len(df)} rows -> {out}")
-    if visualize:
+    print(metrics.summary())
+    if visualize and renderer is None:
         cv2.destroyAllWindows()
 
 if __name__ == "__main__":
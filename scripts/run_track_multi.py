@@ -0,0 +1,122 @@
+"""Track several scenes' videos at once with one batched YOLO forward pass per step.
+
+Each scene config contributes one stream (``dataset.video``); its tracks are written to
+that scene's ``interim/tracks.parquet`` as ``run_track.py`` would. All scenes must use
+the same detector settings (weights, imgsz, conf, classes), taken from the configs.
+Aggregate and per-stream frames/s are printed and recorded in ``<out>/metrics.jsonl``.
+
+    python scripts/run_track_multi.py --scenes bellevue_116th_ne12th bellevue_150th_newport
+    python scripts/run_track_multi.py --max-batch 4 detect=yolo11x
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+from traffic.detect.roi import Roi
+from traffic.io.dataset_loader import get_paths
+from traffic.io.tracks_store import write_tracks
+from traffic.track.bytetrack import StreamTracker
+from traffic.track.multistream import FrameReader, track_streams, video_frames
+from traffic.utils.metrics import metrics, stage, start_run
+
+SCRIPTS = Path(__file__).parent
+DETECT_KEYS = ("weights", "conf", "classes", "imgsz", "device")
+
+
+def compose(configs_dir: Path, scene: str, overrides: list):
+    from hydra import compose as hydra_compose
+    from hydra import initialize_config_dir
+
+    with initialize_config_dir(version_base=None, config_dir=str(configs_dir.resolve())):
+        return hydra_compose(config_name=scene, overrides=overrides)
+
+
+def detect_settings(cfg) -> dict:
+    d = cfg.detect
+    classes = d.get("classes")
+    return dict(
+        weights=d.weights,
+        conf=d.conf,
+        classes=None if classes is None else list(classes),
+        imgsz=d.get("imgsz", d.get("size", None)),
+        device=d.device,
+    )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("--configs", default=str(SCRIPTS.parent / "configs"), help="configs dir")
+    p.add_argument("--scenes", nargs="+", required=True, help="scene config names")
+    p.add_argument("--max-batch", type=int, default=None, help="frames per predict call")
+    p.add_argument("--max-frames", type=int, default=None, help="stop each stream early")
+    p.add_argument("--queue-size", type=int, default=8, help="decoded frames per stream")
+    p.add_argument("--out", default="data/processed", help="where the run record goes")
+    p.add_argument("overrides", nargs="*", help="hydra overrides applied to every scene")
+    args = p.parse_args()
+
+    configs_dir = Path(args.configs)
+    cfgs = {s: compose(configs_dir, s, args.overrides) for s in args.scenes}
+    settings = {s: detect_settings(c) for s, c in cfgs.items()}
+    first = settings[args.scenes[0]]
+    for s, d in settings.items():
+        if d != first:
+            diff = [k for k in DETECT_KEYS if d[k] != first[k]]
+            raise SystemExit(f"Scene {s} differs in detector settings {diff}; batch them apart")
+
+    start_run("run_track_multi", cfgs[args.scenes[0]])
+    metrics.labels["scene"] = ",".join(args.scenes)
+
+    # imported here: ultralytics pulls in torch, which dominates start-up
+    from ultralytics import YOLO
+
+    model = YOLO(first["weights"])
+    kw = dict(conf=first["conf"], classes=first["classes"], device=first["device"], verbose=False)
+    if first["imgsz"] is not None:
+        kw["imgsz"] = first["imgsz"]
+
+    def predict(frames):
+        return model.predict(frames, **kw)
+
+    trackers, readers, rois = {}, {}, {}
+    for s, cfg in cfgs.items():
+        roi = Roi.from_cfg(cfg.dataset)
+        if roi is not None:
+            rois[s] = roi
+        source = cfg.get("source") or os.path.join(os.getcwd(), cfg.dataset.video)
+        trackers[s] = StreamTracker(
+            cfg.tracker.yaml_path,
+            float(cfg.tracker.get("frame_rate", 30)),
+            **dict(cfg.tracker.get("params") or {}),
+        )
+        readers[s] = FrameReader(video_frames(source), args.queue_size, name=s)
+
+    with stage("track_streams") as st:
+        result = track_streams(readers, predict, trackers, args.max_batch, args.max_frames, rois)
+        st.items = result.frames
+
+    with stage("write"):
+        for s, cfg in cfgs.items():
+            _, interim, _ = get_paths(cfg.dataset)
+            df = trackers[s].to_frame()
+            write_tracks(df, interim / "tracks.parquet")
+            stats = result.stats[s]
+            metrics.count(f"frames@{s}", stats.frames)
+            metrics.count(f"boxes@{s}", stats.boxes)
+            metrics.gauge(f"decode_wait_s@{s}", stats.decode_wait_s)
+            print(
+                f"[{s}] {stats.frames} frames, {len(df)} rows -> {interim / 'tracks.parquet'}"
+                f" ({stats.frames / result.wall_s:.1f} fps, decode wait {stats.decode_wait_s:.1f}s)"
+            )
+    metrics.count("frames", result.frames)
+    metrics.count("batches", result.batches)
+    metrics.gauge("fps", result.fps)
+    metrics.gauge("streams", len(cfgs))
+    metrics.write(Path(args.out))
+    print(f"{len(cfgs)} streams, {result.frames} frames in {result.batches} batches:")
+    print(f"aggregate {result.fps:.1f} fps")
+    print(metrics.summary())
+
+
+if __name__ == "__main__":
+    main()
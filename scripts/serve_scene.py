@@ -0,0 +1,52 @@
+"""Serve a scene's processed tables to notebooks over a Unix socket (Arrow IPC).
+
+Loads trajectories (plus partitions under processed/trajectories/), clusters, exit groups,
+outliers and features once; notebooks then fetch only the columns and rows they need with
+traffic.io.sliceserver.SliceClient instead of each reading the parquet files:
+
+    python scripts/serve_scene.py dataset=bellevue_116th_ne12th
+
+    from traffic.io.sliceserver import SliceClient
+    client = SliceClient("/tmp/traffic-bellevue_116th_ne12th.sock")
+    trajs = client.frame("trajectories", ["track_id", "frame", "x", "y"],
+                         tracks=("clusters", [("cluster", "in", [3, 5])]))
+
+Settings come from ``dataset.serve``: ``socket`` (default /tmp/traffic-<scene>.sock) and
+``tables`` (default traffic.io.sliceserver.DEFAULT_TABLES). Tables rewritten on disk are
+reloaded on their next request.
+"""
+
+import signal
+
+import hydra
+from omegaconf import DictConfig
+
+from traffic.io.dataset_loader import get_paths
+from traffic.io.sliceserver import DEFAULT_TABLES, SliceServer
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("serve_scene", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.dataset.get("serve", {}) or {}
+    path = opts.get("socket") or f"/tmp/traffic-{cfg.dataset.scene}.sock"
+    server = SliceServer(processed, path, tables=tuple(opts.get("tables") or DEFAULT_TABLES))
+    with stage("load"):
+        rows = server.load()
+    for name, n in rows.items():
+        metrics.gauge(f"rows_{name}", n)
+    metrics.write(processed)
+    print(", ".join(f"{name}: {n} rows" for name, n in rows.items()))
+    print(f"Serving {processed} on {path} (Ctrl-C to stop)")
+    signal.signal(signal.SIGTERM, signal.default_int_handler)  # remove the socket on kill
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served {server.requests} request(s)")
+
+
+if __name__ == "__main__":
+    main()
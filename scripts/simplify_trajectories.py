@@ -0,0 +1,68 @@
+"""Write a compact, error-bounded copy of trajectories.parquet.
+
+Simplifies every track of processed/trajectories.parquet in one batched pass and writes
+processed/trajectories_simplified.parquet: the same columns plus ``max_err``, the largest
+distance between an original sample and the simplified track over the segment starting at
+that row. Settings come from ``dataset.simplify``:
+
+* ``method: dp`` (default): Douglas-Peucker keeping original rows, ``tol`` in position
+  units, ``mode: sed`` (error at the same frame, default) or ``perpendicular``;
+* ``method: frame`` / ``method: distance``: uniform resampling every ``step`` frames or
+  position units.
+
+    python scripts/simplify_trajectories.py dataset=bellevue_116th_ne12th
+    python scripts/simplify_trajectories.py dataset=synthetic dataset.simplify.tol=0.005
+"""
+
+import hydra
+import numpy as np
+from omegaconf import DictConfig
+
+from traffic.io.dataset_loader import get_paths
+from traffic.io.serialization import read_parquet, write_parquet
+from traffic.trajectories.flat import flatten_tracks
+from traffic.trajectories.simplify import douglas_peucker, resample
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("simplify_trajectories", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.dataset.get("simplify", {}) or {}
+    method = opts.get("method", "dp")
+    src = processed / "trajectories.parquet"
+    with stage("load"):
+        trajs = read_parquet(src)
+        cols = tuple(c for c in trajs.columns if c != "track_id")
+        flat = flatten_tracks(trajs, cols)
+    with stage("simplify", items=len(trajs)):
+        if method == "dp":
+            out = douglas_peucker(flat, float(opts.get("tol", 0.5)), opts.get("mode", "sed"))
+        elif method in ("frame", "distance"):
+            out = resample(flat, float(opts.get("step", 5)), by=method)
+        else:
+            raise ValueError(f"dataset.simplify.method must be dp, frame or distance: {method}")
+    dst = processed / "trajectories_simplified.parquet"
+    with stage("write"):
+        write_parquet(out.table, dst)
+
+    size_in, size_out = src.stat().st_size, dst.stat().st_size
+    errs = out.track_errors()
+    metrics.count("rows_in", out.n_in)
+    metrics.count("rows_out", len(out.table))
+    metrics.gauge("row_ratio", out.ratio)
+    metrics.gauge("size_ratio", size_out / size_in)
+    metrics.gauge("max_err", float(errs.max()) if len(errs) else 0.0)
+    metrics.gauge("p95_track_err", float(np.percentile(errs, 95)) if len(errs) else 0.0)
+    metrics.write(processed)
+    print(
+        f"{method}: {out.n_in} -> {len(out.table)} rows ({100 * out.ratio:.1f}%), "
+        f"{size_in / 2**20:.1f} -> {size_out / 2**20:.1f} MiB ({100 * size_out / size_in:.1f}%), "
+        f"max error {metrics.gauges['max_err']:.4g}, p95 per track "
+        f"{metrics.gauges['p95_track_err']:.4g} -> {dst}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Link fragmented track IDs and write interim/tracks_stitched.parquet.
+
+Runs between run_track.py and build_trajectories.py (which reads the stitched file when
+``stitch.enabled``). The chosen links go to processed/stitch_links.parquet.
+
+    python scripts/stitch_tracks.py dataset=synthetic
+    python scripts/stitch_tracks.py stitch.max_gap=60 stitch.gate_boxes=1.5
+"""
+
+import dataclasses
+
+import hydra
+from omegaconf import DictConfig
+
+from traffic.io.dataset_loader import get_paths
+from traffic.io.serialization import write_parquet
+from traffic.io.tracks_store import load_tracks, write_tracks
+from traffic.track.stitch import StitchParams, rewrite_ids, stitch_links
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("stitch_tracks", cfg)
+    _, interim, processed = get_paths(cfg.dataset)
+    fields = {f.name for f in dataclasses.fields(StitchParams)}
+    params = StitchParams(**{k: v for k, v in cfg.stitch.items() if k in fields})
+    with stage("load"):
+        ct = load_tracks(interim / "tracks.parquet")
+    with stage("link", items=len(ct.track_ids)):
+        links = stitch_links(ct, params)
+    with stage("rewrite", items=len(ct)):
+        stitched = rewrite_ids(ct, links["stitched_id"].to_numpy())
+    out = interim / "tracks_stitched.parquet"
+    with stage("write"):
+        write_tracks(stitched, out)
+        write_parquet(links, processed / "stitch_links.parquet")
+
+    linked = links[links["linked_from"] >= 0]
+    metrics.count("tracks_in", len(links))
+    metrics.count("tracks", len(stitched.track_ids))
+    metrics.count("links", len(linked))
+    if len(linked):
+        metrics.gauge("mean_gap", linked["gap"].mean())
+        metrics.gauge("mean_cost", linked["cost"].mean())
+    metrics.write(processed)
+    print(f"{len(links)} tracks -> {len(stitched.track_ids)} after {len(linked)} links -> {out}")
+    print(metrics.summary())
+
+
+if __name__ == "__main__":
+    main()
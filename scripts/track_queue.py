@@ -0,0 +1,141 @@
+"""Run run_track.py over many videos from a shared file-system work queue.
+
+Any number of workers (processes on one machine, or on several nodes sharing the queue
+directory) pull videos from the queue; see traffic.utils.workqueue for the layout, lease
+expiry and retries. Each video's outputs (interim/tracks.parquet, processed/ metrics,
+run_track.log) end up in <queue>/out/<item>/.
+
+    python scripts/track_queue.py enqueue /mnt/q -s videos/ --config-name bellevue_116th_ne12th
+    python scripts/track_queue.py work /mnt/q --procs 2        # on every node
+    python scripts/track_queue.py status /mnt/q
+
+Video paths are stored as absolute paths, so they must be the same on every node.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from batch_run_track import collect_sources
+
+from traffic.utils.workqueue import WorkQueue, default_worker_id, run_worker
+
+RUNNER = Path(__file__).parent / "run_track.py"
+
+
+def run_item(item: str, payload: dict, scratch: Path) -> dict:
+    cmd = [
+        sys.executable,
+        str(RUNNER),
+        "--config-name",
+        payload["config_name"],
+        f"dataset.video={payload['video']}",
+        f"dataset.interim_dir={scratch / 'interim'}",
+        f"dataset.processed_dir={scratch / 'processed'}",
+        f"hydra.run.dir={scratch / 'hydra'}",
+        *payload.get("overrides", []),
+    ]
+    t0 = time.time()
+    with open(scratch / "run_track.log", "w") as log:
+        res = subprocess.run(cmd, stdout=log, stderr=subprocess.STDOUT)
+    if res.returncode != 0:
+        tail = (scratch / "run_track.log").read_text()[-2000:]
+        raise RuntimeError(f"run_track exited with {res.returncode}:\n{tail}")
+    return dict(video=payload["video"], wall_s=time.time() - t0)
+
+
+def _work(root: str, ttl: float, max_attempts: int, worker: str, poll_s: float) -> int:
+    queue = WorkQueue(root, ttl=ttl, max_attempts=max_attempts)
+    return run_worker(queue, run_item, worker=worker, poll_s=poll_s)
+
+
+def cmd_enqueue(args) -> None:
+    queue = WorkQueue(args.queue, ttl=args.ttl, max_attempts=args.max_attempts)
+    files = collect_sources(Path(args.source), args.pattern, args.recursive)
+    if not files:
+        raise SystemExit(f"No files found for {args.source} (pattern={args.pattern})")
+    for f in files:
+        payload = dict(
+            video=str(f.resolve()), config_name=args.config_name, overrides=args.overrides
+        )
+        print(f"{queue.enqueue(str(f.resolve()), payload)}  {f}")
+    print(f"{len(queue.items())} item(s) in {args.queue}")
+
+
+def cmd_work(args) -> None:
+    base = args.worker or default_worker_id()
+    jobs = [
+        (args.queue, args.ttl, args.max_attempts, f"{base}.{i}", args.poll)
+        for i in range(args.procs)
+    ]
+    if args.procs == 1:
+        n = _work(*jobs[0])
+    else:
+        with mp.get_context("spawn").Pool(args.procs) as pool:
+            n = sum(pool.starmap(_work, jobs))
+    print(f"{base}: processed {n} item(s)")
+
+
+def cmd_status(args) -> None:
+    st = WorkQueue(args.queue, ttl=args.ttl, max_attempts=args.max_attempts).status(
+        window_s=args.window
+    )
+    if args.json:
+        print(json.dumps(st, indent=1))
+        return
+    print(
+        f"{st['done']}/{st['items']} done, {st['pending']} pending, {st['running']} running, "
+        f"{len(st['expired'])} expired lease(s), {len(st['gave_up'])} given up"
+    )
+    rate = f"{st['per_hour']:.1f} items/h over the last {args.window / 3600:g} h"
+    if st["mean_duration_s"] is not None:
+        rate += f", {st['mean_duration_s']:.0f} s per item"
+    if st["eta_h"] is not None:
+        rate += f", ETA {st['eta_h']:.1f} h"
+    print(rate)
+    for item, r in sorted(st["running_items"].items()):
+        print(f"  running  {item}  {r['worker']}  {r['age_s']:.0f} s")
+    for item in st["expired"]:
+        print(f"  expired  {item}")
+    for item, n in sorted(st["failed"].items()):
+        print(f"  failed   {item}  {n} attempt(s)")
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    sub = p.add_subparsers(dest="command", required=True)
+
+    def add(name, fn, help):
+        sp = sub.add_parser(name, help=help)
+        sp.add_argument("queue", help="queue directory (shared between nodes)")
+        sp.add_argument("--ttl", type=float, default=600.0, help="lease time-to-live in seconds")
+        sp.add_argument("--max-attempts", type=int, default=3)
+        sp.set_defaults(fn=fn)
+        return sp
+
+    sp = add("enqueue", cmd_enqueue, "add videos to the queue")
+    sp.add_argument("--source", "-s", required=True, help="video file or directory")
+    sp.add_argument("--pattern", default="*.mp4")
+    sp.add_argument("--recursive", action="store_true")
+    sp.add_argument("--config-name", default="defaults", help="hydra config for run_track")
+    sp.add_argument("overrides", nargs="*", help="extra hydra overrides for run_track")
+
+    sp = add("work", cmd_work, "process items until the queue is drained")
+    sp.add_argument("--procs", type=int, default=1, help="worker processes on this machine")
+    sp.add_argument("--worker", help="worker id prefix (default host-pid)")
+    sp.add_argument("--poll", type=float, default=0.0, help="keep polling every N s when idle")
+
+    sp = add("status", cmd_status, "report progress and throughput")
+    sp.add_argument("--window", type=float, default=3600.0, help="throughput window in seconds")
+    sp.add_argument("--json", action="store_true")
+
+    args = p.parse_args()
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
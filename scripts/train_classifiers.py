@@ -2,14 +2,17 @@ import hydra
 import numpy as np
 from omegaconf import DictConfig
 
+from traffic.classify.compiled import COMPILABLE, compile_model, save_compiled
 from traffic.classify.evaluate import crossval_scores
 from traffic.classify.models import make_model
 from traffic.io.dataset_loader import get_paths
 from traffic.io.serialization import read_parquet
+from traffic.utils.metrics import stage, start_run
 
 
 @hydra.main(config_path="../configs", config_name="defaults", version_base=None)
 def main(cfg: DictConfig):
+    metrics = start_run("train_classifiers", cfg)
     _, _, processed = get_paths(cfg.dataset)
     Xdf = read_parquet(processed / "features.parquet")
 
@@ -32,9 +35,25 @@ def main(cfg: DictConfig):
         print("No features found. Run gen_features.py first.")
         return
 
-    clf = make_model(cfg.clf.name)
-    scores = crossval_scores(clf, X, y, k=5, repeats=2, seed=42)
+    params = dict(cfg.clf.get("params", None) or {})
+    do_compile = bool(cfg.clf.get("compile", False))
+    if do_compile and cfg.clf.name.lower() not in COMPILABLE:
+        print(f"Not compiling {cfg.clf.name}: only {', '.join(COMPILABLE)} can be compiled")
+        do_compile = False
+    clf = make_model(cfg.clf.name, **params)
+    with stage("crossval", items=len(X)):
+        scores = crossval_scores(clf, X, y, k=5, repeats=2, seed=42)
+    metrics.gauge("balanced_accuracy", scores.mean())
+    if do_compile:
+        # final model on all tracks, exported for sklearn-free per-frame inference
+        with stage("compile", items=len(X)):
+            model = compile_model(make_model(cfg.clf.name, **params).fit(X, y))
+        out = processed / f"classifier_{cfg.clf.name}.npz"
+        save_compiled(model, out)
+        print(f"Compiled {cfg.clf.name} -> {out}")
+    metrics.write(processed)
     print(f"{cfg.clf.name} balanced-accuracy: mean={scores.mean():.3f} +- {scores.std():.3f}")
+    print(metrics.summary())
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+"""Successive-halving search over classifier hyperparameters and FVS presets.
+
+Builds the feature matrix of every preset in ``search.presets`` from one flattened copy
+of trajectories.parquet, labels tracks by exit_groups.parquet and searches the
+``search.kinds`` grids (traffic.classify.search). Every evaluation is written to
+clf_search.csv and the balanced-accuracy vs predict-latency Pareto front of the final
+rung to clf_pareto.csv.
+
+    python scripts/tune_classifiers.py dataset=bellevue_116th_ne12th search.n_jobs=8
+"""
+
+import hydra
+import numpy as np
+from omegaconf import DictConfig
+
+from traffic.classify.search import successive_halving
+from traffic.features.vector_specs import FVS
+from traffic.features.vectorize import featurize_flat
+from traffic.io.dataset_loader import get_paths
+from traffic.io.serialization import read_parquet
+from traffic.trajectories.flat import flatten_tracks
+from traffic.utils.metrics import stage, start_run
+
+
+@hydra.main(config_path="../configs", config_name="defaults", version_base=None)
+def main(cfg: DictConfig):
+    metrics = start_run("tune_classifiers", cfg)
+    _, _, processed = get_paths(cfg.dataset)
+    opts = cfg.search
+    with stage("load"):
+        flat = flatten_tracks(read_parquet(processed / "trajectories.parquet"))
+        ydf = read_parquet(processed / "exit_groups.parquet")
+    ymap = dict(zip(ydf["track_id"], ydf["exit_group"]))
+    y = np.array([ymap.get(t, -1) for t in flat.track_ids], dtype=int)
+    with stage("featurize", items=len(flat)):
+        features = {p: featurize_flat(flat, FVS[p]) for p in opts.presets}
+
+    result = successive_halving(
+        features,
+        y,
+        kinds=list(opts.kinds),
+        eta=int(opts.eta),
+        n_jobs=int(opts.n_jobs),
+        seed=int(opts.seed),
+        min_samples=int(opts.min_samples),
+        max_folds=int(opts.max_folds),
+        max_iter=int(opts.max_iter),
+        latency_batch=int(opts.latency_batch),
+    )
+    result.history.to_csv(processed / "clf_search.csv", index=False)
+    result.front.to_csv(processed / "clf_pareto.csv", index=False)
+    metrics.count("evaluations", len(result.history))
+    metrics.gauge("balanced_accuracy", result.front["balanced_accuracy"].max())
+    metrics.write(processed)
+
+    cols = ["candidate", "n_samples", "n_folds", "balanced_accuracy", "latency_us"]
+    print(f"{len(result.history)} evaluations over {result.history['rung'].nunique()} rungs")
+    print("\nPareto front (balanced accuracy vs predict latency):")
+    print(result.front[cols].to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    print(metrics.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -54,16 +54,25 @@ Quick Diagnostic:
 - 2-5 clusters → Still too conservative (decrease xi, min_samples)
 - 8-20 clusters → Good range for intersection
 - 50+ clusters → Too aggressive (increase xi, min_samples)
+
+Quality Scores:
+--------------
+Each combination is also scored with traffic.cluster.quality (sampled silhouette,
+Davies-Bouldin and approximate DBCV), in parallel over the grid. Among combinations with a
+plausible cluster count prefer high dbcv/silhouette and low davies_bouldin; dbcv also
+penalizes a large outlier share.
 """
 
+import os
 from pathlib import Path
 
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 from sklearn.cluster import OPTICS
 from sklearn.preprocessing import StandardScaler
 
+from traffic.cluster.quality import score_labelings
+
 
 def normalize_coordinates(entry_exit_points):
     """Normalize entry-exit coordinates to [0,1] scale."""
@@ -78,6 +87,8 @@ def normalize_coordinates(entry_exit_points):
 
 def plot_reachability(model, labels):
     """Plot reachability plot to visualize cluster structure."""
+    import matplotlib.pyplot as plt
+
     reachability = model.reachability_[model.ordering_]
     labels_ordered = labels[model.ordering_]
 
@@ -95,7 +106,7 @@ def plot_reachability(model, labels):
     return fig
 
 
-def tune_optics_grid_search(entry_exit_points, param_grid):
+def tune_optics_grid_search(entry_exit_points, param_grid, score=True, n_jobs=1, **quality):
     """
     Try multiple parameter combinations and report results.
 
@@ -104,14 +115,20 @@ def tune_optics_grid_search(entry_exit_points, param_grid):
         'xi': [0.01, 0.03, 0.05],
         'max_eps': [0.1, 0.15, 0.2]
     }
+
+    With score=True, silhouette, davies_bouldin, dbcv and score_s (seconds spent scoring)
+    columns are added; scoring runs on n_jobs processes and **quality goes to
+    traffic.cluster.quality.ClusterQuality (min_pts, sample, per_cluster, seed).
     """
     results = []
+    labelings = []
 
     for min_samp in param_grid["min_samples"]:
         for xi_val in param_grid["xi"]:
             for max_eps_val in param_grid["max_eps"]:
                 model = OPTICS(min_samples=min_samp, xi=xi_val, max_eps=max_eps_val)
                 labels = model.fit_predict(entry_exit_points)
+                labelings.append(labels)
 
                 n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
                 n_outliers = (labels == -1).sum()
@@ -128,7 +145,11 @@ def tune_optics_grid_search(entry_exit_points, param_grid):
                     }
                 )
 
-    return pd.DataFrame(results)
+    results = pd.DataFrame(results)
+    if score:
+        scores = score_labelings(entry_exit_points, labelings, n_jobs=n_jobs, **quality)
+        results = pd.concat([results, scores], axis=1)
+    return results
 
 
 # Example usage:
@@ -159,7 +180,7 @@ if __name__ == "__main__":
     }
 
     print("\nTuning OPTICS parameters...")
-    results = tune_optics_grid_search(exy_norm, param_grid)
+    results = tune_optics_grid_search(exy_norm, param_grid, n_jobs=os.cpu_count() or 1)
 
     # Show results sorted by number of clusters
     print("\nParameter tuning results:")
@@ -168,5 +189,5 @@ if __name__ == "__main__":
     # Find parameters that give reasonable cluster count (8-20)
     good_params = results[(results["n_clusters"] >= 8) & (results["n_clusters"] <= 20)]
     if len(good_params) > 0:
-        print("\nRecommended parameters (8-20 clusters):")
-        print(good_params.sort_values("n_clusters").to_string(index=False))
+        print("\nRecommended parameters (8-20 clusters, best DBCV first):")
+        print(good_params.sort_values("dbcv", ascending=False).to_string(index=False))
@@ -0,0 +1,195 @@
+"""Dependency-light inference for fitted classifiers.
+
+``compile_model`` turns a fitted sklearn ``MLPClassifier`` into a float32 NumPy forward
+pass and a fitted ``KNeighborsClassifier`` into a prebuilt neighbour search (a k-d tree
+for low-dimensional features, BLAS brute force with cached norms otherwise, mirroring
+sklearn's ``algorithm="auto"``) plus a vectorized vote, skipping sklearn's per-call
+validation and dispatch (which dominates when only a few active tracks are scored per
+frame). Compiled models are saved as an uncompressed
+``.npz`` with a JSON header; loading needs NumPy (and SciPy for KNN), not sklearn.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+
+from traffic.utils.lazy import lazy_import
+
+spatial = lazy_import("scipy.spatial")
+
+COMPILED_VERSION = 1
+# sklearn's "auto" switches from trees to brute force above this many features
+KD_TREE_MAX_DIM = 15
+
+
+class CompiledMLP:
+    kind = "mlp"
+
+    def __init__(self, weights, biases, classes, out_activation: str = "softmax"):
+        self.weights = [np.ascontiguousarray(w, dtype=np.float32) for w in weights]
+        self.biases = [np.ascontiguousarray(b, dtype=np.float32) for b in biases]
+        self.classes_ = np.asarray(classes)
+        self.out_activation = out_activation
+
+    @classmethod
+    def from_sklearn(cls, clf) -> "CompiledMLP":
+        if clf.activation != "relu":
+            raise ValueError(f"only relu hidden layers are compiled, got {clf.activation!r}")
+        return cls(clf.coefs_, clf.intercepts_, clf.classes_, clf.out_activation_)
+
+    def decision_function(self, X: np.ndarray) -> np.ndarray:
+        """Output-layer logits, (n, n_outputs)."""
+        h = np.asarray(X, dtype=np.float32)
+        for w, b in zip(self.weights[:-1], self.biases[:-1]):
+            h = h @ w
+            h += b
+            np.maximum(h, 0.0, out=h)
+        out = h @ self.weights[-1]
+        out += self.biases[-1]
+        return out
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        z = self.decision_function(X)
+        if self.out_activation == "logistic":
+            p = 1.0 / (1.0 + np.exp(-z))
+            return np.hstack([1.0 - p, p]) if len(self.classes_) == 2 else p
+        z -= z.max(axis=1, keepdims=True)
+        np.exp(z, out=z)
+        z /= z.sum(axis=1, keepdims=True)
+        return z
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        z = self.decision_function(X)
+        if self.out_activation == "logistic" and len(self.classes_) == 2:
+            return self.classes_[(z[:, 0] > 0).astype(np.intp)]
+        return self.classes_[z.argmax(axis=1)]
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        out = {f"w{i}": w for i, w in enumerate(self.weights)}
+        out.update({f"b{i}": b for i, b in enumerate(self.biases)})
+        out["classes"] = self.classes_
+        return out
+
+    def _params(self) -> dict:
+        return dict(n_layers=len(self.weights), out_activation=self.out_activation)
+
+    @classmethod
+    def _from_arrays(cls, arrays, params) -> "CompiledMLP":
+        n = params["n_layers"]
+        return cls(
+            [arrays[f"w{i}"] for i in range(n)],
+            [arrays[f"b{i}"] for i in range(n)],
+            arrays["classes"],
+            params["out_activation"],
+        )
+
+
+class CompiledKNN:
+    kind = "knn"
+
+    def __init__(self, X, y_encoded, classes, n_neighbors: int = 5, weights: str = "uniform"):
+        if weights not in ("uniform", "distance"):
+            raise ValueError(f"unsupported KNN weights {weights!r}")
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        self.y = np.asarray(y_encoded, dtype=np.int32)
+        self.classes_ = np.asarray(classes)
+        self.n_neighbors = int(n_neighbors)
+        self.weights = weights
+        if self.X.shape[1] <= KD_TREE_MAX_DIM:
+            self.tree, self.sq_norms = spatial.cKDTree(self.X), None
+        else:
+            self.tree, self.sq_norms = None, np.einsum("ij,ij->i", self.X, self.X)
+
+    def kneighbors(self, X: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Distances and training rows of the ``k`` nearest neighbours, nearest first."""
+        if self.tree is not None:
+            dist, idx = self.tree.query(X, k=k)
+            return dist.reshape(len(X), k), idx.reshape(len(X), k)
+        d2 = X @ self.X.T
+        d2 *= -2.0
+        d2 += self.sq_norms
+        d2 += np.einsum("ij,ij->i", X, X)[:, None]
+        if k < d2.shape[1]:
+            idx = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            d2 = np.take_along_axis(d2, idx, 1)
+        else:
+            idx = np.broadcast_to(np.arange(d2.shape[1]), d2.shape)
+        order = np.argsort(d2, axis=1, kind="stable")
+        idx, d2 = np.take_along_axis(idx, order, 1), np.take_along_axis(d2, order, 1)
+        return np.sqrt(np.maximum(d2, 0.0)), idx
+
+    @classmethod
+    def from_sklearn(cls, clf) -> "CompiledKNN":
+        if clf.effective_metric_ != "euclidean" or callable(clf.weights):
+            raise ValueError("only euclidean KNN with uniform/distance weights is compiled")
+        return cls(clf._fit_X, clf._y, clf.classes_, clf.n_neighbors, clf.weights)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float32))
+        k = min(self.n_neighbors, len(self.X))
+        dist, idx = self.kneighbors(X, k)
+        if self.weights == "distance":
+            # sklearn: exact matches take all the weight
+            with np.errstate(divide="ignore"):
+                w = 1.0 / dist
+            exact = dist == 0
+            has_exact = exact.any(axis=1)
+            w[has_exact] = exact[has_exact]
+        else:
+            w = np.ones(dist.shape)
+        n_cls = len(self.classes_)
+        rows = np.repeat(np.arange(len(X)), k)
+        votes = np.bincount(
+            rows * n_cls + self.y[idx].ravel(), weights=w.ravel(), minlength=len(X) * n_cls
+        ).reshape(len(X), n_cls)
+        return votes / votes.sum(axis=1, keepdims=True)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    def _arrays(self) -> dict[str, np.ndarray]:
+        return dict(X=self.X, y=self.y, classes=self.classes_)
+
+    def _params(self) -> dict:
+        return dict(n_neighbors=self.n_neighbors, weights=self.weights)
+
+    @classmethod
+    def _from_arrays(cls, arrays, params) -> "CompiledKNN":
+        return cls(arrays["X"], arrays["y"], arrays["classes"], **params)
+
+
+_KINDS = {c.kind: c for c in (CompiledMLP, CompiledKNN)}
+# make_model kinds that compile_model accepts
+COMPILABLE = tuple(_KINDS)
+
+
+def compile_model(clf):
+    """Compile a fitted ``MLPClassifier`` or ``KNeighborsClassifier`` (see ``make_model``)."""
+    name = type(clf).__name__
+    if name == "MLPClassifier":
+        return CompiledMLP.from_sklearn(clf)
+    if name == "KNeighborsClassifier":
+        return CompiledKNN.from_sklearn(clf)
+    raise TypeError(f"cannot compile {name}; supported: MLPClassifier, KNeighborsClassifier")
+
+
+def save_compiled(model, path: str | Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    header = dict(version=COMPILED_VERSION, kind=model.kind, params=model._params())
+    with open(path, "wb") as fh:
+        np.savez(fh, __header__=np.array(json.dumps(header)), **model._arrays())
+
+
+def load_compiled(path: str | Path):
+    with np.load(path, allow_pickle=False) as z:
+        header = json.loads(str(z["__header__"]))
+        if header.get("version") != COMPILED_VERSION:
+            raise ValueError(
+                f"{path}: compiled model version {header.get('version')} != {COMPILED_VERSION}"
+            )
+        arrays = {k: z[k] for k in z.files if k != "__header__"}
+    return _KINDS[header["kind"]]._from_arrays(arrays, header["params"])
@@ -0,0 +1,94 @@
+"""Early prediction: how well the exit group is predicted from a partial track.
+
+Every track is cut at several fractions of its observed frame span
+(:func:`traffic.features.vectorize.prefix_lengths`), and each ``make_model`` kind is
+cross-validated on the prefix features of each fraction. All (kind, fraction) cells use
+the same fold seeds, so the points of one curve are paired comparisons.
+
+``trajectories.parquet`` is smoothed over whole tracks (Savitzky-Golay, ``win=9``) and
+differentiated with central differences, so its values at a prefix's last sample already
+see up to ``win // 2`` (4) frames after the cut; scoring on them overstates early accuracy.
+Given the raw detector positions (``raw``), prefix features are instead rebuilt from the
+prefix alone (:func:`traffic.trajectories.build.prefix_states`), as if the track had
+ended at the cut.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from traffic.classify.evaluate import crossval_scores
+from traffic.classify.models import make_model
+from traffic.features.vector_specs import FVSpec
+from traffic.features.vectorize import featurize_flat, prefix_lengths
+from traffic.trajectories.build import prefix_states
+from traffic.trajectories.flat import FlatTracks
+from traffic.utils.metrics import stage
+
+DEFAULT_FRACTIONS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+def _score_cell(kind: str, X: np.ndarray, y: np.ndarray, k: int, repeats: int, seed: int):
+    return crossval_scores(make_model(kind), X, y, k=k, repeats=repeats, seed=seed)
+
+
+def early_prediction_curve(
+    flat: FlatTracks,
+    y: np.ndarray,
+    spec: FVSpec,
+    kinds=("mlp",),
+    fractions=DEFAULT_FRACTIONS,
+    k: int = 5,
+    repeats: int = 2,
+    seed: int = 42,
+    n_jobs: int = 1,
+    raw: FlatTracks | None = None,
+    fps: float | None = None,
+) -> pd.DataFrame:
+    """Balanced accuracy per (kind, observed fraction); ``y`` is aligned with ``flat``.
+
+    ``raw`` (``frame, cx, cy`` of the tracks ``flat`` was built from, at ``fps``) makes the
+    prefix features causal; without it they leak (see module docstring).
+
+    Returns one row per cell with ``kind, fraction, balanced_accuracy, std,
+    mean_observed`` (the mean share of samples kept).
+    """
+    fractions = list(fractions)
+    if raw is not None:
+        if fps is None:
+            raise ValueError("raw prefixes need the fps the trajectories were built at")
+        if not (
+            np.array_equal(raw.track_ids, flat.track_ids)
+            and np.array_equal(raw.lengths, flat.lengths)
+        ):
+            raise ValueError("raw tracks do not match the trajectories; rebuild trajectories")
+    with stage("early.features", items=len(flat) * len(fractions)):
+        lengths = prefix_lengths(flat, fractions)
+        X = [
+            featurize_flat(flat, spec, n, None if raw is None else prefix_states(raw, n, fps))
+            for n in lengths
+        ]
+        observed = (lengths / flat.lengths).mean(axis=1)
+    cells = [(kind, i) for kind in kinds for i in range(len(fractions))]
+    args = [(kind, X[i], y, k, repeats, seed) for kind, i in cells]
+    with stage("early.crossval", items=len(cells)):
+        if n_jobs > 1:
+            with ProcessPoolExecutor(n_jobs) as ex:
+                scores = list(ex.map(_score_cell, *zip(*args)))
+        else:
+            scores = [_score_cell(*a) for a in args]
+    return pd.DataFrame(
+        [
+            dict(
+                kind=kind,
+                fraction=fractions[i],
+                balanced_accuracy=float(s.mean()),
+                std=float(s.std()),
+                mean_observed=float(observed[i]),
+            )
+            for (kind, i), s in zip(cells, scores)
+        ]
+    )
@@ -1,24 +1,35 @@
-from sklearn.neighbors import KNeighborsClassifier
-from sklearn.neural_network import MLPClassifier
-from sklearn.svm import SVC
-from sklearn.tree import DecisionTreeClassifier
+from traffic.utils.lazy import lazy_import
 
+neighbors = lazy_import("sklearn.neighbors")
+neural_network = lazy_import("sklearn.neural_network")
+svm = lazy_import("sklearn.svm")
+tree = lazy_import("sklearn.tree")
 
-def make_model(kind: str):
+# Baseline hyperparameters per kind; make_model(kind, **params) overrides any of them
+DEFAULT_PARAMS = {
+    "knn": dict(n_neighbors=7, weights="distance"),
+    "svm": dict(kernel="rbf", probability=True, C=2.0, gamma="scale"),
+    "dt": dict(max_depth=14, random_state=42),
+    "mlp": dict(
+        hidden_layer_sizes=(64, 64),
+        activation="relu",
+        alpha=1e-4,
+        max_iter=500,
+        early_stopping=True,
+        random_state=42,
+    ),
+}
+
+
+def make_model(kind: str, **params):
     k = kind.lower()
+    if k not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown classifier kind: {kind}")
+    params = {**DEFAULT_PARAMS[k], **params}
     if k == "knn":
-        return KNeighborsClassifier(n_neighbors=7, weights="distance")
+        return neighbors.KNeighborsClassifier(**params)
     if k == "svm":
-        return SVC(kernel="rbf", probability=True, C=2.0, gamma="scale")
+        return svm.SVC(**params)
     if k == "dt":
-        return DecisionTreeClassifier(max_depth=14, random_state=42)
-    if k == "mlp":
-        return MLPClassifier(
-            hidden_layer_sizes=(64, 64),
-            activation="relu",
-            alpha=1e-4,
-            max_iter=500,
-            early_stopping=True,
-            random_state=42,
-        )
-    raise ValueError(f"Unknown classifier kind: {kind}")
+        return tree.DecisionTreeClassifier(**params)
+    return neural_network.MLPClassifier(**params)
@@ -0,0 +1,236 @@
+"""Successive-halving search over classifier hyperparameters and FVS presets.
+
+Every candidate (``make_model`` kind x hyperparameters x feature preset) is first scored
+on a small budget: a subsample of the tracks, few CV folds and, for the MLP, few
+iterations. After each rung the best ``1 / eta`` by balanced accuracy survive, together
+with the rung's accuracy/latency Pareto front (so fast, slightly weaker models are not
+discarded early), and the budget grows by ``eta`` until the full data and fold count are
+reached. Fold splits are computed once per rung and shared by all candidates; sample
+subsets are nested, so rung ``r + 1`` extends the data of rung ``r``.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from traffic.classify.models import make_model
+from traffic.utils.lazy import lazy_import
+from traffic.utils.metrics import stage
+
+skmetrics = lazy_import("sklearn.metrics")
+model_selection = lazy_import("sklearn.model_selection")
+
+DEFAULT_SPACE = {
+    "knn": {"n_neighbors": [3, 5, 7, 11, 15], "weights": ["uniform", "distance"]},
+    "svm": {"C": [0.5, 2.0, 8.0], "gamma": ["scale", 0.5, 2.0]},
+    "dt": {"max_depth": [6, 10, 14, 20, None], "min_samples_leaf": [1, 5]},
+    "mlp": {
+        "hidden_layer_sizes": [(32,), (64, 64), (128, 64)],
+        "alpha": [1e-5, 1e-4, 1e-3],
+    },
+}
+
+
+@dataclass(frozen=True)
+class Candidate:
+    kind: str
+    preset: str
+    params: tuple[tuple[str, object], ...]
+
+    @property
+    def name(self) -> str:
+        args = ",".join(f"{k}={v}" for k, v in self.params)
+        return f"{self.kind}[{self.preset}]({args})"
+
+
+@dataclass(frozen=True)
+class Rung:
+    n_samples: int
+    n_folds: int
+    max_iter: int
+
+
+@dataclass
+class SearchResult:
+    history: pd.DataFrame  # one row per (rung, candidate)
+    front: pd.DataFrame  # Pareto front of the last rung
+
+
+def candidates(kinds, presets, space: dict | None = None) -> list[Candidate]:
+    space = DEFAULT_SPACE if space is None else space
+    out = []
+    for kind in kinds:
+        grid = space.get(kind, {})
+        keys = sorted(grid)
+        for values in itertools.product(*(grid[k] for k in keys)):
+            for preset in presets:
+                out.append(Candidate(kind, preset, tuple(zip(keys, values))))
+    return out
+
+
+def budget_schedule(
+    n_total: int,
+    n_candidates: int,
+    eta: int = 3,
+    min_samples: int = 300,
+    min_folds: int = 2,
+    max_folds: int = 5,
+    max_iter: int = 500,
+) -> list[Rung]:
+    """Geometric budgets ending at the full data, ``max_folds`` folds and ``max_iter``."""
+    n_rungs = 1 + int(math.floor(math.log(max(n_candidates, 1), eta)))
+    n_rungs = max(
+        1, min(n_rungs, 1 + int(math.floor(math.log(max(n_total / min_samples, 1), eta))))
+    )
+    rungs = []
+    for r in range(n_rungs):
+        shrink = eta ** (n_rungs - 1 - r)
+        frac = r / (n_rungs - 1) if n_rungs > 1 else 1.0
+        rungs.append(
+            Rung(
+                n_samples=max(min(min_samples, n_total), n_total // shrink),
+                n_folds=int(round(min_folds + frac * (max_folds - min_folds))),
+                max_iter=max(20, max_iter // shrink),
+            )
+        )
+    return rungs
+
+
+class FoldCache:
+    """Stratified splits per rung, as row indices into the full feature matrices.
+
+    Rung subsets are prefixes of one fixed permutation, so they are nested.
+    """
+
+    def __init__(self, y: np.ndarray, seed: int = 42):
+        self.y = np.asarray(y)
+        self.perm = np.random.default_rng(seed).permutation(len(self.y))
+        self.seed = seed
+        self._splits: dict[tuple[int, int], list[tuple[np.ndarray, np.ndarray]]] = {}
+
+    def splits(self, n_samples: int, n_folds: int) -> list[tuple[np.ndarray, np.ndarray]]:
+        key = (n_samples, n_folds)
+        if key not in self._splits:
+            rows = self.perm[:n_samples]
+            y = self.y[rows]
+            k = int(max(2, min(n_folds, np.unique(y, return_counts=True)[1].max())))
+            skf = model_selection.StratifiedKFold(n_splits=k, shuffle=True, random_state=self.seed)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")  # rare classes with fewer members than folds
+                self._splits[key] = [(rows[tr], rows[te]) for tr, te in skf.split(rows, y)]
+        return self._splits[key]
+
+
+def pareto_front(
+    df: pd.DataFrame, score: str = "balanced_accuracy", cost: str = "latency_us"
+) -> pd.DataFrame:
+    """Rows not dominated by another row with higher ``score`` and lower ``cost``."""
+    d = df.sort_values([cost, score], ascending=[True, False])
+    best = np.maximum.accumulate(d[score].to_numpy())
+    keep = np.r_[True, d[score].to_numpy()[1:] > best[:-1]]
+    return d[keep].sort_values(cost)
+
+
+_STATE: dict = {}
+
+
+def _init_worker(features: dict[str, np.ndarray], y: np.ndarray, folds: FoldCache) -> None:
+    _STATE.update(features=features, y=y, folds=folds)
+
+
+def _evaluate(cand: Candidate, rung: Rung, latency_batch: int) -> dict:
+    X, y = _STATE["features"][cand.preset], _STATE["y"]
+    params = dict(cand.params)
+    if cand.kind == "mlp":
+        params["max_iter"] = rung.max_iter
+    scores, fit_s = [], 0.0
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # ConvergenceWarning on the small budgets
+        for tr, te in _STATE["folds"].splits(rung.n_samples, rung.n_folds):
+            clf = make_model(cand.kind, **params)
+            t0 = time.perf_counter()
+            clf.fit(X[tr], y[tr])
+            fit_s += time.perf_counter() - t0
+            scores.append(skmetrics.balanced_accuracy_score(y[te], clf.predict(X[te])))
+        batch = X[te[:latency_batch]]
+        times = []
+        for _ in range(15):
+            t0 = time.perf_counter()
+            clf.predict(batch)
+            times.append(time.perf_counter() - t0)
+    return dict(
+        candidate=cand.name,
+        kind=cand.kind,
+        preset=cand.preset,
+        params=repr(dict(cand.params)),
+        n_samples=rung.n_samples,
+        n_folds=rung.n_folds,
+        max_iter=rung.max_iter if cand.kind == "mlp" else None,
+        balanced_accuracy=float(np.mean(scores)),
+        fit_s=fit_s,
+        latency_us=float(np.median(times)) * 1e6,
+    )
+
+
+def successive_halving(
+    features: dict[str, np.ndarray],
+    y: np.ndarray,
+    kinds=("knn", "dt", "mlp"),
+    space: dict | None = None,
+    eta: int = 3,
+    n_jobs: int = 1,
+    seed: int = 42,
+    min_samples: int = 300,
+    max_folds: int = 5,
+    max_iter: int = 500,
+    latency_batch: int = 1,
+) -> SearchResult:
+    """Search ``kinds`` x ``space`` x ``features`` (preset name -> X aligned with ``y``).
+
+    ``latency_batch`` is the batch size of the timed ``predict`` call (1 = per-frame use).
+    """
+    y = np.asarray(y)
+    pool = candidates(kinds, list(features), space)
+    rungs = budget_schedule(len(y), len(pool), eta, min_samples, 2, max_folds, max_iter)
+    folds = FoldCache(y, seed)
+    for r in rungs:
+        folds.splits(r.n_samples, r.n_folds)  # computed once, shipped to every worker
+
+    ex = (
+        ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=(features, y, folds))
+        if n_jobs > 1
+        else None
+    )
+    if ex is None:
+        _init_worker(features, y, folds)
+    history = []
+    try:
+        for i, rung in enumerate(rungs):
+            with stage("search.rung", items=len(pool)):
+                if ex is None:
+                    rows = [_evaluate(c, rung, latency_batch) for c in pool]
+                else:
+                    rows = list(
+                        ex.map(_evaluate, pool, [rung] * len(pool), [latency_batch] * len(pool))
+                    )
+            df = pd.DataFrame(rows).assign(rung=i)
+            history.append(df)
+            if i == len(rungs) - 1:
+                break
+            n_keep = max(1, math.ceil(len(pool) / eta))
+            keep = set(df.nlargest(n_keep, "balanced_accuracy")["candidate"])
+            keep |= set(pareto_front(df)["candidate"])
+            pool = [c for c in pool if c.name in keep]
+    finally:
+        if ex is not None:
+            ex.shutdown()
+    hist = pd.concat(history, ignore_index=True)
+    return SearchResult(history=hist, front=pareto_front(hist[hist["rung"] == hist["rung"].max()]))
@@ -1,9 +1,14 @@
 import numpy as np
-from sklearn.cluster import KMeans
+
+from traffic.utils.lazy import lazy_import
+from traffic.utils.metrics import stage
+
+cluster = lazy_import("sklearn.cluster")
 
 
 def consolidate_by_exit(exit_points: np.ndarray, k: int = 8):
     """Second-stage consolidation: K-Means on exit representatives."""
-    km = KMeans(n_clusters=k, n_init=10, random_state=42)
-    exit_labels = km.fit_predict(exit_points)
+    km = cluster.KMeans(n_clusters=k, n_init=10, random_state=42)
+    with stage("cluster.consolidate", items=len(exit_points)):
+        exit_labels = km.fit_predict(exit_points)
     return exit_labels, km
@@ -0,0 +1,301 @@
+"""Incremental turning-movement cube: counts, speeds and travel times per (movement, time bin).
+
+Each labelled track contributes once, to the time bin of its first frame, with
+
+* its mean speed (mean of ``hypot(vx, vy)`` over its samples, per second) and
+* its travel time (``(last frame - first frame) / fps`` seconds).
+
+A movement is the tuple of the track's label columns (``by``: ``cluster``, ``exit_group``
+or both). Every (movement, bin) cell keeps the track count, sums and sums of squares
+(mean and standard deviation), and sparse log-bucket histograms of both values: value
+``v`` goes to bucket ``ceil(log_gamma v)`` with ``gamma = (1 + alpha) / (1 - alpha)``, so
+quantiles are recovered within relative error ``alpha`` (the DDSketch scheme). Everything
+is additive, so new data merges into the cube with one grouped sum and history is never
+re-read.
+
+A scene's cube is cached in ``<processed>/movement_cube.npz`` with the fingerprints of the
+trajectory partitions already ingested (as for the density rasters, partitions are assumed
+to hold whole tracks) and the labels of the tracks it holds. Re-clustering only rebuilds the
+cube when a track already counted got a different label (or one it lacked before); labels
+for new tracks alone just extend it.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.io.serialization import read_parquet
+from traffic.io.sources import fingerprint, trajectory_sources
+from traffic.utils.metrics import timed
+
+CUBE_VERSION = 1
+STATS = ("count", "speed_sum", "speed_sq", "travel_sum", "travel_sq")
+METRICS = ("speed", "travel")
+LABEL_FILES = {"cluster": "clusters.parquet", "exit_group": "exit_groups.parquet"}
+
+
+def _group_sum(keys: np.ndarray, *weights: np.ndarray):
+    """Unique rows of ``keys`` and the per-row sums of each weight array."""
+    uniq, inv = np.unique(keys, axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    return uniq, [np.bincount(inv, weights=w, minlength=len(uniq)) for w in weights]
+
+
+class MovementCube:
+    def __init__(
+        self,
+        by: tuple[str, ...] = ("cluster",),
+        bin_s: float = 900.0,
+        fps: float = 30.0,
+        alpha: float = 0.01,
+        min_value: float = 1e-6,
+    ):
+        if not 0 < alpha < 1:
+            raise ValueError(f"alpha must be in (0, 1), got {alpha}")
+        self.by = tuple(by)
+        self.bin_s = float(bin_s)
+        self.fps = float(fps)
+        self.alpha = float(alpha)
+        self.min_value = float(min_value)
+        self.gamma = (1 + self.alpha) / (1 - self.alpha)
+        # cell keys: one column per ``by`` label, then the time bin
+        self.keys = np.zeros((0, len(self.by) + 1), dtype=np.int64)
+        self.stats = {k: np.zeros(0) for k in STATS}
+        # sparse histograms: rows of (cell, metric, bucket) and their counts
+        self.sketch = np.zeros((0, 3), dtype=np.int64)
+        self.sketch_n = np.zeros(0, dtype=np.int64)
+        # ledger of ingested tracks: (track_id, *labels) rows, and ids that had no label
+        self.tracks = np.zeros((0, len(self.by) + 1), dtype=np.int64)
+        self.unlabeled = np.zeros(0, dtype=np.int64)
+        self.ingested: dict[str, str] = {}
+        self.meta: dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def settings(self) -> dict:
+        return dict(by=list(self.by), bin_s=self.bin_s, fps=self.fps, alpha=self.alpha)
+
+    def bucket(self, v: np.ndarray) -> np.ndarray:
+        v = np.maximum(np.asarray(v, dtype=np.float64), self.min_value)
+        return np.ceil(np.log(v) / np.log(self.gamma)).astype(np.int64)
+
+    def bucket_value(self, b: np.ndarray) -> np.ndarray:
+        """Representative value of a bucket (relative error at most ``alpha``)."""
+        return 2 * self.gamma ** np.asarray(b, dtype=np.float64) / (self.gamma + 1)
+
+    def add_tracks(self, labels: np.ndarray, frame0, speed, travel) -> None:
+        """Merge per-track values; ``labels`` is ``(n, len(by))``."""
+        labels = np.asarray(labels, dtype=np.int64).reshape(-1, len(self.by))
+        if not len(labels):
+            return
+        speed = np.asarray(speed, dtype=np.float64)
+        travel = np.asarray(travel, dtype=np.float64)
+        tbin = np.floor(np.asarray(frame0, dtype=np.float64) / (self.bin_s * self.fps))
+        keys = np.column_stack([labels, tbin.astype(np.int64)])
+        new_vals = [np.ones(len(keys)), speed, speed**2, travel, travel**2]
+        all_keys = np.vstack([self.keys, keys])
+        uniq, inv = np.unique(all_keys, axis=0, return_inverse=True)
+        inv = inv.reshape(-1)
+        self.stats = {
+            k: np.bincount(inv, weights=np.r_[self.stats[k], v], minlength=len(uniq))
+            for k, v in zip(STATS, new_vals)
+        }
+        # old sketch rows follow their cells to the new numbering
+        old = self.sketch.copy()
+        old[:, 0] = inv[: len(self.keys)][old[:, 0]]
+        cell = inv[len(self.keys) :]
+        new = np.vstack(
+            [
+                np.column_stack([cell, np.zeros_like(cell), self.bucket(speed)]),
+                np.column_stack([cell, np.ones_like(cell), self.bucket(travel)]),
+            ]
+        )
+        rows, (n,) = _group_sum(
+            np.vstack([old, new]), np.r_[self.sketch_n, np.ones(len(new))].astype(np.float64)
+        )
+        self.keys, self.sketch, self.sketch_n = uniq, rows, n.astype(np.int64)
+
+    def add_trajectories(self, trajs: pd.DataFrame, labels: pd.DataFrame) -> int:
+        """Reduce a long trajectories table per track and merge the labelled tracks.
+
+        ``labels`` has ``track_id`` and the ``by`` columns; returns the number of tracks
+        without a label (skipped).
+        """
+        if not len(trajs):
+            return 0
+        tid, inv = np.unique(trajs["track_id"].to_numpy(), return_inverse=True)
+        frame = trajs["frame"].to_numpy().astype(np.float64)
+        n = np.bincount(inv)
+        speed = np.bincount(inv, weights=np.hypot(trajs["vx"], trajs["vy"])) / n
+        first = np.full(len(tid), np.inf)
+        last = np.full(len(tid), -np.inf)
+        np.minimum.at(first, inv, frame)
+        np.maximum.at(last, inv, frame)
+        ids = labels["track_id"].to_numpy()
+        order = np.argsort(ids)
+        ids = ids[order]
+        pos = np.clip(np.searchsorted(ids, tid), 0, max(len(ids) - 1, 0))
+        known = ids[pos] == tid if len(ids) else np.zeros(len(tid), dtype=bool)
+        lab = np.column_stack([labels[c].to_numpy()[order][pos[known]] for c in self.by])
+        self.add_tracks(lab, first[known], speed[known], (last - first)[known] / self.fps)
+        self.tracks = np.vstack([self.tracks, np.column_stack([tid[known], lab])])
+        self.unlabeled = np.r_[self.unlabeled, tid[~known]].astype(np.int64)
+        return int((~known).sum())
+
+    def relabelled(self, labels: pd.DataFrame) -> bool:
+        """Whether ``labels`` disagree with the labels the ingested tracks were counted with."""
+        cur = labels[["track_id", *self.by]].to_numpy().astype(np.int64)
+        if np.isin(self.unlabeled, cur[:, 0]).any():
+            return True
+        cur = cur[np.argsort(cur[:, 0], kind="stable")]
+        pos = np.clip(np.searchsorted(cur[:, 0], self.tracks[:, 0]), 0, max(len(cur) - 1, 0))
+        if not len(cur):
+            return len(self.tracks) > 0
+        return not np.array_equal(cur[pos], self.tracks)
+
+    def quantiles(self, metric: str, q: float) -> np.ndarray:
+        """Per-cell ``q``-quantile (0..1) of ``metric`` (``speed`` or ``travel``)."""
+        m = METRICS.index(metric)
+        rows = self.sketch[:, 1] == m
+        cell, b, n = self.sketch[rows, 0], self.sketch[rows, 2], self.sketch_n[rows]
+        order = np.lexsort((b, cell))
+        cell, b, n = cell[order], b[order], n[order]
+        total = np.bincount(cell, weights=n, minlength=len(self))
+        cum = np.cumsum(n)
+        # count before each cell's first row; the quantile is the first row of the cell
+        # whose cumulative count reaches rank ceil(q * total)
+        start = np.r_[0, cum][np.searchsorted(cell, np.arange(len(self)))]
+        rank = np.maximum(np.ceil(q * total), 1)
+        idx = np.searchsorted(cum, start + rank, side="left")
+        out = np.full(len(self), np.nan)
+        has = total > 0
+        out[has] = self.bucket_value(b[idx[has]])
+        return out
+
+    def to_frame(self, quantiles=(50, 85)) -> pd.DataFrame:
+        """One row per (movement, bin) with counts, speed and travel-time summaries."""
+        out = {c: self.keys[:, i] for i, c in enumerate(self.by)}
+        out["bin"] = self.keys[:, -1]
+        out["bin_start_s"] = self.keys[:, -1] * self.bin_s
+        n = self.stats["count"]
+        out["count"] = n.astype(np.int64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for m in METRICS:
+                mean = self.stats[f"{m}_sum"] / n
+                out[f"{m}_mean"] = mean
+                out[f"{m}_std"] = np.sqrt(np.maximum(self.stats[f"{m}_sq"] / n - mean**2, 0))
+                for q in quantiles:
+                    out[f"{m}_p{q:g}"] = self.quantiles(m, q / 100)
+        return pd.DataFrame(out)
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = dict(
+            version=CUBE_VERSION,
+            min_value=self.min_value,
+            ingested=self.ingested,
+            meta=self.meta,
+            **self.settings(),
+        )
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(
+            tmp,
+            __header__=np.array(json.dumps(header)),
+            keys=self.keys,
+            sketch=self.sketch,
+            sketch_n=self.sketch_n,
+            tracks=self.tracks,
+            unlabeled=self.unlabeled,
+            **self.stats,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "MovementCube":
+        with np.load(path) as z:
+            header = json.loads(str(z["__header__"]))
+            if header.get("version") != CUBE_VERSION:
+                raise ValueError(f"{path}: movement cube version {header.get('version')}")
+            self = cls(
+                tuple(header["by"]),
+                header["bin_s"],
+                header["fps"],
+                header["alpha"],
+                header["min_value"],
+            )
+            self.keys, self.sketch, self.sketch_n = z["keys"], z["sketch"], z["sketch_n"]
+            self.stats = {k: z[k] for k in STATS}
+            self.tracks, self.unlabeled = z["tracks"], z["unlabeled"]
+        self.ingested = header["ingested"]
+        self.meta = header["meta"]
+        return self
+
+
+def load_labels(processed: Path, by: tuple[str, ...]) -> pd.DataFrame:
+    """``track_id`` plus the ``by`` label columns, joined from the clustering outputs."""
+    out = None
+    for col in by:
+        if col not in LABEL_FILES:
+            raise ValueError(f"unknown movement label {col!r}; expected one of {list(LABEL_FILES)}")
+        df = read_parquet(processed / LABEL_FILES[col], columns=["track_id", col])
+        out = df if out is None else out.merge(df, on="track_id", how="inner")
+    return out
+
+
+@timed("movements.update")
+def update_movement_cube(
+    processed: str | Path,
+    by: tuple[str, ...] = ("cluster",),
+    bin_s: float = 900.0,
+    fps: float = 30.0,
+    alpha: float = 0.01,
+    cache_name: str = "movement_cube.npz",
+) -> MovementCube:
+    """Load the scene's cube and merge trajectory partitions it has not seen.
+
+    The cube is rebuilt when its settings change, when an already-ingested partition was
+    rewritten or removed, or when new labels disagree with those of tracks already counted.
+    """
+    processed = Path(processed)
+    cache = processed / cache_name
+    by = tuple(by)
+    labels_fp = ",".join(fingerprint(processed / LABEL_FILES[c]) for c in by if c in LABEL_FILES)
+    # partitions are keyed relative to processed/, so a different working directory (hydra)
+    # does not make them look new
+    sources = {p.relative_to(processed).as_posix(): p for p in trajectory_sources(processed)}
+
+    cube = MovementCube.load(cache) if cache.exists() else None
+    fresh = MovementCube(by, bin_s, fps, alpha)
+    if cube is not None:
+        stale = (
+            cube.settings() != fresh.settings()
+            or bool(set(cube.ingested) - set(sources))  # deleted or renamed: cannot subtract
+            or any(
+                k in cube.ingested and cube.ingested[k] != fingerprint(p)
+                for k, p in sources.items()
+            )
+        )
+        if stale:
+            cube = None
+
+    todo = [k for k in sources if cube is None or k not in cube.ingested]
+    if not todo and cube is not None and cube.meta.get("labels") == labels_fp:
+        return cube
+    labels = load_labels(processed, by)
+    if cube is not None and cube.meta.get("labels") != labels_fp and cube.relabelled(labels):
+        cube = None
+        todo = list(sources)
+    cube = cube if cube is not None else fresh
+    cube.meta["labels"] = labels_fp
+    for k in todo:
+        df = read_parquet(sources[k], columns=["track_id", "frame", "vx", "vy"])
+        cube.add_trajectories(df, labels)
+        cube.ingested[k] = fingerprint(sources[k])
+    cube.save(cache)
+    return cube
@@ -1,6 +1,17 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 import numpy as np
 import pandas as pd
-from sklearn.cluster import OPTICS
+
+from traffic.utils.lazy import lazy_import
+from traffic.utils.metrics import stage
+
+if TYPE_CHECKING:
+    from sklearn.cluster import OPTICS
+
+cluster = lazy_import("sklearn.cluster")
 
 
 def optics_cluster(
@@ -26,8 +37,9 @@ def optics_cluster(
     model : OPTICS
         Fitted OPTICS model with reachability info
     """
-    model = OPTICS(min_samples=min_samples, xi=xi, max_eps=max_eps)
-    labels = model.fit_predict(entry_exit_points)
+    model = cluster.OPTICS(min_samples=min_samples, xi=xi, max_eps=max_eps)
+    with stage("cluster.optics", items=len(entry_exit_points)):
+        labels = model.fit_predict(entry_exit_points)
     return labels, model
 
 
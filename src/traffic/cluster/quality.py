@@ -0,0 +1,203 @@
+"""Cluster-quality scores that stay cheap on large track counts.
+
+Exact silhouette and DBCV need all pairwise distances (O(n^2)); :class:`ClusterQuality`
+bounds the work per labelling instead, so a parameter grid can be scored on 1M points:
+
+* ``silhouette``: exact silhouette of a stratified sample (``sample`` points drawn in
+  proportion to cluster size, at least two per cluster), averaged with inverse-inclusion
+  weights. Noise (-1) is left out. O(sample^2).
+* ``davies_bouldin``: exact, from centroids and mean distances to them. O(n).
+* ``dbcv``: density-based cluster validity (Moulavi et al., 2014) on at most
+  ``per_cluster`` sampled points per cluster. Core distances are the distance to the
+  ``min_pts``-th neighbour in the full data, from a KD-tree built once per data set;
+  density sparseness is the largest mutual-reachability edge between internal nodes of the
+  sample's minimum spanning tree, and density separation the smallest mutual-reachability
+  distance to another cluster's internal nodes (nearest neighbours through a KD-tree). The
+  score is weighted by cluster size over all points, so noise lowers it as in the original.
+
+Silhouette and DBCV lie in [-1, 1] (higher is better); Davies-Bouldin is >= 0 (lower is
+better). All three are NaN with fewer than two clusters.
+"""
+
+from __future__ import annotations
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from traffic.utils.lazy import lazy_import
+from traffic.utils.metrics import stage
+
+spatial = lazy_import("scipy.spatial")
+sparse = lazy_import("scipy.sparse")
+csgraph = lazy_import("scipy.sparse.csgraph")
+
+
+class ClusterQuality:
+    def __init__(
+        self,
+        X: np.ndarray,
+        min_pts: int = 10,
+        sample: int = 2000,
+        per_cluster: int = 300,
+        seed: int = 0,
+    ):
+        self.X = np.ascontiguousarray(X, dtype=np.float64)
+        self.min_pts = int(min_pts)
+        self.sample = int(sample)
+        self.per_cluster = int(per_cluster)
+        self.seed = int(seed)
+        self._tree = None
+        self._core = np.full(len(self.X), np.nan)
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = spatial.cKDTree(self.X)
+        return self._tree
+
+    def core_distance(self, idx: np.ndarray) -> np.ndarray:
+        """Distance of points ``idx`` to their ``min_pts``-th neighbour (cached)."""
+        todo = idx[np.isnan(self._core[idx])]
+        if len(todo):
+            k = min(self.min_pts + 1, len(self.X))  # the point itself comes first
+            d, _ = self.tree.query(self.X[todo], k=k)
+            self._core[todo] = d[:, -1] if d.ndim == 2 else d
+        return self._core[idx]
+
+    def _stratified(self, labels: np.ndarray, quota: np.ndarray, rng) -> np.ndarray:
+        """Up to ``quota[c]`` random members of every cluster ``c``."""
+        order = np.flatnonzero(labels >= 0)
+        order = order[np.lexsort((rng.random(len(order)), labels[order]))]
+        lab = labels[order]
+        first = np.searchsorted(lab, lab, side="left")
+        rank = np.arange(len(order)) - first
+        return order[rank < quota[lab]]
+
+    def silhouette(self, labels: np.ndarray) -> float:
+        labels = np.asarray(labels)
+        sizes = np.bincount(labels[labels >= 0]) if (labels >= 0).any() else np.zeros(0, int)
+        if (sizes > 0).sum() < 2:
+            return float("nan")
+        rng = np.random.default_rng(self.seed)
+        quota = np.maximum(np.ceil(self.sample * sizes / sizes.sum()), 2).astype(np.int64)
+        idx = self._stratified(labels, quota, rng)
+        lab = labels[idx]
+        _, lab = np.unique(lab, return_inverse=True)
+        m = np.bincount(lab)
+        n_c = sizes[sizes > 0]
+        D = spatial.distance.cdist(self.X[idx], self.X[idx])
+        sums = D @ np.eye(len(m))[lab].astype(np.float64)  # (s, k) distance sums per cluster
+        own = sums[np.arange(len(idx)), lab]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            a = own / (m[lab] - 1)
+            mean_other = sums / m[None, :]
+        mean_other[np.arange(len(idx)), lab] = np.inf
+        b = mean_other.min(axis=1)
+        s = np.where(m[lab] > 1, (b - a) / np.maximum(a, b), 0.0)
+        w = (n_c / m)[lab]
+        return float(np.sum(w * s) / np.sum(w))
+
+    def davies_bouldin(self, labels: np.ndarray) -> float:
+        labels = np.asarray(labels)
+        keep = labels >= 0
+        _, lab = np.unique(labels[keep], return_inverse=True)
+        k = int(lab.max()) + 1 if len(lab) else 0
+        if k < 2:
+            return float("nan")
+        X = self.X[keep]
+        n = np.bincount(lab, minlength=k).astype(np.float64)
+        cent = np.stack(
+            [np.bincount(lab, weights=X[:, j], minlength=k) for j in range(X.shape[1])], 1
+        )
+        cent /= n[:, None]
+        scatter = np.bincount(lab, weights=np.linalg.norm(X - cent[lab], axis=1), minlength=k) / n
+        M = spatial.distance.cdist(cent, cent)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            R = (scatter[:, None] + scatter[None, :]) / M
+        np.fill_diagonal(R, -np.inf)
+        return float(np.mean(R.max(axis=1)))
+
+    def dbcv(self, labels: np.ndarray) -> float:
+        labels = np.asarray(labels)
+        clusters, sizes = np.unique(labels[labels >= 0], return_counts=True)
+        if len(clusters) < 2:
+            return float("nan")
+        rng = np.random.default_rng(self.seed + 1)
+        quota = np.zeros(int(clusters.max()) + 1, dtype=np.int64)
+        quota[clusters] = self.per_cluster
+        idx = self._stratified(labels, quota, rng)
+        lab = labels[idx]
+        core = self.core_distance(idx)
+
+        sparseness = {}
+        internal = []
+        for c in clusters:
+            sel = np.flatnonzero(lab == c)
+            pts, cd = self.X[idx[sel]], core[sel]
+            if len(sel) < 3:
+                sparseness[c] = float(cd.max())
+                internal.append(sel)
+                continue
+            mrd = np.maximum(spatial.distance.cdist(pts, pts), np.maximum.outer(cd, cd))
+            mrd = np.maximum(mrd, 1e-12)  # zeros would read as missing edges
+            np.fill_diagonal(mrd, 0.0)
+            mst = sparse.coo_matrix(csgraph.minimum_spanning_tree(mrd))
+            deg = np.bincount(np.r_[mst.row, mst.col], minlength=len(sel))
+            inner = deg > 1
+            both = inner[mst.row] & inner[mst.col]
+            w = mst.data[both] if both.any() else mst.data
+            sparseness[c] = float(w.max()) if len(w) else 0.0
+            internal.append(sel[inner] if inner.any() else sel)
+        internal = np.concatenate(internal)
+        ilab, ipts, icore = lab[internal], self.X[idx[internal]], core[internal]
+
+        total = 0.0
+        q = min(8, len(internal))
+        for c, n_c in zip(clusters, sizes):
+            mine, other = ilab == c, ilab != c
+            tree = spatial.cKDTree(ipts[other])
+            d, j = tree.query(ipts[mine], k=min(q, int(other.sum())))
+            d, j = d.reshape(int(mine.sum()), -1), j.reshape(int(mine.sum()), -1)
+            mrd = np.maximum(d, np.maximum(icore[mine][:, None], icore[other][j]))
+            sep = float(mrd.min())
+            dsc = sparseness[c]
+            total += n_c * (sep - dsc) / max(sep, dsc, 1e-12)
+        return float(total / len(labels))
+
+    def score(self, labels: np.ndarray) -> dict:
+        t0 = time.perf_counter()
+        out = dict(
+            silhouette=self.silhouette(labels),
+            davies_bouldin=self.davies_bouldin(labels),
+            dbcv=self.dbcv(labels),
+        )
+        out["score_s"] = time.perf_counter() - t0
+        return out
+
+
+_STATE: dict = {}
+
+
+def _init_worker(X: np.ndarray, kw: dict) -> None:
+    _STATE["quality"] = ClusterQuality(X, **kw)
+
+
+def _score(labels: np.ndarray) -> dict:
+    return _STATE["quality"].score(labels)
+
+
+def score_labelings(
+    X: np.ndarray, labelings: list[np.ndarray], n_jobs: int = 1, **kw
+) -> pd.DataFrame:
+    """One row of scores per labelling of ``X`` (``kw`` go to :class:`ClusterQuality`)."""
+    with stage("cluster.quality", items=len(labelings)):
+        if n_jobs > 1 and len(labelings) > 1:
+            with ProcessPoolExecutor(n_jobs, initializer=_init_worker, initargs=(X, kw)) as ex:
+                rows = list(ex.map(_score, labelings))
+        else:
+            _init_worker(X, kw)
+            rows = [_score(lab) for lab in labelings]
+    return pd.DataFrame(rows)
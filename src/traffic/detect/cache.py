@@ -0,0 +1,191 @@
+"""On-disk cache of raw per-frame detections, so trackers can be re-run without YOLO.
+
+A cache holds every box the detector returned (before tracking) for one video, weights
+and image size, stored frame-major like a CSR matrix: frame ``i`` owns rows
+``offsets[i]:offsets[i + 1]`` of ``xyxy`` (float32), ``conf`` (float32) and ``cls``
+(int16). Files are uncompressed ``.npz`` with a JSON header and live under
+``<interim>/detections/<key>.npz``; the key hashes the video, the weights file and the
+inference size, so a changed input never replays stale boxes.
+
+Record at a low ``conf`` (the yolo11x config uses 0.01); :meth:`DetectionCache.frame`
+can filter to any higher threshold at replay time. The recording ``conf`` and ``classes``
+are not part of the key but stored in the header, and :meth:`DetectionCache.check`
+refuses a replay the recording cannot serve: a threshold below the recorded one, or a
+different class filter.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+_HASH_CHUNK = 1 << 20
+
+
+def file_digest(path: str | Path, full: bool = False) -> str:
+    """sha1 of the file size plus its first and last MiB (or the whole file)."""
+    path = Path(path)
+    h = hashlib.sha1()
+    size = path.stat().st_size
+    h.update(str(size).encode())
+    with open(path, "rb") as fh:
+        if full or size <= 2 * _HASH_CHUNK:
+            for block in iter(lambda: fh.read(_HASH_CHUNK), b""):
+                h.update(block)
+        else:
+            h.update(fh.read(_HASH_CHUNK))
+            fh.seek(-_HASH_CHUNK, 2)
+            h.update(fh.read(_HASH_CHUNK))
+    return h.hexdigest()
+
+
+def cache_key(video: str | Path, weights: str, imgsz=None, roi=None) -> str:
+    """Cache file stem for (video content, weights, imgsz, ROI).
+
+    Weights that exist locally are hashed; otherwise (e.g. ``yolo11n.pt`` resolved by
+    Ultralytics) their name is used.
+    """
+    w = Path(weights)
+    weights_id = file_digest(w) if w.is_file() else str(weights)
+    parts = [file_digest(video), weights_id, imgsz]
+    if roi is not None:  # cropped inference sees different pixels
+        parts.append([roi.polygon.tolist(), roi.pad])
+    raw = json.dumps(parts, sort_keys=True)
+    return f"{Path(video).stem}-{hashlib.sha1(raw.encode()).hexdigest()[:16]}"
+
+
+def cache_path(interim: str | Path, video: str | Path, weights: str, imgsz=None, roi=None) -> Path:
+    return Path(interim) / "detections" / f"{cache_key(video, weights, imgsz, roi)}.npz"
+
+
+@dataclass
+class DetectionCache:
+    offsets: np.ndarray  # (n_frames + 1,) int64
+    xyxy: np.ndarray  # (n_boxes, 4) float32
+    conf: np.ndarray  # (n_boxes,) float32
+    cls: np.ndarray  # (n_boxes,) int16
+    meta: dict
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.offsets) - 1
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def check(self, conf: float | None, classes=None) -> None:
+        """Raise ValueError unless replaying at ``conf`` with ``classes`` matches a live run."""
+        recorded = float(self.meta.get("conf", 0.0))
+        if conf is not None and float(conf) < recorded:
+            raise ValueError(
+                f"detections were recorded at conf={recorded}, above the requested {conf}; "
+                "record again with detect.cache=true at the lower threshold"
+            )
+        have, want = self.meta.get("classes"), None if classes is None else list(classes)
+        if (None if have is None else sorted(have)) != (None if want is None else sorted(want)):
+            raise ValueError(
+                f"detections were recorded for classes={have}, not {want}; "
+                "record again with detect.cache=true"
+            )
+
+    def frame(self, i: int, min_conf: float | None = None):
+        """(xyxy, conf, cls) views of frame ``i``, optionally above ``min_conf``."""
+        sl = slice(self.offsets[i], self.offsets[i + 1])
+        xyxy, conf, cls = self.xyxy[sl], self.conf[sl], self.cls[sl]
+        if min_conf is not None and min_conf > self.meta.get("conf", 0.0):
+            keep = conf >= min_conf
+            return xyxy[keep], conf[keep], cls[keep]
+        return xyxy, conf, cls
+
+    def to_frame(self, min_conf: float | None = None) -> pd.DataFrame:
+        """Untracked ``tracks.parquet`` layout (``track_id`` -1), as ``tracker=none`` writes."""
+        frame = np.repeat(np.arange(self.n_frames), np.diff(self.offsets))
+        xyxy, conf, cls = self.xyxy, self.conf, self.cls
+        if min_conf is not None:
+            keep = conf >= min_conf
+            frame, xyxy, conf, cls = frame[keep], xyxy[keep], conf[keep], cls[keep]
+        wh = xyxy[:, 2:] - xyxy[:, :2]
+        c = xyxy[:, :2] + wh / 2
+        return pd.DataFrame(
+            dict(
+                frame=frame,
+                track_id=np.full(len(frame), -1),
+                cls=cls.astype(np.int64),
+                conf=conf,
+                cx=c[:, 0],
+                cy=c[:, 1],
+                w=wh[:, 0],
+                h=wh[:, 1],
+            )
+        )
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = dict(self.meta, version=CACHE_VERSION)
+        tmp = path.with_suffix(".tmp.npz")
+        with open(tmp, "wb") as fh:
+            np.savez(
+                fh,
+                __header__=np.array(json.dumps(header)),
+                offsets=self.offsets,
+                xyxy=self.xyxy,
+                conf=self.conf,
+                cls=self.cls,
+            )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "DetectionCache":
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["__header__"]))
+            if meta.get("version") != CACHE_VERSION:
+                raise ValueError(f"{path}: detection cache version {meta.get('version')}")
+            return cls(z["offsets"], z["xyxy"], z["conf"], z["cls"], meta)
+
+
+class DetectionCacheWriter:
+    """Collects per-frame detections in memory and writes the cache on :meth:`close`.
+
+    Frames must be added in order; skipped frame indices are stored as empty frames.
+    With ``path=None`` nothing is written and :meth:`close` only returns the cache.
+    """
+
+    def __init__(self, path: str | Path | None, **meta):
+        self.path = None if path is None else Path(path)
+        self.meta = meta
+        self._counts: list[int] = []
+        self._xyxy: list[np.ndarray] = []
+        self._conf: list[np.ndarray] = []
+        self._cls: list[np.ndarray] = []
+
+    @property
+    def n_frames(self) -> int:
+        return len(self._counts)
+
+    def add(self, frame_idx: int, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray) -> None:
+        if frame_idx < self.n_frames:
+            raise ValueError(f"frame {frame_idx} added after frame {self.n_frames - 1}")
+        self._counts.extend([0] * (frame_idx - self.n_frames))
+        self._counts.append(len(conf))
+        self._xyxy.append(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self._conf.append(np.asarray(conf, dtype=np.float32).ravel())
+        self._cls.append(np.asarray(cls).astype(np.int16).ravel())
+
+    def close(self) -> DetectionCache:
+        cache = DetectionCache(
+            offsets=np.concatenate([[0], np.cumsum(self._counts, dtype=np.int64)]),
+            xyxy=np.concatenate(self._xyxy) if self._xyxy else np.zeros((0, 4), np.float32),
+            conf=np.concatenate(self._conf) if self._conf else np.zeros(0, np.float32),
+            cls=np.concatenate(self._cls) if self._cls else np.zeros(0, np.int16),
+            meta=self.meta,
+        )
+        if self.path is not None:
+            cache.save(self.path)
+        return cache
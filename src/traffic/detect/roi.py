@@ -0,0 +1,90 @@
+"""Per-scene region of interest: cropped inference and polygon filtering of detections.
+
+A scene's ``dataset.roi`` is a polygon ``[[x, y], ...]`` in full-frame pixels. Frames are
+cropped to the polygon's bounding box (plus ``pad`` pixels) before inference, boxes are
+shifted back to full-frame coordinates, and boxes whose anchor point (centre, or
+bottom-centre with ``anchor="bottom"``) falls outside the polygon are dropped before
+they reach the tracker.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+import numpy as np
+
+
+def points_in_polygon(x: np.ndarray, y: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Even-odd rule for many points against one polygon (vectorised over points)."""
+    x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+    inside = np.zeros(x.shape, dtype=bool)
+    px, py = polygon[:, 0], polygon[:, 1]
+    qx, qy = np.roll(px, 1), np.roll(py, 1)
+    for x0, y0, x1, y1 in zip(px, py, qx, qy):
+        crosses = (y0 > y) != (y1 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            xc = x0 + (y - y0) * (x1 - x0) / (y1 - y0)
+        inside ^= crosses & (x < xc)
+    return inside
+
+
+class Roi:
+    def __init__(self, polygon, pad: int = 16, anchor: str = "center"):
+        self.polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        if len(self.polygon) < 3:
+            raise ValueError(f"ROI polygon needs at least 3 vertices, got {len(self.polygon)}")
+        if anchor not in ("center", "bottom"):
+            raise ValueError(f"anchor must be 'center' or 'bottom', got {anchor!r}")
+        self.pad = int(pad)
+        self.anchor = anchor
+        self._bbox: dict[tuple[int, int], tuple[int, int, int, int]] = {}
+
+    @classmethod
+    def from_cfg(cls, cfg) -> "Roi | None":
+        """ROI from ``dataset.roi`` (a polygon, or a mapping with polygon/pad/anchor)."""
+        roi = cfg.get("roi") if cfg is not None else None
+        if roi is None:
+            return None
+        if isinstance(roi, Mapping):
+            return cls(
+                [list(p) for p in roi["polygon"]],
+                roi.get("pad", 16),
+                roi.get("anchor", "center"),
+            )
+        return cls([list(p) for p in roi])
+
+    def bbox(self, shape) -> tuple[int, int, int, int]:
+        """Padded ``(x0, y0, x1, y1)`` crop of a frame of ``shape`` (clipped to the frame)."""
+        key = (int(shape[0]), int(shape[1]))
+        if key not in self._bbox:
+            h, w = key
+            lo = np.floor(self.polygon.min(axis=0)) - self.pad
+            hi = np.ceil(self.polygon.max(axis=0)) + self.pad
+            x0, y0 = int(max(lo[0], 0)), int(max(lo[1], 0))
+            x1, y1 = int(min(hi[0], w)), int(min(hi[1], h))
+            if x1 <= x0 or y1 <= y0:
+                raise ValueError(f"ROI {self.polygon.tolist()} lies outside a {w}x{h} frame")
+            self._bbox[key] = (x0, y0, x1, y1)
+        return self._bbox[key]
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """View of the ROI bounding box of ``frame``."""
+        x0, y0, x1, y1 = self.bbox(frame.shape)
+        return frame[y0:y1, x0:x1]
+
+    def area_fraction(self, shape) -> float:
+        x0, y0, x1, y1 = self.bbox(shape)
+        return (x1 - x0) * (y1 - y0) / float(shape[0] * shape[1])
+
+    def contains(self, xyxy: np.ndarray) -> np.ndarray:
+        """Mask of full-frame boxes whose anchor point lies in the polygon."""
+        cx = (xyxy[:, 0] + xyxy[:, 2]) / 2
+        cy = xyxy[:, 3] if self.anchor == "bottom" else (xyxy[:, 1] + xyxy[:, 3]) / 2
+        return points_in_polygon(cx, cy, self.polygon)
+
+    def apply(self, shape, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        """Map crop-relative boxes of a frame of ``shape`` back and keep those in the ROI."""
+        x0, y0, _, _ = self.bbox(shape)
+        xyxy = xyxy + np.array([x0, y0, x0, y0], dtype=xyxy.dtype)
+        keep = self.contains(xyxy)
+        return xyxy[keep], conf[keep], cls[keep]
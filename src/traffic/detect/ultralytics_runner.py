@@ -1,9 +1,13 @@
-from typing import Iterable
-from ultralytics import YOLO
+from typing import Iterable, Sequence
 
 
 class UltralyticsDetector:
-    def __init__(self, weights: str, device: str = "auto", conf: float = 0.25, classes=None, imgsz=None):
+    def __init__(
+        self, weights: str, device: str = "auto", conf: float = 0.25, classes=None, imgsz=None
+    ):
+        # imported here: ultralytics pulls in torch, which dominates start-up
+        from ultralytics import YOLO
+
         self.model = YOLO(weights)
         self.kw = dict(device=device, conf=conf, classes=classes)
         if imgsz is not None:
@@ -11,3 +15,7 @@ class UltralyticsDetector:
 
     def detect(self, source: str | int, stream: bool = True) -> Iterable:
         return self.model.predict(source=source, stream=stream, **self.kw)
+
+    def predict(self, frames: Sequence, **overrides) -> list:
+        """One batched forward pass over in-memory frames (e.g. ROI crops)."""
+        return self.model.predict(list(frames), verbose=False, **{**self.kw, **overrides})
@@ -0,0 +1,59 @@
+"""Fixed-length trajectory embeddings by batched arc-length resampling.
+
+Every track is resampled to ``n_points`` positions equally spaced along its path, so
+tracks of any duration map to a ``2 * n_points`` float32 vector whose Euclidean distance
+compares whole manoeuvres rather than the start/mid/end samples used by :mod:`vectorize`.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from traffic.trajectories.flat import FlatTracks
+
+
+def resample_arclength(
+    flat: FlatTracks, n_points: int = 16, cols: tuple[str, str] = ("x", "y")
+) -> np.ndarray:
+    """Resample all tracks at ``n_points`` equal arc-length positions in one pass.
+
+    Returns
+    -------
+    np.ndarray
+        (n_tracks, n_points, 2) float32. Tracks with zero path length repeat their
+        first point.
+    """
+    x = np.asarray(flat[cols[0]], dtype=np.float64)
+    y = np.asarray(flat[cols[1]], dtype=np.float64)
+    n_tracks = len(flat)
+    if n_tracks == 0:
+        return np.zeros((0, n_points, 2), dtype=np.float32)
+    starts, ends = flat.offsets[:-1], flat.offsets[1:]
+
+    seg = np.zeros(len(x))
+    seg[1:] = np.hypot(np.diff(x), np.diff(y))
+    seg[starts] = 0.0  # no segment across track boundaries
+    # global cumulative arc length is non-decreasing, so one searchsorted serves all tracks
+    cum = np.cumsum(seg)
+    base = cum[starts]
+    total = cum[ends - 1] - base
+
+    frac = np.linspace(0.0, 1.0, n_points)
+    target = base[:, None] + total[:, None] * frac[None, :]
+    idx = np.searchsorted(cum, target, side="right") - 1
+    lo = starts[:, None]
+    hi = np.maximum(ends - 2, starts)[:, None]
+    idx = np.clip(idx, lo, hi)
+    nxt = np.minimum(idx + 1, (ends - 1)[:, None])
+    span = cum[nxt] - cum[idx]
+    t = np.divide(target - cum[idx], span, out=np.zeros_like(span), where=span > 0)
+    t = np.clip(t, 0.0, 1.0)
+    out = np.empty((n_tracks, n_points, 2), dtype=np.float32)
+    out[..., 0] = x[idx] + t * (x[nxt] - x[idx])
+    out[..., 1] = y[idx] + t * (y[nxt] - y[idx])
+    return out
+
+
+def embed_trajectories(flat: FlatTracks, n_points: int = 16) -> np.ndarray:
+    """(n_tracks, 2 * n_points) float32 embedding, interleaved as x0, y0, x1, y1, ..."""
+    return resample_arclength(flat, n_points).reshape(len(flat), -1)
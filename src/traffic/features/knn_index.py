@@ -0,0 +1,127 @@
+"""Persisted nearest-neighbour index over trajectory embeddings.
+
+Embeddings (see :mod:`traffic.features.embed`) are centred and projected with PCA to a
+few dimensions, where a k-d tree answers queries in O(log n). Candidates are then
+re-ranked by exact distance on the full embedding, so the projection only has to keep
+the true neighbours inside the ``oversample * k`` candidate set.
+
+``source`` records the fingerprint of the trajectories the index was built from, so a
+saved index can be recognised as stale once they are rebuilt.
+"""
+
+from __future__ import annotations
+
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.features.embed import embed_trajectories
+from traffic.trajectories.flat import FlatTracks
+from traffic.utils.lazy import lazy_import
+
+spatial = lazy_import("scipy.spatial")
+
+INDEX_VERSION = 1
+
+
+class TrajectoryIndex:
+    def __init__(
+        self,
+        track_ids: np.ndarray,
+        embeddings: np.ndarray,
+        n_components: int | None = 12,
+        n_points: int | None = None,
+    ):
+        order = np.argsort(track_ids, kind="stable")
+        self.track_ids = np.asarray(track_ids)[order]
+        self.embeddings = np.ascontiguousarray(embeddings[order], dtype=np.float32)
+        self.n_points = n_points
+        self.source: str | None = None
+        self.mean = self.embeddings.mean(axis=0) if len(self.embeddings) else None
+        d = self.embeddings.shape[1]
+        if n_components is not None and n_components < d and len(self.embeddings) > 1:
+            # PCA basis from a sample is plenty for a candidate-generation projection
+            rng = np.random.default_rng(0)
+            n = len(self.embeddings)
+            sample = self.embeddings[rng.choice(n, size=min(n, 100_000), replace=False)]
+            _, _, vt = np.linalg.svd(sample - self.mean, full_matrices=False)
+            self.components = vt[:n_components].astype(np.float32)
+        else:
+            self.components = None
+        self.tree = spatial.cKDTree(self._project(self.embeddings))
+
+    @classmethod
+    def from_tracks(
+        cls, flat: FlatTracks, n_points: int = 16, n_components: int | None = 12
+    ) -> "TrajectoryIndex":
+        emb = embed_trajectories(flat, n_points)
+        return cls(flat.track_ids, emb, n_components=n_components, n_points=n_points)
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    def _project(self, emb: np.ndarray) -> np.ndarray:
+        if self.components is None:
+            return emb
+        return (emb - self.mean) @ self.components.T
+
+    def row(self, track_id) -> int:
+        i = int(np.searchsorted(self.track_ids, track_id))
+        if i >= len(self.track_ids) or self.track_ids[i] != track_id:
+            raise KeyError(f"track_id {track_id} is not in the index")
+        return i
+
+    def query_vectors(
+        self, emb: np.ndarray, k: int = 10, oversample: int = 16
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """k nearest rows for each query embedding; returns (distances, rows), both (q, k)."""
+        emb = np.atleast_2d(np.asarray(emb, dtype=np.float32))
+        k = min(k, len(self))
+        n_cand = min(len(self), max(k, k * oversample if self.components is not None else k))
+        _, cand = self.tree.query(self._project(emb), k=n_cand)
+        cand = cand.reshape(len(emb), n_cand)
+        exact = np.linalg.norm(self.embeddings[cand] - emb[:, None, :], axis=2)
+        best = np.argsort(exact, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(exact, best, 1), np.take_along_axis(cand, best, 1)
+
+    def similar(self, track_id, k: int = 10) -> pd.DataFrame:
+        """The ``k`` tracks most similar to ``track_id`` (excluding itself), nearest first."""
+        i = self.row(track_id)
+        dist, rows = self.query_vectors(self.embeddings[i], k=k + 1)
+        dist, rows = dist[0], rows[0]
+        keep = rows != i
+        return pd.DataFrame(
+            {"track_id": self.track_ids[rows[keep]][:k], "distance": dist[keep][:k]}
+        )
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        state = dict(
+            version=INDEX_VERSION,
+            track_ids=self.track_ids,
+            embeddings=self.embeddings,
+            mean=self.mean,
+            components=self.components,
+            n_points=self.n_points,
+            source=self.source,
+            tree=self.tree,
+        )
+        with open(path, "wb") as fh:
+            pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "TrajectoryIndex":
+        with open(path, "rb") as fh:
+            state = pickle.load(fh)
+        if state.get("version") != INDEX_VERSION:
+            raise ValueError(
+                f"{path}: index version {state.get('version')} != {INDEX_VERSION}; rebuild it"
+            )
+        self = cls.__new__(cls)
+        for k in ("track_ids", "embeddings", "mean", "components", "n_points", "tree"):
+            setattr(self, k, state[k])
+        self.source = state.get("source")
+        return self
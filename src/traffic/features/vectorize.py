@@ -1,4 +1,7 @@
 import numpy as np
+import pandas as pd
+
+from traffic.trajectories.flat import FlatTracks, flatten_tracks
 
 from .vector_specs import FVSpec
 
@@ -31,3 +34,71 @@ def vectorize(traj: dict, spec: FVSpec) -> np.ndarray:
     if spec.use_Re_m:
         fv += xy(_pick_idx(n, "m")).tolist()
     return np.array(fv, dtype=np.float32)
+
+
+def featurize_flat(
+    flat: FlatTracks,
+    spec: FVSpec,
+    lengths: np.ndarray | None = None,
+    states: dict[str, np.ndarray] | None = None,
+) -> np.ndarray:
+    """Feature matrix of every track in ``flat`` (same layout as :func:`vectorize`).
+
+    ``lengths`` optionally observes only the first ``lengths[i]`` samples of track ``i``
+    (clipped to ``[1, len]``), so prefix features need no copy of the arrays. ``states``
+    replaces the looked-up values with per-track arrays keyed ``<column>_<s|m|e>``, e.g.
+    :func:`traffic.trajectories.build.prefix_states`.
+    """
+    starts = flat.starts
+    n = flat.lengths if lengths is None else np.clip(lengths, 1, flat.lengths)
+    rows = {"e": starts + n - 1, "s": starts, "m": starts + n // 2}
+
+    def at(col: str, where: str) -> np.ndarray:
+        if states is not None:
+            return states[f"{col}_{where}"]
+        return flat[col][rows[where]]
+
+    cols = []
+    if spec.use_Re_e:
+        cols += [at("x", "e"), at("y", "e")]
+    if spec.use_Ve_e:
+        cols += [at("vx", "e"), at("vy", "e")]
+    if spec.use_Ae_e:
+        cols += [at("ax", "e"), at("ay", "e")]
+    if spec.use_Re_s:
+        cols += [at("x", "s"), at("y", "s")]
+    if spec.use_Re_m:
+        cols += [at("x", "m"), at("y", "m")]
+    if not cols:
+        return np.zeros((len(flat), 0), dtype=np.float32)
+    return np.stack(cols, axis=1).astype(np.float32)
+
+
+def prefix_lengths(flat: FlatTracks, fractions) -> np.ndarray:
+    """Samples observed per track after each fraction of its frame span, (n_frac, n_tracks).
+
+    A track observed for fraction ``f`` keeps the samples with
+    ``frame <= first + f * (last - first)`` (at least one), so gaps in the track do not
+    skew the cut. All fractions are resolved with a single ``searchsorted`` on a globally
+    increasing (track, frame) key.
+    """
+    frames = flat["frame"].astype(np.int64)
+    starts, ends = flat.starts, flat.offsets[1:] - 1
+    first = frames[starts]
+    span = frames[ends] - first
+    stride = int(span.max()) + 1 if len(flat) else 1
+    key = flat.owner * stride + (frames - np.repeat(first, flat.lengths))
+    frac = np.asarray(fractions, dtype=np.float64)[:, None]
+    cut = np.arange(len(flat)) * stride + np.floor(frac * span + 1e-9).astype(np.int64)
+    return np.maximum(np.searchsorted(key, cut, side="right") - starts, 1)
+
+
+def featurize(trajs: pd.DataFrame, spec: FVSpec) -> pd.DataFrame:
+    """Vectorize every track of a long trajectories table (``trajectories.parquet``).
+
+    Returns a DataFrame with ``track_id`` followed by the feature columns 0..d-1.
+    """
+    flat = flatten_tracks(trajs)
+    df = pd.DataFrame(featurize_flat(flat, spec))
+    df.insert(0, "track_id", flat.track_ids)
+    return df
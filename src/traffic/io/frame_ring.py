@@ -0,0 +1,313 @@
+"""Shared-memory ring of decoded frames for several consumers (threads or processes).
+
+The decoder copies each frame once into a slot of a ``multiprocessing.shared_memory``
+block; the tracker, renderer and recorder each read it through their own
+:class:`RingConsumer` as a read-only NumPy view of that slot, without copies or pickling.
+
+Every slot carries a sequence number and a reference count. A consumer holds a slot
+while it works on the frame (:class:`FrameRef`, a context manager); held slots are never
+overwritten. The producer always writes into the oldest unheld slot, so a consumer that
+falls behind loses its oldest unread frames (``drop-oldest``) and resumes at the oldest
+frame still in the ring; :attr:`RingConsumer.dropped` counts what it missed. Only when
+every slot is held does :meth:`FrameRing.write` wait (or drop the new frame with
+``block=False``).
+
+Consumers that draw on frames (``draw_annotations`` works in place) must copy first.
+:class:`RingDecoder` decodes a video straight into the ring's slots (no intermediate
+frame), which is how ``run_track.py`` feeds the detector, tracker and headless renderer
+from one decoded copy. Pass the ring to ``multiprocessing.Process`` arguments to share it
+with child processes; the creating process calls :meth:`FrameRing.unlink` when everyone is
+done.
+"""
+
+from __future__ import annotations
+
+import multiprocessing as mp
+import time
+from collections.abc import Callable, Iterator
+from multiprocessing import shared_memory
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from typing_extensions import Self
+
+_META = 3  # per-slot int64 fields: seq, frame index, refcount
+_STATE = 2  # global int64 fields: next seq, closed flag
+_ALIGN = 64
+
+
+class FrameRing:
+    def __init__(self, slots: int, shape, dtype=np.uint8, ctx=None):
+        if slots < 2:
+            raise ValueError(f"a frame ring needs at least 2 slots, got {slots}")
+        self.slots = int(slots)
+        self.shape = tuple(int(s) for s in shape)
+        self.dtype = np.dtype(dtype)
+        ctx = ctx or mp.get_context()
+        self._cond = ctx.Condition(ctx.Lock())
+        self._shm = shared_memory.SharedMemory(create=True, size=self._nbytes())
+        self._owner = True
+        self._map()
+        self._seq[:] = -1
+        self._frame[:] = -1
+        self._refs[:] = 0
+        self._state[:] = 0
+
+    def _nbytes(self) -> int:
+        return self._data_offset() + self.slots * self.frame_nbytes
+
+    def _data_offset(self) -> int:
+        meta = (self.slots * _META + _STATE) * 8
+        return -(-meta // _ALIGN) * _ALIGN
+
+    @property
+    def frame_nbytes(self) -> int:
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def _map(self) -> None:
+        buf = self._shm.buf
+        meta = np.ndarray((self.slots * _META + _STATE,), np.int64, buf)
+        self._seq = meta[: self.slots]
+        self._frame = meta[self.slots : 2 * self.slots]
+        self._refs = meta[2 * self.slots : 3 * self.slots]
+        self._state = meta[3 * self.slots :]
+        self._data = np.ndarray(
+            (self.slots, *self.shape), self.dtype, buf, offset=self._data_offset()
+        )
+
+    def __getstate__(self):
+        return dict(
+            slots=self.slots,
+            shape=self.shape,
+            dtype=self.dtype.str,
+            cond=self._cond,
+            name=self._shm.name,
+        )
+
+    def __setstate__(self, state) -> None:
+        self.slots, self.shape = state["slots"], state["shape"]
+        self.dtype = np.dtype(state["dtype"])
+        self._cond = state["cond"]
+        self._shm = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._map()
+
+    @property
+    def written(self) -> int:
+        """Frames written so far."""
+        return int(self._state[0])
+
+    @property
+    def closed(self) -> bool:
+        return bool(self._state[1])
+
+    def write(
+        self, frame: np.ndarray, frame_idx: int | None = None, block: bool = True, timeout=None
+    ) -> int:
+        """Copy ``frame`` into the oldest unheld slot; its sequence number, or -1 if dropped.
+
+        With every slot held, waits for a release (up to ``timeout``) unless ``block`` is
+        False, in which case the new frame is dropped.
+        """
+        return self.write_with(
+            lambda out: np.copyto(out, frame, casting="no") or True, frame_idx, block, timeout
+        )
+
+    def write_with(
+        self,
+        fill: Callable[[np.ndarray], bool],
+        frame_idx: int | None = None,
+        block: bool = True,
+        timeout=None,
+    ) -> int:
+        """Like :meth:`write`, but ``fill(out)`` produces the frame in the slot itself (e.g.
+        ``lambda out: cap.read(out)[0]`` decodes straight into shared memory).
+
+        If ``fill`` returns False nothing is published and -1 is returned.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                free = np.flatnonzero(self._refs == 0)
+                if len(free):
+                    slot = int(free[np.argmin(self._seq[free])])
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if not block or (remaining is not None and remaining <= 0):
+                    return -1
+                self._cond.wait(remaining)
+            self._seq[slot] = -2  # being written: invisible to consumers
+            self._refs[slot] = 1  # and not reusable by a concurrent writer
+        ok = False
+        try:
+            ok = bool(fill(self._data[slot]))
+        finally:
+            with self._cond:
+                seq = -1
+                if ok:
+                    seq = int(self._state[0])
+                    self._state[0] = seq + 1
+                    self._frame[slot] = seq if frame_idx is None else frame_idx
+                self._seq[slot] = seq
+                self._refs[slot] = 0
+                self._cond.notify_all()
+        return seq
+
+    def close(self) -> None:
+        """No more frames: consumers drain what is left, then get None."""
+        with self._cond:
+            self._state[1] = 1
+            self._cond.notify_all()
+
+    def consumer(self) -> "RingConsumer":
+        """A reader starting at the oldest frame currently in the ring."""
+        return RingConsumer(self)
+
+    def detach(self) -> None:
+        """Drop this process's mapping (views handed out become invalid)."""
+        self._seq = self._frame = self._refs = self._state = self._data = None
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Detach and free the shared memory (creating process only)."""
+        self.detach()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._owner:
+            self.unlink()
+        else:
+            self.detach()
+
+
+class FrameRef:
+    """A held slot: ``array`` is a read-only view valid until :meth:`release`."""
+
+    __slots__ = ("ring", "slot", "seq", "frame_idx", "array")
+
+    def __init__(self, ring: FrameRing, slot: int, seq: int, frame_idx: int):
+        self.ring, self.slot, self.seq, self.frame_idx = ring, slot, seq, frame_idx
+        view = ring._data[slot]
+        view.flags.writeable = False
+        self.array = view
+
+    def release(self) -> None:
+        if self.array is None:
+            return
+        self.array = None
+        with self.ring._cond:
+            self.ring._refs[self.slot] -= 1
+            self.ring._cond.notify_all()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class RingConsumer:
+    """One reader's position in a :class:`FrameRing`."""
+
+    def __init__(self, ring: FrameRing):
+        self.ring = ring
+        self.next_seq = 0
+        self.received = 0
+        self.dropped = 0
+
+    def get(self, timeout: float | None = None) -> FrameRef | None:
+        """Hold the next available frame; None when the ring is closed and drained.
+
+        Raises TimeoutError if nothing arrives within ``timeout`` seconds.
+        """
+        ring = self.ring
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with ring._cond:
+            while True:
+                seq = ring._seq
+                ready = np.flatnonzero(seq >= self.next_seq)
+                if len(ready):
+                    slot = int(ready[np.argmin(seq[ready])])
+                    break
+                if ring._state[1] and not (ring._seq == -2).any():
+                    return None
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("no frame within timeout")
+                ring._cond.wait(remaining)
+            got = int(seq[slot])
+            ring._refs[slot] += 1
+            frame_idx = int(ring._frame[slot])
+        self.dropped += got - self.next_seq
+        self.next_seq = got + 1
+        self.received += 1
+        return FrameRef(ring, slot, got, frame_idx)
+
+    def __iter__(self):
+        """Frames until the ring closes; each is released when the next is requested."""
+        while True:
+            ref = self.get()
+            if ref is None:
+                return
+            try:
+                yield ref
+            finally:
+                ref.release()
+
+
+class RingDecoder:
+    """Decode ``source`` into a :class:`FrameRing` of ``slots`` frames, in place.
+
+    Iterating yields every frame once, in order, as a held :class:`FrameRef`; the caller
+    releases it, or hands it to someone who will (e.g. ``HeadlessRenderer.submit``). With
+    every slot held, decoding waits for a release. :meth:`close` frees the ring once all
+    consumers are done; views must not be read after that.
+    """
+
+    def __init__(self, source: str | int, slots: int = 8):
+        self.source = source
+        self.slots = int(slots)
+        self.ring: FrameRing | None = None
+
+    def __iter__(self) -> Iterator[FrameRef]:
+        import cv2
+
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            raise OSError(f"cannot open video source {self.source!r}")
+
+        def decode(out: np.ndarray) -> bool:
+            ok, frame = cap.read(out)
+            if ok and frame is not out:  # the decoder reallocated instead of filling ``out``
+                np.copyto(out, frame, casting="no")
+            return ok
+
+        try:
+            ok, first = cap.read()
+            if not ok:
+                return
+            self.ring = FrameRing(self.slots, first.shape, first.dtype)
+            reader = self.ring.consumer()
+            self.ring.write(first, 0)
+            del first
+            i = 0
+            while True:
+                yield reader.get()
+                i += 1
+                if self.ring.write_with(decode, i) < 0:
+                    return
+        finally:
+            cap.release()
+            if self.ring is not None:
+                self.ring.close()
+
+    def close(self) -> None:
+        if self.ring is not None:
+            self.ring.unlink()
+            self.ring = None
@@ -0,0 +1,245 @@
+"""Serve a scene's tables from one process to many notebooks over a Unix socket.
+
+:class:`SliceServer` loads a scene's processed tables (trajectories, including partitions
+under ``trajectories/``, clusters, exit groups, features, ...) into Arrow memory once.
+Clients ask for column-projected, filtered slices, which the server writes back as an
+Arrow IPC stream. The client maps the received buffers straight into a ``pyarrow.Table``
+(no parsing, no per-row decoding), so each notebook only holds the slice it asked for.
+
+Protocol, one request per connection: the client sends one JSON line; the server answers
+with one JSON status line and, for ``scan``, an Arrow IPC stream::
+
+    {"op": "scan", "table": "trajectories", "columns": ["track_id", "frame", "x", "y"],
+     "filters": [["frame", ">=", 1000]],
+     "tracks": {"table": "clusters", "filters": [["cluster", "in", [3, 5]]]},
+     "limit": null}
+
+``filters`` use the ``pyarrow.parquet`` / ``pandas.read_parquet`` form (a list of
+``[column, op, value]`` conditions ANDed together, or a list of such lists ORed). ``tracks``
+keeps only rows whose ``track_id`` is selected by a filter on another table, e.g.
+trajectories of some clusters. ``op: "tables"`` lists the tables with their schemas and row
+counts. A table whose files change on disk is reloaded on its next request.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import threading
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from traffic.io.sources import fingerprint, trajectory_sources
+
+DEFAULT_TABLES = (
+    "trajectories",
+    "trajectories_cleaned",
+    "trajectories_simplified",
+    "clusters",
+    "exit_groups",
+    "outliers",
+    "features",
+)
+BATCH_ROWS = 1 << 16
+
+
+def table_sources(processed: Path, name: str) -> list[Path]:
+    if name == "trajectories":
+        return trajectory_sources(processed)
+    path = processed / f"{name}.parquet"
+    return [path] if path.exists() else []
+
+
+def _expression(filters) -> pc.Expression | None:
+    """Arrow expression of JSON ``filters`` (one conjunction, or a list of them ORed)."""
+    if not filters:
+        return None
+    if isinstance(filters[0][0], str):
+        return pq.filters_to_expression([tuple(f) for f in filters])
+    return pq.filters_to_expression([[tuple(f) for f in conj] for conj in filters])
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class SliceServer:
+    """Tables of one scene, served over the Unix socket ``path`` (see module docstring)."""
+
+    def __init__(self, processed: str | Path, path: str | Path, tables=DEFAULT_TABLES):
+        self.processed = Path(processed)
+        self.path = Path(path)
+        self.names = tuple(tables)
+        self._tables: dict[str, pa.Table] = {}
+        self._fps: dict[str, list[str]] = {}
+        self._lock = threading.Lock()
+        self._server: _UnixServer | None = None
+        self.requests = 0
+
+    def load(self) -> dict[str, int]:
+        """Load (or reload) every table whose files changed; rows per table on disk."""
+        for name in self.names:
+            try:
+                self.table(name)
+            except KeyError:  # not produced for this scene (yet)
+                continue
+        return {name: t.num_rows for name, t in self._tables.items()}
+
+    def table(self, name: str) -> pa.Table:
+        if name not in self.names:
+            raise KeyError(f"unknown table {name!r}; served: {', '.join(self.names)}")
+        sources = table_sources(self.processed, name)
+        fps = [f"{p.name}:{fingerprint(p)}" for p in sources]
+        with self._lock:
+            if self._fps.get(name) != fps:
+                if not sources:
+                    self._tables.pop(name, None)
+                    self._fps.pop(name, None)
+                    raise KeyError(f"table {name!r} has no files in {self.processed}")
+                parts = [pq.read_table(p, memory_map=True) for p in sources]
+                table = pa.concat_tables(parts, promote_options="default")
+                self._tables[name] = table.combine_chunks()
+                self._fps[name] = fps
+            return self._tables[name]
+
+    def describe(self) -> dict:
+        out = {}
+        for name in self.names:
+            try:
+                t = self.table(name)
+            except KeyError:
+                continue
+            out[name] = dict(rows=t.num_rows, columns={f.name: str(f.type) for f in t.schema})
+        return out
+
+    def scan(self, table, columns=None, filters=None, tracks=None, limit=None) -> pa.Table:
+        t = self.table(table)
+        expr = _expression(filters)
+        if tracks:
+            ids = self.scan(tracks["table"], ["track_id"], tracks.get("filters"))["track_id"]
+            sel = pc.field("track_id").isin(pc.unique(ids))
+            expr = sel if expr is None else expr & sel
+        if expr is not None:
+            t = t.filter(expr)
+        if columns is not None:
+            t = t.select(list(columns))
+        if limit is not None:
+            t = t.slice(0, int(limit))
+        return t
+
+    def handle(self, request: dict, wfile) -> None:
+        self.requests += 1
+        op = request.get("op", "scan")
+        if op == "tables":
+            _status(wfile, ok=True, tables=self.describe())
+        elif op == "scan":
+            args = {k: request.get(k) for k in ("columns", "filters", "tracks", "limit")}
+            t = self.scan(request["table"], **args)
+            _status(wfile, ok=True, rows=t.num_rows)
+            with pa.ipc.new_stream(wfile, t.schema) as writer:
+                writer.write_table(t, max_chunksize=BATCH_ROWS)
+        else:
+            raise ValueError(f"unknown op {op!r}")
+
+    def serve_forever(self) -> None:
+        if self.path.exists():
+            with socket.socket(socket.AF_UNIX) as probe:
+                try:  # a live server still answers; a stale socket file is replaced
+                    probe.connect(str(self.path))
+                except (ConnectionRefusedError, FileNotFoundError):
+                    self.path.unlink()
+                else:
+                    raise OSError(f"a server is already listening on {self.path}")
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline())
+                    server.handle(request, self.wfile)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                except Exception as e:  # reported to the client, the server keeps running
+                    _status(self.wfile, ok=False, error=f"{type(e).__name__}: {e}")
+
+        self._server = _UnixServer(str(self.path), Handler)
+        os.chmod(self.path, 0o660)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            self.path.unlink(missing_ok=True)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+def _status(wfile, **status) -> None:
+    wfile.write(json.dumps(status).encode() + b"\n")
+    wfile.flush()
+
+
+class SliceClient:
+    """Notebook side of :class:`SliceServer`::
+
+    client = SliceClient("/tmp/traffic-bellevue_116th_ne12th.sock")
+    trajs = client.frame("trajectories", ["track_id", "frame", "x", "y"],
+                         tracks=("clusters", [("cluster", "==", 3)]))
+    """
+
+    def __init__(self, path: str | Path, timeout: float | None = None):
+        self.path = str(path)
+        self.timeout = timeout
+
+    def _request(self, request: dict):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.settimeout(self.timeout)
+        sock.connect(self.path)
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        rfile = sock.makefile("rb")
+        status = json.loads(rfile.readline() or b'{"ok": false, "error": "no reply"}')
+        if not status.pop("ok"):
+            rfile.close()
+            sock.close()
+            raise RuntimeError(f"slice server: {status['error']}")
+        return status, rfile, sock
+
+    def tables(self) -> dict:
+        """Served tables with their row counts and column types."""
+        status, rfile, sock = self._request(dict(op="tables"))
+        rfile.close()
+        sock.close()
+        return status["tables"]
+
+    def scan(
+        self,
+        table: str,
+        columns: list[str] | None = None,
+        filters: list | None = None,
+        tracks: tuple[str, list] | None = None,
+        limit: int | None = None,
+    ) -> pa.Table:
+        """Rows of ``table`` matching ``filters`` (pyarrow/pandas ``read_parquet`` form).
+
+        ``tracks=(other_table, other_filters)`` keeps the rows whose ``track_id`` matches
+        ``other_filters`` in ``other_table``.
+        """
+        request = dict(op="scan", table=table, columns=columns, filters=filters, limit=limit)
+        if tracks is not None:
+            request["tracks"] = dict(table=tracks[0], filters=tracks[1])
+        _, rfile, sock = self._request(request)
+        try:
+            return pa.ipc.open_stream(rfile).read_all()
+        finally:
+            rfile.close()
+            sock.close()
+
+    def frame(self, table: str, columns=None, filters=None, tracks=None, limit=None):
+        """:meth:`scan` as a pandas DataFrame."""
+        return self.scan(table, columns, filters, tracks, limit).to_pandas()
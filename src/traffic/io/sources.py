@@ -0,0 +1,22 @@
+"""Locating a scene's trajectory files and detecting when they change.
+
+Incremental caches (density rasters, movement cubes, the spatio-temporal index, the slice
+server) record :func:`fingerprint` of every source they ingested and compare it on the
+next run to find new or rewritten partitions.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+
+def fingerprint(path: Path) -> str:
+    st = path.stat()
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def trajectory_sources(processed: Path) -> list[Path]:
+    """``trajectories.parquet`` plus any partitions under ``trajectories/``."""
+    single = processed / "trajectories.parquet"
+    parts = sorted((processed / "trajectories").glob("*.parquet"))
+    return ([single] if single.exists() else []) + parts
@@ -0,0 +1,215 @@
+"""Compact encoded storage for ``tracks.parquet`` detections.
+
+The plain layout stores every box as int64 ``frame/track_id/cls`` and float64
+``conf/cx/cy/w/h``. The compact layout is still a single Parquet file, but
+
+* rows are sorted by ``(track_id, frame)`` so neighbouring rows are similar,
+* ``track_id`` is int32 and ``cls`` a uint8 code into a class table,
+* ``frame`` is delta-encoded within a track (absolute at the track's first row, then
+  mostly 1s),
+* ``conf/cx/cy/w/h`` are float32, or with ``coords="fixed"`` uint16 fixed-point on a
+  per-column ``offset + code * step`` grid (error <= step / 2, recorded in the file),
+
+and the whole file is zstd-compressed. The encoding parameters live in the Parquet
+schema metadata under ``traffic.tracks``. :func:`read_tracks` accepts both layouts and
+returns the plain column names, so existing readers keep working.
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TRACKS_VERSION = 1
+META_KEY = b"traffic.tracks"
+VALUE_COLS = ("conf", "cx", "cy", "w", "h")
+_FIXED_MAX = np.iinfo(np.uint16).max
+
+
+@dataclass
+class CompactTracks:
+    """In-memory compact tracks; ``raw`` arrays are views of the decoded Arrow buffers.
+
+    Track ``i`` occupies rows ``offsets[i]:offsets[i + 1]``.
+    """
+
+    track_ids: np.ndarray  # (n_tracks,) int32, sorted
+    offsets: np.ndarray  # (n_tracks + 1,) int64
+    raw: dict[str, np.ndarray]  # stored columns: frame_delta, cls_code, conf, cx, ...
+    classes: np.ndarray  # cls value of each cls_code
+    scales: dict[str, tuple[float, float]]  # fixed-point (offset, step) per column
+
+    def __len__(self) -> int:
+        return len(self.raw["frame_delta"])
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def frame0(self) -> np.ndarray:
+        """First frame of every track."""
+        return self.raw["frame_delta"][self.offsets[:-1]]
+
+    @property
+    def frame(self) -> np.ndarray:
+        # segmented cumsum: restart the running sum at every track's absolute first frame
+        d = self.raw["frame_delta"]
+        csum = np.cumsum(d, dtype=np.int64)
+        starts = self.offsets[:-1]
+        base = np.repeat(csum[starts] - d[starts], self.lengths)
+        return (csum - base).astype(np.int32)
+
+    @property
+    def track_id(self) -> np.ndarray:
+        return np.repeat(self.track_ids, self.lengths)
+
+    @property
+    def cls(self) -> np.ndarray:
+        return self.classes[self.raw["cls_code"]]
+
+    def values(self, col: str) -> np.ndarray:
+        """Decoded float32 column (a view when stored as float32)."""
+        v = self.raw[col]
+        if col in self.scales:
+            offset, step = self.scales[col]
+            return (v * np.float32(step) + np.float32(offset)).astype(np.float32)
+        return v
+
+    def to_frame(self) -> pd.DataFrame:
+        """Plain ``tracks.parquet`` layout (frame, track_id, cls, conf, cx, cy, w, h)."""
+        out = {"frame": self.frame, "track_id": self.track_id, "cls": self.cls}
+        out.update({c: self.values(c) for c in VALUE_COLS if c in self.raw})
+        return pd.DataFrame(out)
+
+
+def encode_tracks(df: pd.DataFrame, coords: str = "float32") -> CompactTracks:
+    """Encode a plain detections table; ``coords`` is ``"float32"`` or ``"fixed"``."""
+    if coords not in ("float32", "fixed"):
+        raise ValueError(f"coords must be 'float32' or 'fixed', got {coords!r}")
+    tid = df["track_id"].to_numpy()
+    frame = df["frame"].to_numpy()
+    order = np.lexsort((frame, tid))
+    tid, frame = tid[order].astype(np.int32), frame[order].astype(np.int64)
+    track_ids, first = np.unique(tid, return_index=True)
+    offsets = np.append(first, len(tid)).astype(np.int64)
+
+    delta = np.empty(len(frame), dtype=np.int32)
+    delta[1:] = np.diff(frame)
+    delta[first] = frame[first]
+    classes, codes = np.unique(df["cls"].to_numpy()[order], return_inverse=True)
+    if len(classes) > 256:
+        raise ValueError(f"{len(classes)} classes do not fit a uint8 code")
+    raw = {"frame_delta": delta, "cls_code": codes.astype(np.uint8)}
+    scales = {}
+    for c in VALUE_COLS:
+        if c not in df:
+            continue
+        v = df[c].to_numpy(dtype=np.float64)[order]
+        if coords == "fixed" and len(v):
+            lo, hi = float(v.min()), float(v.max())
+            step = (hi - lo) / _FIXED_MAX or 1.0
+            raw[c] = np.rint((v - lo) / step).astype(np.uint16)
+            scales[c] = (lo, step)
+        else:
+            raw[c] = v.astype(np.float32)
+    return CompactTracks(
+        track_ids=track_ids,
+        offsets=offsets,
+        raw=raw,
+        classes=classes,
+        scales=scales,
+    )
+
+
+def write_tracks(
+    df: pd.DataFrame | CompactTracks,
+    path: str | Path,
+    coords: str = "float32",
+    compression: str = "zstd",
+) -> None:
+    """Write detections in the compact layout (see module docstring)."""
+    ct = df if isinstance(df, CompactTracks) else encode_tracks(df, coords)
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    meta = dict(
+        version=TRACKS_VERSION,
+        classes=ct.classes.tolist(),
+        scales=ct.scales,
+    )
+    # track_id repeats in runs, which DELTA_BINARY_PACKED stores in a few bits per row
+    cols = {"track_id": np.repeat(ct.track_ids, ct.lengths), **ct.raw}
+    table = pa.table(cols).replace_schema_metadata({META_KEY: json.dumps(meta).encode()})
+    pq.write_table(
+        table,
+        path,
+        compression=compression,
+        use_dictionary=["cls_code"],
+        column_encoding={"track_id": "DELTA_BINARY_PACKED", "frame_delta": "DELTA_BINARY_PACKED"},
+        row_group_size=1 << 20,
+    )
+
+
+def load_tracks(path: str | Path) -> CompactTracks:
+    """Load a compact tracks file without converting it to pandas."""
+    table = pq.read_table(path)
+    meta_raw = (table.schema.metadata or {}).get(META_KEY)
+    if meta_raw is None:
+        # plain layout: encode on the fly so callers get the same interface
+        return encode_tracks(table.to_pandas())
+    meta = json.loads(meta_raw)
+    if meta.get("version") != TRACKS_VERSION:
+        raise ValueError(f"{path}: tracks format version {meta.get('version')}")
+    table = table.combine_chunks()
+    arrays = {
+        name: (
+            table.column(name).chunk(0).to_numpy(zero_copy_only=True)
+            if table.num_rows
+            else np.zeros(0, dtype=table.schema.field(name).type.to_pandas_dtype())
+        )
+        for name in table.column_names
+    }
+    tid = arrays.pop("track_id")
+    first = np.flatnonzero(np.r_[True, tid[1:] != tid[:-1]]) if len(tid) else np.zeros(0, int)
+    offsets = np.append(first, len(tid)).astype(np.int64)
+    return CompactTracks(
+        track_ids=tid[first],
+        offsets=offsets,
+        raw=arrays,
+        classes=np.asarray(meta["classes"]),
+        scales={k: tuple(v) for k, v in meta["scales"].items()},
+    )
+
+
+def read_tracks(path: str | Path) -> pd.DataFrame:
+    """Detections as the plain ``tracks.parquet`` DataFrame, whichever layout is on disk."""
+    schema = pq.read_schema(path)
+    if META_KEY not in (schema.metadata or {}):
+        return pd.read_parquet(path)
+    return load_tracks(path).to_frame()
+
+
+def tracks_source(interim: str | Path, stitched: bool = False) -> Path:
+    """The tracks trajectories are built from: ``tracks_stitched.parquet`` if ``stitched``
+    and present, else ``tracks.parquet``.
+
+    Raises RuntimeError if the stitched file is older than ``tracks.parquet``.
+    """
+    src = Path(interim) / "tracks.parquet"
+    out = src.with_name("tracks_stitched.parquet")
+    if not stitched or not out.exists():
+        return src
+    # stitch_tracks.py writes it after reading tracks.parquet; older means run_track.py
+    # has rewritten the tracks since
+    if out.stat().st_mtime_ns < src.stat().st_mtime_ns:
+        raise RuntimeError(
+            f"{out} is older than {src}; rerun stitch_tracks.py "
+            "or build from the raw tracks with stitch.enabled=false"
+        )
+    return out
@@ -0,0 +1,272 @@
+"""Synthetic 4-way intersection detections in ``tracks.parquet`` layout.
+
+Vehicles arrive on the four approaches (N, E, S, W) as Poisson processes, pick a
+movement (through / left / right, optionally U-turn), drive at a per-vehicle constant
+speed along the lane centreline and are observed once per frame with Gaussian
+position/size noise. Optionally a fraction of tracks is split into two IDs with a
+detection gap (tracker ID switches) and a fraction is replaced by erratic outlier tracks.
+
+Coordinates are pixels of a ``width`` x ``height`` frame, matching ``run_track.py``, or
+normalized to [0, 1] like the legacy JSON imports.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+APPROACHES = ("N", "E", "S", "W")
+# direction of travel when entering from each approach (image coordinates, y down)
+_HEADING = {
+    "N": np.array([0.0, 1.0]),
+    "E": np.array([-1.0, 0.0]),
+    "S": np.array([0.0, -1.0]),
+    "W": np.array([1.0, 0.0]),
+}
+
+
+@dataclass
+class IntersectionSpec:
+    width: int = 1920
+    height: int = 1080
+    fps: float = 30.0
+    # half size of the junction box, as a fraction of min(width, height)
+    box: float = 0.12
+    # lane centre offset from the road axis, as a fraction of min(width, height)
+    lane_offset: float = 0.03
+    # vehicles per second per approach
+    arrival_rate: dict[str, float] = field(
+        default_factory=lambda: {"N": 0.15, "E": 0.25, "S": 0.15, "W": 0.25}
+    )
+    movements: dict[str, float] = field(
+        default_factory=lambda: {"through": 0.6, "left": 0.2, "right": 0.2, "uturn": 0.0}
+    )
+    # mean / std of vehicle speed, in frame heights per second
+    speed: float = 0.25
+    speed_std: float = 0.05
+    # per-detection Gaussian noise (pixels) on centre and box size
+    pos_noise: float = 1.5
+    size_noise: float = 2.0
+    # class id -> (probability, box width px, box height px)
+    classes: dict[int, tuple[float, float, float]] = field(
+        default_factory=lambda: {
+            2: (0.85, 90.0, 60.0),
+            7: (0.1, 160.0, 90.0),
+            5: (0.05, 180.0, 100.0),
+        }
+    )
+    # fraction of tracks split into two IDs, and the gap length range in frames
+    id_break_prob: float = 0.05
+    id_break_gap: tuple[int, int] = (2, 15)
+    # fraction of tracks replaced by erratic random-walk tracks
+    outlier_frac: float = 0.02
+    # emit cx/w and cy/h divided by width/height (legacy JSON convention) instead of pixels
+    normalized: bool = False
+
+
+def _turn(heading: np.ndarray, movement: str) -> np.ndarray:
+    right = np.array([-heading[1], heading[0]])
+    return {"through": heading, "right": right, "left": -right, "uturn": -heading}[movement]
+
+
+def movement_path(spec: IntersectionSpec, approach: str, movement: str) -> np.ndarray:
+    """Polyline (k, 2) of the lane centreline for one movement, in pixels."""
+    c = np.array([spec.width / 2.0, spec.height / 2.0])
+    s = float(min(spec.width, spec.height))
+    box, off = spec.box * s, spec.lane_offset * s
+    h_in = _HEADING[approach]
+    h_out = _turn(h_in, movement)
+
+    def lane(h: np.ndarray) -> np.ndarray:
+        return np.array([-h[1], h[0]]) * off
+
+    def edge(h: np.ndarray) -> float:
+        # distance from the centre to the frame border along h
+        return abs(h[0]) * spec.width / 2.0 + abs(h[1]) * spec.height / 2.0
+
+    entry = c - h_in * edge(h_in) + lane(h_in)
+    stop = c - h_in * box + lane(h_in)
+    start_out = c + h_out * box + lane(h_out)
+    end = c + h_out * edge(h_out) + lane(h_out)
+    if movement == "through":
+        return np.vstack([entry, stop, start_out, end])
+    # quadratic Bezier through the intersection of the incoming and outgoing lane lines
+    ctrl = stop + h_in * float(np.dot(start_out - stop, h_in))
+    if movement == "uturn":
+        ctrl = c + h_in * box * 0.5
+    t = np.linspace(0.0, 1.0, 17)[:, None]
+    curve = (1 - t) ** 2 * stop + 2 * (1 - t) * t * ctrl + t**2 * start_out
+    return np.vstack([entry, curve, end])
+
+
+def _sample_path(
+    path: np.ndarray, speeds: np.ndarray, fps: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sample a shared path at constant per-vehicle speeds.
+
+    Returns the vehicle index and the x/y position of every observation, flat.
+    """
+    seg = np.hypot(*np.diff(path, axis=0).T)
+    cum = np.concatenate([[0.0], np.cumsum(seg)])
+    step = speeds / fps
+    lengths = np.floor(cum[-1] / step).astype(np.int64) + 1
+    owner = np.repeat(np.arange(len(speeds)), lengths)
+    starts = np.cumsum(lengths) - lengths
+    local = np.arange(lengths.sum()) - np.repeat(starts, lengths)
+    s = local * step[owner]
+    return owner, np.interp(s, cum, path[:, 0]), np.interp(s, cum, path[:, 1])
+
+
+def _random_walks(
+    spec: IntersectionSpec, n: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    lengths = rng.integers(int(spec.fps * 2), int(spec.fps * 8), size=n)
+    owner = np.repeat(np.arange(n), lengths)
+    starts = np.cumsum(lengths) - lengths
+    step = spec.speed * spec.height / spec.fps
+    ang = rng.uniform(0, 2 * np.pi, n)[owner] + np.cumsum(rng.normal(0, 0.15, owner.size))
+    dx, dy = np.cos(ang) * step, np.sin(ang) * step
+    # restart the cumulative walk at each track start
+    x = np.cumsum(dx)
+    y = np.cumsum(dy)
+    x -= np.repeat(x[starts] - dx[starts], lengths)
+    y -= np.repeat(y[starts] - dy[starts], lengths)
+    x += rng.uniform(0, spec.width, n)[owner]
+    y += rng.uniform(0, spec.height, n)[owner]
+    return owner, np.clip(x, 0, spec.width), np.clip(y, 0, spec.height)
+
+
+def generate_intersection(
+    spec: IntersectionSpec | None = None, n_tracks: int = 1000, seed: int = 42
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Generate ``n_tracks`` synthetic vehicles (before ID breaks).
+
+    Returns
+    -------
+    detections : pd.DataFrame
+        Columns: frame, track_id, cls, conf, cx, cy, w, h (``tracks.parquet`` layout),
+        sorted by frame then track_id.
+    truth : pd.DataFrame
+        One row per emitted track_id: approach, movement, is_outlier and vehicle (the
+        original vehicle id; fragments created by ID breaks share it).
+    """
+    spec = spec or IntersectionSpec()
+    rng = np.random.default_rng(seed)
+
+    rates = np.array([spec.arrival_rate.get(a, 0.0) for a in APPROACHES], dtype=float)
+    approach = rng.choice(len(APPROACHES), size=n_tracks, p=rates / rates.sum())
+    # superposition of the per-approach Poisson processes
+    arrival_s = np.cumsum(rng.exponential(1.0 / rates.sum(), size=n_tracks))
+    start_frame = np.floor(arrival_s * spec.fps).astype(np.int64)
+
+    moves = [m for m, p in spec.movements.items() if p > 0]
+    mp = np.array([spec.movements[m] for m in moves], dtype=float)
+    movement = rng.choice(len(moves), size=n_tracks, p=mp / mp.sum())
+    speeds = np.clip(rng.normal(spec.speed, spec.speed_std, n_tracks), spec.speed * 0.3, None)
+    speeds *= spec.height
+    is_outlier = rng.random(n_tracks) < spec.outlier_frac
+
+    owners, xs, ys = [], [], []
+    for a in range(len(APPROACHES)):
+        for m in range(len(moves)):
+            idx = np.flatnonzero((approach == a) & (movement == m) & ~is_outlier)
+            if idx.size == 0:
+                continue
+            path = movement_path(spec, APPROACHES[a], moves[m])
+            o, x, y = _sample_path(path, speeds[idx], spec.fps)
+            owners.append(idx[o])
+            xs.append(x)
+            ys.append(y)
+    out_idx = np.flatnonzero(is_outlier)
+    if out_idx.size:
+        o, x, y = _random_walks(spec, out_idx.size, rng)
+        owners.append(out_idx[o])
+        xs.append(x)
+        ys.append(y)
+
+    owner = np.concatenate(owners) if owners else np.zeros(0, dtype=np.int64)
+    x = np.concatenate(xs) if xs else np.zeros(0)
+    y = np.concatenate(ys) if ys else np.zeros(0)
+    order = np.argsort(owner, kind="stable")
+    owner, x, y = owner[order], x[order], y[order]
+    counts = np.bincount(owner, minlength=n_tracks)
+    local = np.arange(owner.size) - np.repeat(np.cumsum(counts) - counts, counts)
+    frame = start_frame[owner] + local
+
+    # ID breaks: drop a gap of frames and relabel the remainder with a fresh id
+    track_id = owner.copy()
+    keep = np.ones(owner.size, dtype=bool)
+    broken = np.flatnonzero((rng.random(n_tracks) < spec.id_break_prob) & (counts > 30))
+    if broken.size:
+        cut = (counts[broken] * rng.uniform(0.2, 0.8, broken.size)).astype(np.int64)
+        gap = rng.integers(spec.id_break_gap[0], spec.id_break_gap[1] + 1, broken.size)
+        cut_of = np.full(n_tracks, np.iinfo(np.int64).max)
+        gap_of = np.zeros(n_tracks, dtype=np.int64)
+        cut_of[broken], gap_of[broken] = cut, gap
+        new_id = np.full(n_tracks, -1)
+        new_id[broken] = n_tracks + np.arange(broken.size)
+        after = local >= cut_of[owner]
+        keep &= ~(after & (local < cut_of[owner] + gap_of[owner]))
+        track_id = np.where(after, new_id[owner], track_id)
+
+    n = owner.size
+    cls_ids = np.array(list(spec.classes), dtype=np.int64)
+    cls_p = np.array([v[0] for v in spec.classes.values()])
+    track_cls = rng.choice(len(cls_ids), size=n_tracks, p=cls_p / cls_p.sum())
+    base_w = np.array([v[1] for v in spec.classes.values()])[track_cls]
+    base_h = np.array([v[2] for v in spec.classes.values()])[track_cls]
+
+    det = pd.DataFrame(
+        {
+            "frame": frame,
+            "track_id": track_id,
+            "cls": cls_ids[track_cls][owner],
+            "conf": rng.uniform(0.35, 0.95, n),
+            "cx": np.clip(x + rng.normal(0, spec.pos_noise, n), 0, spec.width),
+            "cy": np.clip(y + rng.normal(0, spec.pos_noise, n), 0, spec.height),
+            "w": np.maximum(base_w[owner] + rng.normal(0, spec.size_noise, n), 1.0),
+            "h": np.maximum(base_h[owner] + rng.normal(0, spec.size_noise, n), 1.0),
+        }
+    )[keep]
+    det = det.sort_values(["frame", "track_id"], kind="stable").reset_index(drop=True)
+    if spec.normalized:
+        det[["cx", "w"]] /= spec.width
+        det[["cy", "h"]] /= spec.height
+
+    ids, first = np.unique(track_id[keep], return_index=True)
+    veh = owner[keep][first]
+    truth = pd.DataFrame(
+        {
+            "track_id": ids,
+            "vehicle": veh,
+            "approach": np.array(APPROACHES)[approach[veh]],
+            "movement": np.where(is_outlier[veh], "outlier", np.array(moves)[movement[veh]]),
+            "is_outlier": is_outlier[veh],
+        }
+    )
+    return det, truth
+
+
+def mean_track_length(spec: IntersectionSpec | None = None) -> float:
+    """Rough expected detections per vehicle, used to size runs by detection count."""
+    spec = spec or IntersectionSpec()
+    total = sum(spec.arrival_rate.get(a, 0.0) for a in APPROACHES)
+    moves = sum(spec.movements.values())
+    length = 0.0
+    for a in APPROACHES:
+        for m, p in spec.movements.items():
+            w = spec.arrival_rate.get(a, 0.0) / total * p / moves
+            if w > 0:
+                length += w * float(np.hypot(*np.diff(movement_path(spec, a, m), axis=0).T).sum())
+    return length / (spec.speed * spec.height / spec.fps)
+
+
+def generate_detections(
+    n_detections: int, spec: IntersectionSpec | None = None, seed: int = 42
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Generate roughly ``n_detections`` rows (whole tracks, so never exact)."""
+    spec = spec or IntersectionSpec()
+    n_tracks = max(1, int(round(n_detections / mean_track_length(spec))))
+    return generate_intersection(spec, n_tracks=n_tracks, seed=seed)
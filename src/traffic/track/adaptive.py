@@ -0,0 +1,164 @@
+"""Deadline-driven adaptation of detector cost for real-time tracking.
+
+At ``stride`` s the detector must finish a frame within ``s / target_fps`` seconds for
+tracking to keep pace with the source. :class:`AdaptiveController` watches the median
+per-frame latency over a window of frames and moves along a ladder of operating points:
+
+* over budget: step to the next cheaper :class:`Level` (smaller ``imgsz`` and/or lighter
+  weights); at the cheapest level, increase the stride (skip source frames);
+* well under budget (``latency < headroom * budget`` at the better setting): first
+  reduce the stride, then step back up to a more expensive level. The latency of a
+  better level is taken from its last measurement; measurements older than ``reprobe``
+  processed frames are ignored, so a level that was too slow is retried once in a while
+  (load on the machine changes).
+
+After each change the controller waits ``cooldown`` frames before deciding again.
+Every change is kept in :attr:`AdaptiveController.decisions`. Skipped frames keep their
+source numbering: processed frames carry their source frame index, so trajectories
+built from them use the true frame spacing.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Iterator
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Level:
+    weights: str
+    imgsz: int | None = None
+
+    def __str__(self) -> str:
+        return f"{self.weights}@{self.imgsz}"
+
+
+@dataclass
+class Decision:
+    frame: int
+    action: str
+    level: str
+    stride: int
+    latency_ms: float
+    budget_ms: float
+
+
+class AdaptiveController:
+    """Chooses ``(level, stride)`` from measured latencies (see module docstring).
+
+    ``levels`` are ordered from most accurate (most expensive) to cheapest.
+    """
+
+    def __init__(
+        self,
+        levels: list[Level],
+        target_fps: float,
+        max_stride: int = 4,
+        window: int = 15,
+        headroom: float = 0.7,
+        cooldown: int = 30,
+        start_level: int = 0,
+        reprobe: int = 600,
+    ):
+        if not levels:
+            raise ValueError("at least one level is required")
+        self.levels = list(levels)
+        self.target_fps = float(target_fps)
+        self.max_stride = int(max_stride)
+        self.window = int(window)
+        self.headroom = float(headroom)
+        self.cooldown = int(cooldown)
+        self.reprobe = int(reprobe)
+        self.level = int(start_level)
+        self.stride = 1
+        self.decisions: list[Decision] = []
+        self._lat: list[float] = []
+        self._since_change = 0
+        self._n = 0
+        # (median latency, frame count) last measured at each level; stride does not
+        # change the per-frame latency
+        self._level_latency: dict[int, tuple[float, int]] = {}
+
+    @property
+    def current(self) -> Level:
+        return self.levels[self.level]
+
+    def budget(self, stride: int | None = None) -> float:
+        return (stride or self.stride) / self.target_fps
+
+    def observe(self, frame_idx: int, latency_s: float) -> Decision | None:
+        """Record one processed frame's latency; returns the decision if settings changed."""
+        self._lat.append(latency_s)
+        self._since_change += 1
+        self._n += 1
+        if len(self._lat) < self.window or self._since_change < self.cooldown:
+            return None
+        lat = float(np.median(self._lat[-self.window :]))
+        self._lat = self._lat[-self.window :]
+        self._level_latency[self.level] = (lat, self._n)
+        budget = self.budget()
+        if lat > budget:
+            if self.level < len(self.levels) - 1:
+                return self._change(frame_idx, "cheaper_level", lat, level=self.level + 1)
+            if self.stride < self.max_stride:
+                return self._change(frame_idx, "raise_stride", lat, stride=self.stride + 1)
+            return None
+        if self.stride > 1 and lat < self.headroom * self.budget(self.stride - 1):
+            return self._change(frame_idx, "lower_stride", lat, stride=self.stride - 1)
+        if self.stride == 1 and self.level > 0:
+            known, at = self._level_latency.get(self.level - 1, (None, 0))
+            if known is None or known < self.headroom * budget or self._n - at > self.reprobe:
+                return self._change(frame_idx, "better_level", lat, level=self.level - 1)
+        return None
+
+    def _change(self, frame_idx, action, lat, level=None, stride=None) -> Decision:
+        budget_ms = self.budget() * 1e3
+        if level is not None:
+            self.level = level
+        if stride is not None:
+            self.stride = stride
+        self._lat = []
+        self._since_change = 0
+        d = Decision(frame_idx, action, str(self.current), self.stride, lat * 1e3, budget_ms)
+        self.decisions.append(d)
+        log.info(
+            "frame %d: %s -> %s stride %d (median %.1f ms vs budget %.1f ms)",
+            frame_idx,
+            action,
+            d.level,
+            d.stride,
+            d.latency_ms,
+            d.budget_ms,
+        )
+        return d
+
+
+def strided_frames(source, controller: AdaptiveController) -> Iterator[tuple[int, np.ndarray]]:
+    """``(source_frame_index, frame)`` pairs, skipping frames per the controller's stride.
+
+    Skipped frames are only grabbed (demuxed), not decoded.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise OSError(f"cannot open video source {source!r}")
+    idx = 0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield idx, frame
+            stride = controller.stride
+            for _ in range(stride - 1):
+                if not cap.grab():
+                    return
+            idx += stride
+    finally:
+        cap.release()
@@ -0,0 +1,113 @@
+"""Ultralytics ByteTrack/BoT-SORT driven directly with detection arrays.
+
+``YOLO.track`` couples inference and tracking. Here the tracker is constructed from the
+same tracker YAML (``configs/tracker``) and fed plain NumPy detections, so one detector
+pass can serve recorded replays (:mod:`traffic.detect.cache`), several streams with
+independent tracker state, or frames the detector skipped. Behaviour matches
+``ultralytics.trackers.track``: the tracker is not updated on frames without boxes.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+TRACK_COLUMNS = ["frame", "track_id", "cls", "conf", "cx", "cy", "w", "h"]
+
+
+class Detections:
+    """The subset of ``ultralytics.engine.results.Boxes`` the trackers read."""
+
+    def __init__(self, xyxy: np.ndarray, conf: np.ndarray, cls: np.ndarray):
+        self.xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32).ravel()
+        self.cls = np.asarray(cls, dtype=np.float32).ravel()
+
+    def __len__(self) -> int:
+        return len(self.conf)
+
+    def __getitem__(self, idx) -> "Detections":
+        return Detections(self.xyxy[idx], self.conf[idx], self.cls[idx])
+
+    @property
+    def xywh(self) -> np.ndarray:
+        out = self.xyxy.copy()
+        out[:, 2:] -= out[:, :2]
+        out[:, :2] += out[:, 2:] / 2
+        return out
+
+
+def boxes_to_arrays(res) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(xyxy, conf, cls) NumPy arrays from one Ultralytics result (empty if no boxes)."""
+    boxes = getattr(res, "boxes", None)
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.float32)
+    boxes = boxes.cpu().numpy()
+    cls = boxes.cls if boxes.cls is not None else np.full(len(boxes), -1.0)
+    return boxes.xyxy.astype(np.float32), boxes.conf.astype(np.float32), cls
+
+
+def make_tracker(tracker_yaml: str, frame_rate: float = 30, **overrides):
+    """Tracker described by an Ultralytics tracker YAML, with optional parameter overrides."""
+    from ultralytics.trackers.track import TRACKER_MAP
+    from ultralytics.utils import IterableSimpleNamespace, yaml_load
+    from ultralytics.utils.checks import check_yaml
+
+    args = {**yaml_load(check_yaml(tracker_yaml)), **overrides}
+    if args.get("tracker_type") not in TRACKER_MAP:
+        raise ValueError(f"unsupported tracker_type {args.get('tracker_type')!r}")
+    return TRACKER_MAP[args["tracker_type"]](
+        args=IterableSimpleNamespace(**args), frame_rate=int(frame_rate)
+    )
+
+
+class StreamTracker:
+    """One stream's tracker state; accumulates ``tracks.parquet`` rows as arrays."""
+
+    def __init__(self, tracker_yaml: str, frame_rate: float = 30, **overrides):
+        self.tracker = make_tracker(tracker_yaml, frame_rate, **overrides)
+        self._chunks: list[np.ndarray] = []
+        self.frames = 0
+
+    def update(self, frame_idx: int, xyxy, conf, cls, img=None) -> np.ndarray:
+        """Track one frame; returns ``(n, 7)`` [x1, y1, x2, y2, track_id, conf, cls]."""
+        self.frames += 1
+        dets = Detections(xyxy, conf, cls)
+        if len(dets) == 0:
+            return np.zeros((0, 7), np.float32)
+        tracks = self.tracker.update(dets, img)
+        if len(tracks) == 0:
+            return np.zeros((0, 7), np.float32)
+        tracks = np.asarray(tracks, dtype=np.float64)[:, :7]
+        x1, y1, x2, y2 = tracks[:, 0], tracks[:, 1], tracks[:, 2], tracks[:, 3]
+        self._chunks.append(
+            np.column_stack(
+                [
+                    np.full(len(tracks), frame_idx),
+                    tracks[:, 4],
+                    tracks[:, 6],
+                    tracks[:, 5],
+                    (x1 + x2) / 2,
+                    (y1 + y2) / 2,
+                    x2 - x1,
+                    y2 - y1,
+                ]
+            )
+        )
+        return tracks.astype(np.float32)
+
+    def to_frame(self) -> pd.DataFrame:
+        data = np.concatenate(self._chunks) if self._chunks else np.zeros((0, 8))
+        df = pd.DataFrame(data, columns=TRACK_COLUMNS)
+        return df.astype({"frame": np.int64, "track_id": np.int64, "cls": np.int64})
+
+
+def replay(cache, tracker_yaml: str, frame_rate: float = 30, min_conf=None, **overrides):
+    """Run a tracker over a :class:`~traffic.detect.cache.DetectionCache`.
+
+    Returns the ``tracks.parquet`` DataFrame and the number of frames replayed.
+    """
+    st = StreamTracker(tracker_yaml, frame_rate, **overrides)
+    for i in range(cache.n_frames):
+        st.update(i, *cache.frame(i, min_conf))
+    return st.to_frame(), st.frames
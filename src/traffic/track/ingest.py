@@ -0,0 +1,166 @@
+"""Asyncio supervisor that ingests many camera sources with bounded latency.
+
+Each source gets a reader task and a worker task joined by a bounded queue:
+
+* the reader pulls frames from the source (blocking decode runs in a thread), stamps
+  them with their capture time and, for files standing in for cameras, paces them at
+  the source's native fps. When the queue is full the oldest queued frame is dropped,
+  so the reader never blocks on a slow worker;
+* the worker skips frames whose age already exceeds ``max_lag_s`` (stale) and hands
+  the rest to ``process(name, frame_idx, frame)`` in a thread;
+* a source that fails (or, with ``loop``, ends) is reopened after ``reconnect_s``,
+  doubling the delay on consecutive failures up to ``max_reconnect_s``; after
+  ``max_restarts`` it is given up.
+
+Frame indices count frames read since the source was first opened, so dropped frames
+leave gaps rather than shifting later frames. Per-source lag (capture to processed)
+and drop counts are kept in :class:`SourceStats`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+import numpy as np
+
+from traffic.track.multistream import video_frames
+from traffic.utils.metrics import metrics
+
+
+@dataclass
+class SourceSpec:
+    name: str
+    uri: str | int
+    fps: float | None = None  # pace replay at this rate (files standing in for cameras)
+    queue_size: int = 4
+    max_lag_s: float = 0.5
+    loop: bool = False  # reopen a file when it ends
+    reconnect_s: float = 1.0
+    max_reconnect_s: float = 30.0
+    max_restarts: int | None = None
+
+
+@dataclass
+class SourceStats:
+    read: int = 0
+    processed: int = 0
+    dropped_full: int = 0
+    dropped_stale: int = 0
+    restarts: int = 0
+    errors: list[str] = field(default_factory=list)
+    lag_s: list[float] = field(default_factory=list)
+    process_s: float = 0.0
+
+    def lag_ms(self, q: float) -> float | None:
+        return float(np.percentile(self.lag_s, q) * 1e3) if self.lag_s else None
+
+    def summary(self) -> dict:
+        return dict(
+            read=self.read,
+            processed=self.processed,
+            dropped_full=self.dropped_full,
+            dropped_stale=self.dropped_stale,
+            restarts=self.restarts,
+            lag_p50_ms=self.lag_ms(50),
+            lag_p95_ms=self.lag_ms(95),
+            lag_max_ms=self.lag_ms(100),
+        )
+
+
+class IngestSupervisor:
+    def __init__(
+        self,
+        sources: list[SourceSpec],
+        process: Callable[[str, int, np.ndarray], object],
+        opener: Callable[[SourceSpec], Iterator[np.ndarray]] | None = None,
+    ):
+        names = [s.name for s in sources]
+        if len(set(names)) != len(names):
+            raise ValueError(f"duplicate source names in {names}")
+        self.sources = {s.name: s for s in sources}
+        self.process = process
+        self.opener = opener or (lambda spec: video_frames(spec.uri))
+        self.stats = {s.name: SourceStats() for s in sources}
+
+    async def _next(self, it: Iterator[np.ndarray]):
+        return await asyncio.to_thread(next, it, None)
+
+    async def _reader(self, spec: SourceSpec, q: asyncio.Queue) -> None:
+        st = self.stats[spec.name]
+        delay = spec.reconnect_s
+        while True:
+            ended = False
+            try:
+                it = await asyncio.to_thread(self.opener, spec)
+                t0, n0 = time.monotonic(), st.read
+                while True:
+                    frame = await self._next(it)
+                    if frame is None:
+                        ended = True
+                        break
+                    if spec.fps:
+                        due = t0 + (st.read - n0) / spec.fps
+                        await asyncio.sleep(max(0.0, due - time.monotonic()))
+                    if q.full():
+                        q.get_nowait()
+                        st.dropped_full += 1
+                    q.put_nowait((st.read, time.monotonic(), frame))
+                    st.read += 1
+                    delay = spec.reconnect_s  # healthy again
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # decoder or network failure: reconnect below
+                st.errors.append(f"{type(e).__name__}: {e}")
+            if ended and not spec.loop:
+                break
+            if spec.max_restarts is not None and st.restarts >= spec.max_restarts:
+                break
+            st.restarts += 1
+            metrics.count(f"restarts@{spec.name}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, spec.max_reconnect_s)
+        await q.put(None)
+
+    async def _worker(self, spec: SourceSpec, q: asyncio.Queue) -> None:
+        st = self.stats[spec.name]
+        while True:
+            item = await q.get()
+            if item is None:
+                return
+            idx, t_cap, frame = item
+            if time.monotonic() - t_cap > spec.max_lag_s:
+                st.dropped_stale += 1
+                continue
+            t0 = time.monotonic()
+            await asyncio.to_thread(self.process, spec.name, idx, frame)
+            now = time.monotonic()
+            st.process_s += now - t0
+            st.processed += 1
+            st.lag_s.append(now - t_cap)
+
+    async def run(self, duration: float | None = None) -> dict[str, SourceStats]:
+        """Ingest until every source ends (or ``duration`` seconds pass)."""
+        tasks = []
+        for spec in self.sources.values():
+            q: asyncio.Queue = asyncio.Queue(maxsize=spec.queue_size)
+            tasks.append(asyncio.create_task(self._reader(spec, q), name=f"read-{spec.name}"))
+            tasks.append(asyncio.create_task(self._worker(spec, q), name=f"work-{spec.name}"))
+        try:
+            await asyncio.wait_for(asyncio.gather(*tasks), duration)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for t in tasks:
+                t.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for name, st in self.stats.items():
+            metrics.count(f"frames@{name}", st.processed)
+            metrics.count(f"dropped_full@{name}", st.dropped_full)
+            metrics.count(f"dropped_stale@{name}", st.dropped_stale)
+            for k in (50, 95):
+                if st.lag_s:
+                    metrics.gauge(f"lag_p{k}_ms@{name}", st.lag_ms(k))
+        return self.stats
@@ -0,0 +1,170 @@
+"""Track several video streams with one batched detector call per step.
+
+Every stream is decoded on its own thread into a small bounded queue. Each step takes
+the next frame of every live stream, runs a single batched ``predict`` on the stacked
+frames and routes each result to that stream's own tracker
+(:class:`~traffic.track.bytetrack.StreamTracker`), so tracker state never mixes between
+cameras. Streams of different lengths simply drop out of the batch when they end.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from traffic.track.bytetrack import boxes_to_arrays
+from traffic.utils.metrics import metrics, stage
+
+_END = object()
+
+
+def video_frames(source: str | int) -> Iterator[np.ndarray]:
+    """BGR frames of a video file, device index or stream URL."""
+    import cv2
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise OSError(f"cannot open video source {source!r}")
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                return
+            yield frame
+    finally:
+        cap.release()
+
+
+class FrameReader:
+    """Decodes one stream on a daemon thread into a bounded queue."""
+
+    def __init__(self, frames: Iterable[np.ndarray], queue_size: int = 8, name: str = ""):
+        self.name = name
+        self._q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._error: BaseException | None = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, args=(frames,), name=f"decode-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        """Blocking put that gives up once the reader is closed (nobody drains the queue)."""
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, frames: Iterable[np.ndarray]) -> None:
+        try:
+            for frame in frames:
+                if not self._put(frame):
+                    return
+        except BaseException as e:  # surfaced to the consumer in get()
+            self._error = e
+        finally:
+            close = getattr(frames, "close", None)
+            if close is not None:  # release the capture now, not when the thread is collected
+                close()
+            self._put(_END)
+
+    def get(self) -> np.ndarray | None:
+        """Next frame, or None once the stream has ended."""
+        item = self._q.get()
+        if item is _END:
+            if self._error is not None:
+                raise RuntimeError(f"stream {self.name!r} failed") from self._error
+            return None
+        return item
+
+    def close(self) -> None:
+        self._stop.set()
+
+
+@dataclass
+class StreamStats:
+    frames: int = 0
+    boxes: int = 0
+    decode_wait_s: float = 0.0
+
+
+@dataclass
+class MultiStreamResult:
+    stats: dict[str, StreamStats] = field(default_factory=dict)
+    batches: int = 0
+    wall_s: float = 0.0
+
+    @property
+    def frames(self) -> int:
+        return sum(s.frames for s in self.stats.values())
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.wall_s if self.wall_s > 0 else 0.0
+
+
+def track_streams(
+    readers: dict[str, FrameReader],
+    predict: Callable[[list[np.ndarray]], Sequence],
+    trackers: dict,
+    max_batch: int | None = None,
+    max_frames: int | None = None,
+    rois: dict | None = None,
+) -> MultiStreamResult:
+    """Batched detection over ``readers``, each result tracked by ``trackers[name]``.
+
+    ``predict`` maps a list of frames to one Ultralytics-style result per frame.
+    ``max_batch`` splits a step into several predict calls when there are many streams.
+    Streams with a :class:`~traffic.detect.roi.Roi` in ``rois`` are cropped before
+    inference and their boxes filtered to the ROI before tracking.
+    """
+    rois = rois or {}
+    out = MultiStreamResult(stats={name: StreamStats() for name in readers})
+    live = list(readers)
+    t0 = time.perf_counter()
+    try:
+        while live:
+            names, frames = [], []
+            for name in live:
+                w0 = time.perf_counter()
+                frame = readers[name].get()
+                out.stats[name].decode_wait_s += time.perf_counter() - w0
+                if frame is None or (max_frames and out.stats[name].frames >= max_frames):
+                    continue
+                names.append(name)
+                frames.append(frame)
+            live = names
+            if not frames:
+                break
+            step = max_batch or len(frames)
+            for lo in range(0, len(frames), step):
+                batch = [
+                    rois[n].crop(f) if n in rois else f
+                    for n, f in zip(names[lo : lo + step], frames[lo : lo + step])
+                ]
+                with stage("predict", items=len(batch)):
+                    results = predict(batch)
+                out.batches += 1
+                metrics.observe("batch_size", len(results))
+                for name, frame, res in zip(names[lo : lo + step], frames[lo : lo + step], results):
+                    xyxy, conf, cls = boxes_to_arrays(res)
+                    if name in rois:
+                        xyxy, conf, cls = rois[name].apply(frame.shape, xyxy, conf, cls)
+                    st = out.stats[name]
+                    with stage("track", items=1):
+                        trackers[name].update(st.frames, xyxy, conf, cls, frame)
+                    st.frames += 1
+                    st.boxes += len(conf)
+    finally:
+        for r in readers.values():
+            r.close()
+    out.wall_s = time.perf_counter() - t0
+    return out
@@ -0,0 +1,252 @@
+"""Stitch fragmented track IDs: link track ends to later track starts.
+
+Every track contributes an *end* (last position, velocity over its last rows, frame,
+box size) and a *start* (the same at its first rows). End ``i`` may link to start ``j``
+when ``1 <= gap = frame0_j - frame1_i <= max_gap`` and the start lies within the gate
+``gate_boxes * size_i * (1 + gap / max_gap)`` of the end's constant-velocity prediction
+``p_i + v_i * gap``, the headings at the end and the start differ by at most
+``max_turn_deg`` (this rejects a vehicle leaving the frame next to one entering it)
+and, with ``same_class``, both have the same class.
+
+Candidates come from a ``cKDTree`` over the starts in ``(x, y, lambda * frame)``: each end
+queries one ball that contains every position its gate can reach within ``max_gap``
+frames, so the search is O(n log n) rather than all pairs; the exact gate is then applied
+to the returned pairs. Pairs are scored by gate-normalised prediction error plus weighted
+velocity mismatch and gap, and links are chosen by a minimum-cost assignment (ends may
+stay unlinked at cost ``miss_cost``) solved separately on each connected component of
+the candidate graph, which keeps every problem small.
+
+Linked fragments form chains; each chain takes the id of its first fragment.
+:func:`rewrite_ids` applies the mapping to a :class:`~traffic.io.tracks_store.CompactTracks`
+by permuting whole track segments, without decoding to pandas.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from traffic.io.tracks_store import CompactTracks
+from traffic.utils.lazy import lazy_import
+from traffic.utils.metrics import timed
+
+spatial = lazy_import("scipy.spatial")
+sparse = lazy_import("scipy.sparse")
+csgraph = lazy_import("scipy.sparse.csgraph")
+optimize = lazy_import("scipy.optimize")
+
+
+@dataclass(frozen=True)
+class StitchParams:
+    max_gap: int = 30
+    gate_boxes: float = 1.0
+    velocity_window: int = 5
+    velocity_weight: float = 0.5
+    gap_weight: float = 0.2
+    miss_cost: float = 1.5
+    same_class: bool = True
+    max_turn_deg: float = 100.0
+    min_speed_boxes: float = 0.02  # per frame; slower boxes have no reliable heading
+
+
+@dataclass
+class Endpoints:
+    """Per-track end (``*1``) and start (``*0``) state, aligned with ``track_ids``."""
+
+    track_ids: np.ndarray
+    frame0: np.ndarray
+    frame1: np.ndarray
+    p0: np.ndarray  # (n, 2)
+    p1: np.ndarray
+    v0: np.ndarray  # (n, 2) per frame
+    v1: np.ndarray
+    size: np.ndarray  # box size at the end
+    cls: np.ndarray
+
+
+def endpoints(ct: CompactTracks, window: int = 5) -> Endpoints:
+    """Vectorised start/end state of every track."""
+    frame = ct.frame.astype(np.float64)
+    xy = np.column_stack([ct.values("cx"), ct.values("cy")]).astype(np.float64)
+    first, last = ct.offsets[:-1], ct.offsets[1:] - 1
+    k = max(1, int(window) - 1)
+    first_k = np.minimum(first + k, last)
+    last_k = np.maximum(last - k, first)
+
+    def velocity(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        dt = frame[b] - frame[a]
+        v = (xy[b] - xy[a]) / np.where(dt > 0, dt, 1.0)[:, None]
+        v[dt <= 0] = 0.0
+        return v
+
+    size = np.sqrt(ct.values("w")[last].astype(np.float64) * ct.values("h")[last])
+    return Endpoints(
+        track_ids=ct.track_ids,
+        frame0=frame[first],
+        frame1=frame[last],
+        p0=xy[first],
+        p1=xy[last],
+        v0=velocity(first, first_k),
+        v1=velocity(last_k, last),
+        size=size,
+        cls=ct.cls[last],
+    )
+
+
+def candidate_pairs(ep: Endpoints, params: StitchParams) -> tuple[np.ndarray, np.ndarray]:
+    """(end index, start index) pairs inside the gate (see module docstring)."""
+    n, G = len(ep.track_ids), float(params.max_gap)
+    if n < 2:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    reach = params.gate_boxes * ep.size * 2.0 + np.hypot(*ep.v1.T) * G / 2
+    lam = max(float(np.median(reach)), 1e-9) / (G / 2)
+    starts = np.column_stack([ep.p0, lam * ep.frame0])
+    center = np.column_stack([ep.p1 + ep.v1 * (G + 1) / 2, lam * (ep.frame1 + (G + 1) / 2)])
+    radius = np.hypot(reach, lam * (G - 1) / 2) * (1 + 1e-9)
+    hits = spatial.cKDTree(starts).query_ball_point(center, radius)
+    counts = np.fromiter((len(h) for h in hits), dtype=np.int64, count=n)
+    ends = np.repeat(np.arange(n), counts)
+    sts = np.fromiter((j for h in hits for j in h), dtype=np.int64, count=int(counts.sum()))
+    gap = ep.frame0[sts] - ep.frame1[ends]
+    gate = _gate(ep, ends, gap, params)
+    pred = ep.p1[ends] + ep.v1[ends] * gap[:, None]
+    err = np.hypot(*(ep.p0[sts] - pred).T)
+    ok = (gap >= 1) & (gap <= G) & (err <= gate) & _heading_ok(ep, ends, sts, params)
+    if params.same_class:
+        ok &= ep.cls[ends] == ep.cls[sts]
+    return ends[ok], sts[ok]
+
+
+def _heading_ok(ep: Endpoints, ends, sts, params: StitchParams) -> np.ndarray:
+    """Headings within ``max_turn_deg`` of each other (ignored for near-stationary boxes)."""
+    ve, vs = ep.v1[ends], ep.v0[sts]
+    se, ss = np.hypot(*ve.T), np.hypot(*vs.T)
+    slow = params.min_speed_boxes * ep.size[ends]
+    cos = np.einsum("ij,ij->i", ve, vs) / np.maximum(se * ss, 1e-12)
+    return (se < slow) | (ss < slow) | (cos >= np.cos(np.radians(params.max_turn_deg)))
+
+
+def _gate(ep: Endpoints, ends: np.ndarray, gap: np.ndarray, params: StitchParams):
+    return params.gate_boxes * ep.size[ends] * (1 + gap / params.max_gap)
+
+
+def link_costs(ep: Endpoints, ends, sts, params: StitchParams) -> np.ndarray:
+    gap = ep.frame0[sts] - ep.frame1[ends]
+    gate = _gate(ep, ends, gap, params)
+    pred = ep.p1[ends] + ep.v1[ends] * gap[:, None]
+    pos = np.hypot(*(ep.p0[sts] - pred).T) / gate
+    dv = np.hypot(*(ep.v0[sts] - ep.v1[ends]).T) * params.max_gap / gate
+    return (
+        pos
+        + params.velocity_weight * np.minimum(dv, 1.0)
+        + params.gap_weight * gap / params.max_gap
+    )
+
+
+def assign(ends, sts, cost, n: int, miss_cost: float) -> tuple[np.ndarray, np.ndarray]:
+    """Minimum-cost links per connected component; ends can stay unlinked at ``miss_cost``."""
+    keep = cost < miss_cost
+    ends, sts, cost = ends[keep], sts[keep], cost[keep]
+    if not len(ends):
+        return ends, sts
+    # bipartite graph: end i is node i, start j is node n + j
+    g = sparse.coo_matrix((np.ones(len(ends)), (ends, n + sts)), shape=(2 * n, 2 * n))
+    _, comp = csgraph.connected_components(g, directed=False)
+    pair_comp = comp[ends]
+    order = np.argsort(pair_comp, kind="stable")
+    bounds = np.flatnonzero(np.diff(pair_comp[order])) + 1
+    out_e, out_s = [], []
+    for idx in np.split(order, bounds):
+        e, s, c = ends[idx], sts[idx], cost[idx]
+        if len(idx) == 1:
+            out_e.append(e)
+            out_s.append(s)
+            continue
+        ue, ei = np.unique(e, return_inverse=True)
+        us, si = np.unique(s, return_inverse=True)
+        # extra "unlinked" column per end
+        m = np.full((len(ue), len(us) + len(ue)), np.inf)
+        m[ei, si] = c
+        m[np.arange(len(ue)), len(us) + np.arange(len(ue))] = miss_cost
+        r, col = optimize.linear_sum_assignment(m)
+        linked = col < len(us)
+        out_e.append(ue[r[linked]])
+        out_s.append(us[col[linked]])
+    return np.concatenate(out_e), np.concatenate(out_s)
+
+
+def chain_roots(n: int, ends: np.ndarray, sts: np.ndarray) -> np.ndarray:
+    """Index of the first fragment of the chain each track belongs to."""
+    parent = np.arange(n)
+    parent[sts] = ends
+    # pointer jumping: O(log chain length) vectorised passes
+    while True:
+        grand = parent[parent]
+        if np.array_equal(grand, parent):
+            return parent
+        parent = grand
+
+
+@timed("stitch.links")
+def stitch_links(ct: CompactTracks, params: StitchParams | None = None) -> pd.DataFrame:
+    """One row per track: ``track_id``, ``stitched_id`` (its chain's first id),
+    ``linked_from`` (preceding fragment, -1 for chain heads), link ``gap`` and ``cost``,
+    and the number of gated ``candidates`` that could have preceded it.
+    """
+    params = params or StitchParams()
+    ep = endpoints(ct, params.velocity_window)
+    n = len(ep.track_ids)
+    ends, sts = candidate_pairs(ep, params)
+    cost = link_costs(ep, ends, sts, params)
+    le, ls = assign(ends, sts, cost, n, params.miss_cost)
+    root = chain_roots(n, le, ls)
+    linked_from = np.full(n, -1, dtype=np.int64)
+    linked_from[ls] = ep.track_ids[le]
+    gap = np.zeros(n)
+    gap[ls] = ep.frame0[ls] - ep.frame1[le]
+    link_cost = np.full(n, np.nan)
+    chosen = dict(zip(zip(ends.tolist(), sts.tolist()), cost.tolist()))
+    link_cost[ls] = [chosen[(e, s)] for e, s in zip(le.tolist(), ls.tolist())]
+    return pd.DataFrame(
+        dict(
+            track_id=ep.track_ids,
+            stitched_id=ep.track_ids[root],
+            linked_from=linked_from,
+            gap=gap,
+            cost=link_cost,
+            candidates=np.bincount(sts, minlength=n),
+        )
+    )
+
+
+def rewrite_ids(ct: CompactTracks, stitched_id: np.ndarray) -> CompactTracks:
+    """``ct`` with track ``i`` relabelled ``stitched_id[i]`` (segments reordered, no pandas)."""
+    frame0 = ct.frame0
+    order = np.lexsort((frame0, stitched_id))
+    lengths = ct.lengths[order]
+    new_ids, first_seg = np.unique(stitched_id[order], return_index=True)
+    seg_offsets = np.append(0, np.cumsum(lengths))
+    # row permutation: concatenate the source row ranges of the reordered segments
+    src_start = np.repeat(ct.offsets[:-1][order], lengths)
+    rows = src_start + (np.arange(seg_offsets[-1]) - np.repeat(seg_offsets[:-1], lengths))
+    raw = {k: v[rows] for k, v in ct.raw.items()}
+    # frame_delta is absolute at a segment's first row; rebase joined segments on the
+    # previous segment's last frame
+    frame = ct.frame
+    seg_first = seg_offsets[:-1]
+    joined = np.ones(len(order), dtype=bool)
+    joined[first_seg] = False
+    if joined.any():
+        prev_last = ct.offsets[1:][order[np.flatnonzero(joined) - 1]] - 1
+        delta = raw["frame_delta"].copy()
+        delta[seg_first[joined]] = frame0[order[joined]] - frame[prev_last]
+        raw["frame_delta"] = delta
+    return CompactTracks(
+        track_ids=new_ids.astype(ct.track_ids.dtype),
+        offsets=np.append(seg_first[first_seg], seg_offsets[-1]).astype(np.int64),
+        raw=raw,
+        classes=ct.classes,
+        scales=ct.scales,
+    )
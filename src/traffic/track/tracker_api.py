@@ -1,7 +1,5 @@
 from typing import Iterable
 
-from ultralytics import YOLO
-
 
 class UltralyticsTracker:
     def __init__(
@@ -13,6 +11,9 @@ class UltralyticsTracker:
         classes=None,
         imgsz=None,
     ):
+        # imported here: ultralytics pulls in torch, which dominates start-up
+        from ultralytics import YOLO
+
         self.model = YOLO(weights)
         self.kw = dict(device=device, conf=conf, classes=classes, tracker=tracker_yaml)
         if imgsz is not None:
@@ -21,3 +22,7 @@ class UltralyticsTracker:
     def track(self, source: str | int, stream: bool = True) -> Iterable:
         for res in self.model.track(source=source, stream=stream, **self.kw):
             yield res
+
+    def track_frame(self, frame):
+        """Track one in-memory frame, keeping tracker state between calls."""
+        return self.model.track(frame, persist=True, verbose=False, **self.kw)[0]
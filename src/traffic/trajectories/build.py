@@ -2,9 +2,21 @@ from __future__ import annotations
 
 import numpy as np
 import pandas as pd
-from scipy.signal import savgol_filter
 
+from traffic.trajectories.flat import FlatTracks
+from traffic.utils.lazy import lazy_import
+from traffic.utils.metrics import timed
 
+signal = lazy_import("scipy.signal")
+
+
+def _gradient(v: np.ndarray, t: np.ndarray | None) -> np.ndarray:
+    if len(v) < 2:
+        return np.zeros_like(v, dtype=np.float64)
+    return np.gradient(v) if t is None else np.gradient(v, t.astype(np.float64))
+
+
+@timed("trajectories.build")
 def build_trajectories(df: pd.DataFrame, fps: float, win: int = 9, poly: int = 2):
     rows = []
     grouped = df.sort_values("frame").groupby("track_id")
@@ -12,16 +24,89 @@ def build_trajectories(df: pd.DataFrame, fps: float, win: int = 9, poly: int = 2
         cx = g["cx"].to_numpy()
         cy = g["cy"].to_numpy()
         if len(cx) >= win:
-            sx = savgol_filter(cx, win, poly, mode="interp")
-            sy = savgol_filter(cy, win, poly, mode="interp")
+            sx = signal.savgol_filter(cx, win, poly, mode="interp")
+            sy = signal.savgol_filter(cy, win, poly, mode="interp")
         else:
             sx, sy = cx, cy
-        # convert from per-frame units to per-second units
-        vx = np.gradient(sx) * fps
-        vy = np.gradient(sy) * fps
-        ax = np.gradient(vx) * fps
-        ay = np.gradient(vy) * fps
-        rows.append(
-            dict(track_id=tid, frame=g["frame"].to_numpy(), x=sx, y=sy, vx=vx, vy=vy, ax=ax, ay=ay)
-        )
+        frame = g["frame"].to_numpy()
+        # differentiate against the source frame numbers, so strided or gappy tracks get the
+        # true spacing; then convert from per-frame units to per-second units
+        t = frame if len(frame) > 1 and (np.diff(frame) > 0).all() else None
+        vx = _gradient(sx, t) * fps
+        vy = _gradient(sy, t) * fps
+        ax = _gradient(vx, t) * fps
+        ay = _gradient(vy, t) * fps
+        rows.append(dict(track_id=tid, frame=frame, x=sx, y=sy, vx=vx, vy=vy, ax=ax, ay=ay))
     return rows
+
+
+def trajectories_to_frame(trajs: list[dict]) -> pd.DataFrame:
+    """Flatten :func:`build_trajectories` output into the long ``trajectories.parquet`` table."""
+    cols = ["frame", "x", "y", "vx", "vy", "ax", "ay"]
+    if not trajs:
+        return pd.DataFrame(columns=["track_id", *cols])
+    lengths = [len(t["frame"]) for t in trajs]
+    out = {"track_id": np.repeat([t["track_id"] for t in trajs], lengths)}
+    out["frame"] = np.concatenate([t["frame"] for t in trajs]).astype(np.int64)
+    for k in cols[1:]:
+        out[k] = np.concatenate([t[k] for t in trajs]).astype(np.float64)
+    return pd.DataFrame(out)
+
+
+def _fit_rows(win: int, poly: int) -> np.ndarray:
+    """(win, win): row k evaluates the window's least-squares polynomial at sample k."""
+    v = np.vander(np.arange(win, dtype=np.float64), poly + 1, increasing=True)
+    return v @ np.linalg.pinv(v)
+
+
+def _smoothed(col, starts, n, r, hat) -> np.ndarray:
+    """Row ``r`` of each prefix of ``col`` smoothed like ``savgol_filter(mode="interp")``."""
+    win = len(hat)
+    out = col[starts + r].astype(np.float64)  # shorter than the window: not smoothed
+    long = n >= win
+    w0 = np.clip(r - win // 2, 0, n - win)[long]
+    idx = (starts[long] + w0)[:, None] + np.arange(win)
+    out[long] = np.einsum("ij,ij->i", hat[r[long] - w0], col[idx])
+    return out
+
+
+def prefix_states(
+    raw: FlatTracks, lengths: np.ndarray, fps: float, win: int = 9, poly: int = 2
+) -> dict[str, np.ndarray]:
+    """What :func:`build_trajectories` yields for every track cut after ``lengths`` samples.
+
+    ``raw`` holds the detector's ``frame, cx, cy``. Returns per-track ``x_s, y_s, x_m, y_m,
+    x_e, y_e`` (first, middle and last prefix sample; see ``featurize_flat``) and ``vx_e,
+    vy_e, ax_e, ay_e``, computed from the prefix alone, so no sample after the cut leaks in
+    through the smoothing window or the central differences.
+    """
+    hat = _fit_rows(win, poly)
+    starts = raw.starts
+    n = np.clip(np.asarray(lengths, dtype=np.int64), 1, raw.lengths)
+    frame = raw["frame"].astype(np.float64)
+    # build_trajectories differentiates against frames only if they increase over the track
+    bad = np.cumsum(np.r_[False, np.diff(frame) <= 0])
+    by_frame = (n > 1) & (bad[starts + n - 1] == bad[starts])
+    e = n - 1
+    t = [np.where(by_frame, frame[starts + np.maximum(e - k, 0)], -k) for k in range(3)]
+    dt1, dt2 = t[0] - t[1], t[1] - t[2]  # spacing before the last and second-to-last rows
+    out = {}
+    for name, col in (("x", raw["cx"]), ("y", raw["cy"])):
+        out[f"{name}_s"] = _smoothed(col, starts, n, np.zeros_like(n), hat)
+        out[f"{name}_m"] = _smoothed(col, starts, n, n // 2, hat)
+        s = [_smoothed(col, starts, n, np.maximum(e - k, 0), hat) for k in range(3)]
+        out[f"{name}_e"] = s[0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            v_last = (s[0] - s[1]) / dt1  # np.gradient's one-sided edge
+            # its second-order interior formula one row earlier (one-sided if n == 2)
+            v_prev = np.where(
+                n > 2,
+                (-dt1 / (dt2 * (dt1 + dt2))) * s[2]
+                + ((dt1 - dt2) / (dt1 * dt2)) * s[1]
+                + (dt2 / (dt1 * (dt1 + dt2))) * s[0],
+                v_last,
+            )
+            acc = (v_last - v_prev) / dt1
+        out[f"v{name}_e"] = np.where(n > 1, v_last, 0.0) * fps
+        out[f"a{name}_e"] = np.where(n > 1, acc, 0.0) * fps * fps
+    return out
@@ -0,0 +1,71 @@
+"""Flat (CSR-style) view of a long trajectories table.
+
+All tracks are stored back to back, sorted by ``(track_id, frame)``; track ``i`` occupies
+rows ``offsets[i]:offsets[i + 1]`` of every column. Batched kernels (resampling, prefix
+features, simplification) operate on these arrays instead of a ``groupby`` loop.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class FlatTracks:
+    track_ids: np.ndarray
+    offsets: np.ndarray
+    columns: dict[str, np.ndarray]
+
+    def __len__(self) -> int:
+        return len(self.track_ids)
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.columns[col]
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @property
+    def owner(self) -> np.ndarray:
+        """Track index of every row."""
+        return np.repeat(np.arange(len(self.track_ids)), self.lengths)
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self.offsets[:-1]
+
+    def track(self, track_id) -> dict[str, np.ndarray]:
+        i = int(np.searchsorted(self.track_ids, track_id))
+        if i >= len(self.track_ids) or self.track_ids[i] != track_id:
+            raise KeyError(track_id)
+        sl = slice(self.offsets[i], self.offsets[i + 1])
+        return {k: v[sl] for k, v in self.columns.items()}
+
+
+def flatten_tracks(
+    trajs: pd.DataFrame,
+    columns: tuple[str, ...] = ("frame", "x", "y", "vx", "vy", "ax", "ay"),
+    dtype=None,
+) -> FlatTracks:
+    """Sort ``trajs`` by (track_id, frame) and expose it as :class:`FlatTracks`.
+
+    ``dtype`` optionally casts the non-frame columns (e.g. ``np.float32``).
+    """
+    cols = [c for c in columns if c in trajs.columns]
+    tid = trajs["track_id"].to_numpy()
+    frame = trajs["frame"].to_numpy()
+    order = np.lexsort((frame, tid))
+    tid = tid[order]
+    track_ids, first = np.unique(tid, return_index=True)
+    offsets = np.append(first, len(tid)).astype(np.int64)
+    out = {}
+    for c in cols:
+        v = trajs[c].to_numpy()[order]
+        if dtype is not None and c != "frame":
+            v = v.astype(dtype, copy=False)
+        out[c] = v
+    return FlatTracks(track_ids=track_ids, offsets=offsets, columns=out)
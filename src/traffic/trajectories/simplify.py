@@ -0,0 +1,171 @@
+"""Batched trajectory simplification with per-segment error bounds.
+
+Both kernels work on all tracks of a :class:`~traffic.trajectories.flat.FlatTracks` at once
+(no per-track loop) and return a :class:`Simplified` table whose ``max_err`` column bounds,
+for every output row, the distance between the original samples up to the next output row
+of the track and the simplified polyline.
+
+* :func:`douglas_peucker` keeps a subset of the original rows. All open intervals of all
+  tracks are split in the same pass, one recursion level per pass. With ``mode="sed"``
+  (synchronized Euclidean distance) a sample's error is its distance to the point of the
+  chord at the same frame, so linear interpolation in time reproduces every original
+  position within ``tol``; ``mode="perpendicular"`` only bounds the distance to the path.
+* :func:`resample` places points every ``step`` frames (``by="frame"``) or every ``step``
+  units of path length (``by="distance"``), interpolating all columns linearly; the error
+  of a sample is its distance to the resampled polyline at the same frame or path length.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from traffic.trajectories.flat import FlatTracks
+from traffic.utils.metrics import timed
+
+
+@dataclass
+class Simplified:
+    table: pd.DataFrame  # track_id, the kept/interpolated columns, max_err
+    n_in: int
+
+    @property
+    def ratio(self) -> float:
+        return len(self.table) / max(self.n_in, 1)
+
+    def track_errors(self) -> pd.Series:
+        """Largest error bound per track."""
+        return self.table.groupby("track_id")["max_err"].max()
+
+
+def _ranges(lo: np.ndarray, n: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Concatenated ``lo[i] + arange(n[i])`` and the index ``i`` of every element."""
+    owner = np.repeat(np.arange(len(lo)), n)
+    return lo[owner] + np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n), owner
+
+
+def _point_errors(x, y, t, rows, a, b, mode: str) -> np.ndarray:
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    if mode == "sed":
+        dt = t[b] - t[a]
+        u = np.divide(t[rows] - t[a], dt, out=np.zeros(len(rows)), where=dt > 0)
+    elif mode == "perpendicular":
+        L2 = dx * dx + dy * dy
+        proj = (x[rows] - x[a]) * dx + (y[rows] - y[a]) * dy
+        u = np.clip(np.divide(proj, L2, out=np.zeros(len(rows)), where=L2 > 0), 0.0, 1.0)
+    else:
+        raise ValueError(f"mode must be 'sed' or 'perpendicular', got {mode!r}")
+    return np.hypot(x[rows] - (x[a] + u * dx), y[rows] - (y[a] + u * dy))
+
+
+@timed("simplify.douglas_peucker")
+def douglas_peucker(flat: FlatTracks, tol: float, mode: str = "sed") -> Simplified:
+    """Rows kept by Douglas-Peucker at tolerance ``tol`` (see module docstring)."""
+    x = np.asarray(flat["x"], dtype=np.float64)
+    y = np.asarray(flat["y"], dtype=np.float64)
+    t = np.asarray(flat["frame"], dtype=np.float64)
+    starts, ends = flat.offsets[:-1], flat.offsets[1:] - 1
+    keep = np.zeros(len(x), dtype=bool)
+    keep[starts] = keep[ends] = True
+    err = np.zeros(len(x))
+    long = ends - starts >= 2
+    a, b = starts[long], ends[long]
+    while len(a):
+        inner = b - a - 1
+        rows, seg = _ranges(a + 1, inner)
+        d = _point_errors(x, y, t, rows, a[seg], b[seg], mode)
+        dmax = np.maximum.reduceat(d, np.cumsum(inner) - inner)
+        split = dmax > tol
+        err[a[~split]] = dmax[~split]
+        # split each interval at its first farthest point
+        far = np.flatnonzero((d == dmax[seg]) & split[seg])
+        _, first = np.unique(seg[far], return_index=True)
+        m = rows[far[first]]
+        keep[m] = True
+        na, nb = np.r_[a[split], m], np.r_[m, b[split]]
+        long = nb - na >= 2
+        a, b = na[long], nb[long]
+    table = pd.DataFrame({"track_id": np.repeat(flat.track_ids, flat.lengths)[keep]})
+    for c, v in flat.columns.items():
+        table[c] = v[keep]
+    table["max_err"] = err[keep]
+    return Simplified(table, len(x))
+
+
+def _path_length(flat: FlatTracks) -> np.ndarray:
+    x = np.asarray(flat["x"], dtype=np.float64)
+    y = np.asarray(flat["y"], dtype=np.float64)
+    seg = np.zeros(len(x))
+    seg[1:] = np.hypot(np.diff(x), np.diff(y))
+    seg[flat.offsets[:-1]] = 0.0
+    cum = np.cumsum(seg)
+    return cum - np.repeat(cum[flat.offsets[:-1]], flat.lengths)
+
+
+def _locate(key, offsets, owner, target):
+    """Sample at or before each ``target`` key within track ``owner``, the next sample and
+    the interpolation fraction.
+
+    ``key`` is non-decreasing within every track; tracks are shifted onto disjoint ranges so
+    one ``searchsorted`` serves all of them.
+    """
+    starts, ends = offsets[:-1], offsets[1:] - 1
+    k0 = key[starts]
+    shift = k0 - np.r_[0.0, np.cumsum(key[ends] - k0 + 1.0)[:-1]]
+    g = key - np.repeat(shift, np.diff(offsets))
+    gt = target - shift[owner]
+    idx = np.searchsorted(g, gt, side="right") - 1
+    idx = np.clip(idx, starts[owner], np.maximum(ends - 1, starts)[owner])
+    nxt = np.minimum(idx + 1, ends[owner])
+    dk = g[nxt] - g[idx]
+    u = np.clip(np.divide(gt - g[idx], dk, out=np.zeros(len(gt)), where=dk > 0), 0.0, 1.0)
+    return idx, nxt, u
+
+
+def _interp(key, offsets, owner, target, values: dict[str, np.ndarray]) -> dict:
+    idx, nxt, u = _locate(key, offsets, owner, target)
+    return {c: v[idx] + u * (v[nxt] - v[idx]) for c, v in values.items()}
+
+
+@timed("simplify.resample")
+def resample(flat: FlatTracks, step: float, by: str = "frame") -> Simplified:
+    """Points every ``step`` frames or path-length units, plus each track's last sample."""
+    if step <= 0:
+        raise ValueError(f"step must be positive, got {step}")
+    if by == "frame" and step != int(step):
+        raise ValueError(f"frame steps must be whole frames, got {step}")
+    if by == "frame":
+        key = np.asarray(flat["frame"], dtype=np.float64)
+    elif by == "distance":
+        key = _path_length(flat)
+    else:
+        raise ValueError(f"by must be 'frame' or 'distance', got {by!r}")
+    starts, ends = flat.offsets[:-1], flat.offsets[1:] - 1
+    k0, k1 = key[starts], key[ends]
+    n = np.floor((k1 - k0) / step).astype(np.int64) + 1
+    n += k0 + (n - 1) * step < k1  # close on the last sample
+    _, owner = _ranges(np.zeros(len(n), dtype=np.int64), n)
+    j = np.arange(int(n.sum())) - np.repeat(np.cumsum(n) - n, n)
+    target = np.minimum(k0[owner] + j * step, k1[owner])
+    values = {c: np.asarray(v, dtype=np.float64) for c, v in flat.columns.items()}
+    out = _interp(key, flat.offsets, owner, target, values)
+
+    # error of every original sample against the resampled polyline at the same key,
+    # charged to the output segment that covers it
+    out_offsets = np.r_[0, np.cumsum(n)]
+    seg, nxt, u = _locate(target, out_offsets, flat.owner, key)
+    px = out["x"][seg] + u * (out["x"][nxt] - out["x"][seg])
+    py = out["y"][seg] + u * (out["y"][nxt] - out["y"][seg])
+    err = np.zeros(len(target))
+    np.maximum.at(err, seg, np.hypot(values["x"] - px, values["y"] - py))
+
+    table = pd.DataFrame({"track_id": flat.track_ids[owner]})
+    for c in flat.columns:
+        v = out[c]
+        if c == "frame" and by == "frame":
+            v = np.round(v).astype(np.asarray(flat["frame"]).dtype)
+        table[c] = v
+    table["max_err"] = err
+    return Simplified(table, len(key))
@@ -0,0 +1,328 @@
+"""Persisted spatio-temporal grid index over trajectory segments.
+
+Answers "which tracks passed through this polygon between frames a and b" without loading
+the trajectory tables. Every trajectory source (``trajectories.parquet`` and the partitions
+under ``trajectories/``) gets its own shard under ``<processed>/stindex/``:
+
+* ``<shard>.npy``: one record per (segment, grid cell) -- ``track_id``, file ``row`` of the
+  segment's first point, its frames ``f0``/``f1`` and endpoints ``x0, y0, x1, y1`` --
+  sorted by cell. A segment joins consecutive points of a track and is listed under every
+  cell its bounding box touches. The file is memory-mapped, so a query only pages in the
+  cells it reads. Coordinates are stored as float32 (36 bytes per record).
+* ``<shard>.cells.npz``: per-cell record offsets and ``[tmin, tmax]`` frame ranges.
+
+``index.json`` lists the shards with the source fingerprint, spatial bounds and frame
+range. A query skips shards whose bounds or frames miss the window, reads the cells under
+the polygon's bounding box whose time range overlaps it, and tests the candidate segments
+exactly (endpoint inside, or crossing a polygon edge). Matches come back as slices: runs of
+consecutive rows of one track in one source file, which :meth:`SegmentIndex.read_slices`
+loads without reading the rest of the file.
+
+Sources must hold whole tracks sorted by ``(track_id, frame)``, as ``build_trajectories``
+writes them. :func:`update_segment_index` indexes sources it has not seen, re-indexes
+rewritten ones and drops shards of deleted ones; the other shards are left untouched.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from traffic.detect.roi import points_in_polygon
+from traffic.io.serialization import read_parquet
+from traffic.io.sources import fingerprint, trajectory_sources
+from traffic.utils.metrics import timed
+
+STINDEX_VERSION = 1
+
+SEGMENT_DTYPE = np.dtype(
+    [
+        ("track_id", "<i8"),
+        ("row", "<i4"),
+        ("f0", "<i4"),
+        ("f1", "<i4"),
+        ("x0", "<f4"),
+        ("y0", "<f4"),
+        ("x1", "<f4"),
+        ("y1", "<f4"),
+    ]
+)
+
+
+def track_segments(df: pd.DataFrame) -> np.ndarray:
+    """Segments (``SEGMENT_DTYPE``, without cells) of a table sorted by (track_id, frame).
+
+    Single-point tracks give one degenerate segment so they can still be found.
+    """
+    if len(df) >= 2**31:
+        raise ValueError(f"{len(df)} rows: split the trajectories into smaller partitions")
+    tid = df["track_id"].to_numpy().astype(np.int64)
+    frame = df["frame"].to_numpy().astype(np.int64)
+    x = df["x"].to_numpy().astype(np.float64)
+    y = df["y"].to_numpy().astype(np.float64)
+    if len(tid) > 1:
+        dt, df_ = np.diff(tid), np.diff(frame)
+        if (dt < 0).any() or ((dt == 0) & (df_ <= 0)).any():
+            raise ValueError("trajectories must be sorted by (track_id, frame)")
+    brk = np.r_[tid[1:] != tid[:-1], True] if len(tid) else np.zeros(0, bool)
+    first = np.r_[True, brk[:-1]] if len(tid) else brk
+    start = np.flatnonzero(~brk | first)
+    end = np.where(brk[start], start, start + 1)
+    seg = np.empty(len(start), dtype=SEGMENT_DTYPE)
+    seg["track_id"], seg["row"] = tid[start], start
+    seg["f0"], seg["f1"] = frame[start], frame[end]
+    seg["x0"], seg["y0"], seg["x1"], seg["y1"] = x[start], y[start], x[end], y[end]
+    return seg
+
+
+def segments_in_polygon(seg: np.ndarray, polygon: np.ndarray) -> np.ndarray:
+    """Mask of segments with an endpoint inside ``polygon`` or crossing one of its edges."""
+    x0, y0, x1, y1 = seg["x0"], seg["y0"], seg["x1"], seg["y1"]
+    hit = points_in_polygon(x0, y0, polygon) | points_in_polygon(x1, y1, polygon)
+
+    def orient(ax, ay, bx, by, px, py):
+        return np.sign((bx - ax) * (py - ay) - (by - ay) * (px - ax))
+
+    px, py = polygon[:, 0], polygon[:, 1]
+    qx, qy = np.roll(px, 1), np.roll(py, 1)
+    for ax, ay, bx, by in zip(px, py, qx, qy):
+        o1, o2 = orient(ax, ay, bx, by, x0, y0), orient(ax, ay, bx, by, x1, y1)
+        o3, o4 = orient(x0, y0, x1, y1, ax, ay), orient(x0, y0, x1, y1, bx, by)
+        boxes = (
+            (np.minimum(x0, x1) <= max(ax, bx))
+            & (np.maximum(x0, x1) >= min(ax, bx))
+            & (np.minimum(y0, y1) <= max(ay, by))
+            & (np.maximum(y0, y1) >= min(ay, by))
+        )
+        hit |= (o1 * o2 <= 0) & (o3 * o4 <= 0) & boxes
+    return hit
+
+
+class _Grid:
+    def __init__(self, bounds, shape):
+        self.bounds = tuple(map(float, bounds))
+        self.shape = (int(shape[0]), int(shape[1]))  # (ny, nx)
+
+    @classmethod
+    def for_segments(cls, seg: np.ndarray, shape) -> "_Grid":
+        x0 = float(min(seg["x0"].min(), seg["x1"].min()))
+        x1 = float(max(seg["x0"].max(), seg["x1"].max()))
+        y0 = float(min(seg["y0"].min(), seg["y1"].min()))
+        y1 = float(max(seg["y0"].max(), seg["y1"].max()))
+        # pad so the maximum falls inside the last cell
+        px, py = max(x1 - x0, 1e-9) * 1e-6, max(y1 - y0, 1e-9) * 1e-6
+        return cls((x0, y0, x1 + px, y1 + py), shape)
+
+    def col_row(self, x, y) -> tuple[np.ndarray, np.ndarray]:
+        """Clipped cell column and row of points."""
+        x0, y0, x1, y1 = self.bounds
+        ny, nx = self.shape
+        cx = np.floor((np.asarray(x, dtype=np.float64) - x0) * (nx / (x1 - x0)))
+        cy = np.floor((np.asarray(y, dtype=np.float64) - y0) * (ny / (y1 - y0)))
+        return (
+            np.clip(cx, 0, nx - 1).astype(np.int64),
+            np.clip(cy, 0, ny - 1).astype(np.int64),
+        )
+
+
+def build_shard(seg: np.ndarray, shape) -> tuple[dict, np.ndarray, dict[str, np.ndarray]]:
+    """Grid header, cell-sorted records and per-cell arrays for one source's segments."""
+    grid = _Grid.for_segments(seg, shape)
+    ny, nx = grid.shape
+    cx0, cy0 = grid.col_row(np.minimum(seg["x0"], seg["x1"]), np.minimum(seg["y0"], seg["y1"]))
+    cx1, cy1 = grid.col_row(np.maximum(seg["x0"], seg["x1"]), np.maximum(seg["y0"], seg["y1"]))
+    w, h = cx1 - cx0 + 1, cy1 - cy0 + 1
+    k = w * h
+    src = np.repeat(np.arange(len(seg)), k)
+    j = np.arange(int(k.sum())) - np.repeat(np.cumsum(k) - k, k)
+    cell = (cy0[src] + j // w[src]) * nx + cx0[src] + j % w[src]
+    order = np.argsort(cell, kind="stable")
+    cell, records = cell[order], seg[src[order]]
+    ncell = ny * nx
+    offsets = np.zeros(ncell + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(cell, minlength=ncell))
+    tmin = np.full(ncell, np.iinfo(np.int64).max)
+    tmax = np.full(ncell, np.iinfo(np.int64).min)
+    np.minimum.at(tmin, cell, records["f0"])
+    np.maximum.at(tmax, cell, records["f1"])
+    header = dict(
+        bounds=list(grid.bounds),
+        shape=list(grid.shape),
+        frames=[int(seg["f0"].min()), int(seg["f1"].max())],
+        segments=int(len(seg)),
+        records=int(len(records)),
+    )
+    return header, records, dict(offsets=offsets, tmin=tmin, tmax=tmax)
+
+
+class SegmentIndex:
+    """Read side of a scene's segment index (see module docstring)."""
+
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        manifest = json.loads((self.root / "index.json").read_text())
+        if manifest.get("version") != STINDEX_VERSION:
+            raise ValueError(
+                f"{self.root} has index version {manifest.get('version')}, "
+                f"expected {STINDEX_VERSION}; rebuild it"
+            )
+        self.processed = self.root.parent
+        self.shape = tuple(manifest["shape"])
+        self.shards: dict[str, dict] = manifest["shards"]
+        self.last_scan: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return sum(s["segments"] for s in self.shards.values())
+
+    @timed("stindex.query")
+    def query(self, polygon, frames: tuple[int, int] | None = None) -> pd.DataFrame:
+        """Slices of tracks inside ``polygon`` during ``frames`` (inclusive; None = all).
+
+        One row per run of consecutive matching segments: ``track_id``, ``source`` (file),
+        ``row_start``/``row_end`` (file rows, end exclusive, covering both endpoints of the
+        run's segments) and ``frame_start``/``frame_end``.
+        """
+        polygon = np.asarray(polygon, dtype=np.float64).reshape(-1, 2)
+        lo, hi = frames if frames is not None else (np.iinfo(np.int64).min, np.iinfo(np.int64).max)
+        pmin, pmax = polygon.min(axis=0), polygon.max(axis=0)
+        scan = dict(shards=0, cells=0, records=0)
+        out = []
+        for rel, info in self.shards.items():
+            bx0, by0, bx1, by1 = info["bounds"]
+            f0, f1 = info["frames"]
+            if (
+                f1 < lo
+                or f0 > hi
+                or pmax[0] < bx0
+                or pmin[0] > bx1
+                or pmax[1] < by0
+                or pmin[1] > by1
+            ):
+                continue
+            scan["shards"] += 1
+            seg = self._candidates(info, pmin, pmax, lo, hi, scan)
+            seg = seg[(seg["f1"] >= lo) & (seg["f0"] <= hi)]
+            seg = seg[segments_in_polygon(seg, polygon)] if len(seg) else seg
+            if len(seg):
+                out.append(_runs(np.unique(seg), str(self.processed / rel)))
+        self.last_scan = scan
+        if not out:
+            out.append(_runs(np.zeros(0, dtype=SEGMENT_DTYPE), ""))
+        return pd.concat(out, ignore_index=True).sort_values(
+            ["track_id", "frame_start"], ignore_index=True
+        )
+
+    def _candidates(self, info, pmin, pmax, lo, hi, scan) -> np.ndarray:
+        grid = _Grid(info["bounds"], info["shape"])
+        nx = grid.shape[1]
+        (cx0, cx1), (cy0, cy1) = grid.col_row([pmin[0], pmax[0]], [pmin[1], pmax[1]])
+        with np.load(self.root / f"{info['name']}.cells.npz") as cells:
+            offsets, tmin, tmax = cells["offsets"], cells["tmin"], cells["tmax"]
+        records = np.load(self.root / f"{info['name']}.npy", mmap_mode="r")
+        parts = []
+        for row in range(cy0, cy1 + 1):
+            ids = np.arange(row * nx + cx0, row * nx + cx1 + 1)
+            live = ids[(tmin[ids] <= hi) & (tmax[ids] >= lo) & (offsets[ids + 1] > offsets[ids])]
+            scan["cells"] += len(live)
+            for c in live:
+                parts.append(np.asarray(records[offsets[c] : offsets[c + 1]]))
+        seg = np.concatenate(parts) if parts else np.zeros(0, dtype=SEGMENT_DTYPE)
+        scan["records"] += len(seg)
+        return seg
+
+    def read_slices(self, hits: pd.DataFrame, columns: list[str] | None = None) -> pd.DataFrame:
+        """Rows of ``query`` hits, reading only the parquet row groups that hold them."""
+        frames = []
+        for source, grp in hits.groupby("source", sort=False):
+            f = pq.ParquetFile(source)
+            sizes = [f.metadata.row_group(i).num_rows for i in range(f.num_row_groups)]
+            starts = np.r_[0, np.cumsum(sizes)]
+            rows = np.unique(
+                np.concatenate([np.arange(a, b) for a, b in zip(grp["row_start"], grp["row_end"])])
+            )
+            g = np.searchsorted(starts, rows, side="right") - 1
+            groups = np.unique(g)
+            table = f.read_row_groups(groups.tolist(), columns=columns).to_pandas()
+            # where each selected row group starts inside ``table``
+            base = np.r_[0, np.cumsum(np.asarray(sizes)[groups])][:-1]
+            local = rows - starts[g] + base[np.searchsorted(groups, g)]
+            frames.append(table.iloc[local])
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+
+def _runs(seg: np.ndarray, source: str) -> pd.DataFrame:
+    """Merge a track's consecutive matching segments (``seg`` sorted by track, row)."""
+    tid, row = seg["track_id"], seg["row"]
+    new = np.ones(len(seg), dtype=bool)
+    new[1:] = (tid[1:] != tid[:-1]) | (row[1:] != row[:-1] + 1)
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(seg))[: len(first)] - 1
+    # the run's last segment ends on the next row (degenerate segments end on their own)
+    end_row = row[last] + 1 + (seg["f1"][last] != seg["f0"][last])
+    return pd.DataFrame(
+        dict(
+            track_id=tid[first],
+            source=source,
+            row_start=row[first],
+            row_end=end_row,
+            frame_start=seg["f0"][first],
+            frame_end=seg["f1"][last],
+        )
+    )
+
+
+def _shard_name(rel: str) -> str:
+    return hashlib.sha1(rel.encode()).hexdigest()[:16]
+
+
+@timed("stindex.update")
+def update_segment_index(
+    processed: str | Path, shape: tuple[int, int] = (64, 64), index_dir: str = "stindex"
+) -> SegmentIndex:
+    """Bring ``<processed>/<index_dir>`` up to date with the scene's trajectory sources.
+
+    Only new or rewritten sources are read; a different grid ``shape`` rebuilds every shard.
+    """
+    processed = Path(processed)
+    root = processed / index_dir
+    root.mkdir(parents=True, exist_ok=True)
+    manifest_path = root / "index.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    if manifest.get("version") != STINDEX_VERSION or manifest.get("shape") != list(shape):
+        manifest = dict(version=STINDEX_VERSION, shape=list(shape), shards={})
+    shards: dict[str, dict] = manifest["shards"]
+    sources = {p.relative_to(processed).as_posix(): p for p in trajectory_sources(processed)}
+
+    for rel in [r for r in shards if r not in sources]:
+        _remove_shard(root, shards.pop(rel)["name"])
+    for rel, path in sources.items():
+        fp = fingerprint(path)
+        if rel in shards and shards[rel]["fingerprint"] == fp:
+            continue
+        name = _shard_name(rel)
+        seg = track_segments(read_parquet(path, columns=["track_id", "frame", "x", "y"]))
+        if not len(seg):
+            shards.pop(rel, None)
+            _remove_shard(root, name)
+            continue
+        header, records, cells = build_shard(seg, shape)
+        np.save(root / f"{name}.npy", records)
+        np.savez(root / f"{name}.cells.npz", **cells)
+        shards[rel] = dict(name=name, fingerprint=fp, **header)
+
+    tmp = manifest_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1))
+    tmp.replace(manifest_path)
+    return SegmentIndex(root)
+
+
+def _remove_shard(root: Path, name: str) -> None:
+    for suffix in (".npy", ".cells.npz"):
+        (root / f"{name}{suffix}").unlink(missing_ok=True)
@@ -0,0 +1,50 @@
+"""Deferred imports for heavy optional dependencies.
+
+``cv2`` / ``ultralytics`` (which pulls in torch) / ``matplotlib`` / ``sklearn`` / ``scipy``
+dominate start-up of short runs, so modules bind them with :func:`lazy_import` and pay
+the import cost on first attribute access instead of at import time::
+
+    signal = lazy_import("scipy.signal")
+    ...
+    signal.savgol_filter(x, 9, 2)
+"""
+
+from __future__ import annotations
+
+import importlib
+import sys
+import types
+from typing import Any
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> types.ModuleType:
+        mod = self.__dict__["_lazy_module"]
+        if mod is None:
+            mod = importlib.import_module(self.__name__)
+            self.__dict__["_lazy_module"] = mod
+        return mod
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self) -> list[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """Return ``name`` if already imported, else a proxy that imports it on first use."""
+    mod = sys.modules.get(name)
+    if mod is not None:
+        return mod
+    return LazyModule(name)
@@ -0,0 +1,363 @@
+"""Lightweight per-stage instrumentation.
+
+A single process-wide :data:`metrics` recorder collects stage timings (wall and CPU),
+counters, gauges and value distributions. Library code wraps its hot sections in
+``with stage("name"):`` and scripts call :meth:`Metrics.reset` at start-up and
+:meth:`Metrics.write` at the end, which appends a JSON-lines run record and writes a
+Prometheus text file (textfile-collector format) next to the stage outputs.
+
+Memory: peak RSS is sampled at every stage exit; Python heap peaks are recorded per
+stage (an outer stage's peak covers its nested stages) when ``trace_memory`` is enabled
+(``tracemalloc`` roughly doubles allocation cost, so it is opt-in). A sampling profiler
+can be attached to selected stages with ``profile=True`` / ``profile=["stage", ...]`` or
+the ``TRAFFIC_PROFILE`` environment variable; it writes collapsed stacks usable by
+``flamegraph.pl`` / speedscope.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+try:  # POSIX only
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None  # type: ignore[assignment]
+
+
+def peak_rss_mb() -> float | None:
+    """Peak resident set size of this process in MiB (None if unavailable)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS reports bytes
+        return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0)
+
+
+@dataclass
+class StageRecord:
+    name: str
+    calls: int = 0
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    items: int = 0
+    peak_rss_mb: float | None = None
+    py_peak_mb: float | None = None
+
+    @property
+    def items_per_s(self) -> float | None:
+        return self.items / self.wall_s if self.items and self.wall_s > 0 else None
+
+
+@dataclass
+class Distribution:
+    count: int = 0
+    total: float = 0.0
+    min: float = float("inf")
+    max: float = float("-inf")
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+
+class SamplingProfiler:
+    """Periodically sample the stack of one thread and aggregate collapsed stacks."""
+
+    def __init__(self, thread_id: int | None = None, interval: float = 0.005):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.stacks: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if parts:
+                self.stacks[";".join(reversed(parts))] += 1
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="traffic-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [f"{stack} {n}" for stack, n in self.stacks.most_common()]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+class Metrics:
+    """Process-wide metrics recorder (see module docstring)."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(
+        self,
+        run: str = "default",
+        *,
+        labels: dict[str, Any] | None = None,
+        trace_memory: bool = False,
+        profile: bool | Iterable[str] = False,
+    ) -> None:
+        """Start a new run record, discarding everything collected so far."""
+        self.run = run
+        self.labels = {k: str(v) for k, v in (labels or {}).items()}
+        self.stages: dict[str, StageRecord] = {}
+        self.counters: Counter[str] = Counter()
+        self.gauges: dict[str, float] = {}
+        self.dists: dict[str, Distribution] = {}
+        self.trace_memory = trace_memory
+        env = os.environ.get("TRAFFIC_PROFILE", "")
+        if profile is True or env in ("1", "all", "*"):
+            self._profile: bool | set[str] = True
+        else:
+            names = set() if profile is False else set(profile)
+            names |= {s for s in env.split(",") if s}
+            self._profile = names
+        self.profiles: dict[str, SamplingProfiler] = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._profiling = False
+        # traced-heap peaks of the open stages, innermost last
+        self._py_peaks: list[int] = []
+
+    def _wants_profile(self, name: str) -> bool:
+        if self._profiling:  # nested stages are covered by the outer sampler
+            return False
+        return self._profile is True or name in self._profile  # type: ignore[operator]
+
+    @contextmanager
+    def stage(self, name: str, items: int | None = None) -> Iterator[StageRecord]:
+        """Time a block; set ``rec.items`` inside the block to report throughput.
+
+        Timings accumulate when the same stage is entered repeatedly.
+        """
+        with self._lock:
+            rec = self.stages.setdefault(name, StageRecord(name))
+        items_before = rec.items
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if self.trace_memory:
+            with self._lock:
+                if tracing:
+                    tracemalloc.start()
+                else:
+                    # the enclosing stage keeps the peak it reached before this reset
+                    if self._py_peaks:
+                        _, peak = tracemalloc.get_traced_memory()
+                        self._py_peaks[-1] = max(self._py_peaks[-1], peak)
+                    tracemalloc.reset_peak()
+                self._py_peaks.append(0)
+        sampler = None
+        if self._wants_profile(name):
+            sampler = self.profiles.get(name) or SamplingProfiler()
+            self.profiles[name] = sampler.start()
+            self._profiling = True
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield rec
+        finally:
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            if sampler is not None:
+                sampler.stop()
+                # allow the stage to be profiled again if re-entered
+                sampler._stop.clear()
+                self._profiling = False
+            with self._lock:
+                rec.calls += 1
+                rec.wall_s += wall
+                rec.cpu_s += cpu
+                if items is not None and rec.items == items_before:
+                    rec.items += items
+                rec.peak_rss_mb = peak_rss_mb()
+                if self.trace_memory:
+                    _, py_peak = tracemalloc.get_traced_memory()
+                    py_peak = max(py_peak, self._py_peaks.pop() if self._py_peaks else 0)
+                    if self._py_peaks:
+                        self._py_peaks[-1] = max(self._py_peaks[-1], py_peak)
+                    rec.py_peak_mb = max(rec.py_peak_mb or 0.0, py_peak / (1024.0 * 1024.0))
+            if tracing:
+                tracemalloc.stop()
+
+    def timed(self, name: str | None = None) -> Callable:
+        """Decorator form of :meth:`stage`; defaults to the function's qualified name."""
+
+        def deco(fn: Callable) -> Callable:
+            stage_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage_name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return deco
+
+    def count(self, name: str, n: int | float = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self.gauges[name] = float(value)
+
+    def observe(self, name: str, value: float) -> None:
+        """Add one sample to a distribution (e.g. per-frame latency in ms)."""
+        with self._lock:
+            self.dists.setdefault(name, Distribution()).add(float(value))
+
+    def snapshot(self) -> dict[str, Any]:
+        stages = {}
+        for name, rec in self.stages.items():
+            d = asdict(rec)
+            d.pop("name")
+            d["items_per_s"] = rec.items_per_s
+            stages[name] = d
+        dists = {
+            name: dict(count=d.count, mean=d.mean, min=d.min, max=d.max)
+            for name, d in self.dists.items()
+        }
+        return dict(
+            run=self.run,
+            labels=self.labels,
+            started=self.started,
+            elapsed_s=time.time() - self.started,
+            peak_rss_mb=peak_rss_mb(),
+            stages=stages,
+            counters=dict(self.counters),
+            gauges=self.gauges,
+            distributions=dists,
+        )
+
+    def to_prometheus(self, snap: dict[str, Any] | None = None) -> str:
+        snap = snap or self.snapshot()
+
+        def fmt(extra: dict[str, str] | None = None) -> str:
+            lab = {"run": snap["run"], **snap["labels"], **(extra or {})}
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in lab.items()) + "}"
+
+        out: list[str] = []
+
+        def emit(metric: str, kind: str, values: list[tuple[dict[str, str] | None, Any]]):
+            values = [(lab, v) for lab, v in values if v is not None]
+            if not values:
+                return
+            out.append(f"# TYPE {metric} {kind}")
+            out.extend(f"{metric}{fmt(lab)} {float(v):.6g}" for lab, v in values)
+
+        st = snap["stages"]
+        for key, metric, kind in [
+            ("wall_s", "traffic_stage_wall_seconds", "counter"),
+            ("cpu_s", "traffic_stage_cpu_seconds", "counter"),
+            ("calls", "traffic_stage_calls_total", "counter"),
+            ("items", "traffic_stage_items_total", "counter"),
+            ("items_per_s", "traffic_stage_items_per_second", "gauge"),
+            ("peak_rss_mb", "traffic_stage_peak_rss_mebibytes", "gauge"),
+            ("py_peak_mb", "traffic_stage_python_peak_mebibytes", "gauge"),
+        ]:
+            emit(metric, kind, [({"stage": n}, s[key]) for n, s in st.items()])
+        emit("traffic_peak_rss_mebibytes", "gauge", [(None, snap["peak_rss_mb"])])
+        for name, v in snap["counters"].items():
+            emit(f"traffic_{_metric_name(name)}_total", "counter", [(None, v)])
+        for name, v in snap["gauges"].items():
+            emit(f"traffic_{_metric_name(name)}", "gauge", [(None, v)])
+        for name, d in snap["distributions"].items():
+            metric = f"traffic_{_metric_name(name)}"
+            emit(f"{metric}_count", "counter", [(None, d["count"])])
+            emit(f"{metric}_mean", "gauge", [(None, d["mean"])])
+            emit(f"{metric}_max", "gauge", [(None, d["max"])])
+        return "\n".join(out) + "\n"
+
+    def write(self, out_dir: str | Path) -> dict[str, Any]:
+        """Append the run record to ``metrics.jsonl`` and write ``metrics_<run>.prom``."""
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        snap = self.snapshot()
+        with open(out_dir / "metrics.jsonl", "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(snap, default=_json_default) + "\n")
+        # write-then-rename so a node_exporter scrape never sees a partial file
+        prom = out_dir / f"metrics_{_metric_name(self.run)}.prom"
+        tmp = prom.with_suffix(".prom.tmp")
+        tmp.write_text(self.to_prometheus(snap), encoding="utf-8")
+        os.replace(tmp, prom)
+        for name, sampler in self.profiles.items():
+            sampler.write(out_dir / f"profile_{_metric_name(self.run)}_{_metric_name(name)}.folded")
+        return snap
+
+    def summary(self) -> str:
+        lines = [f"[{self.run}] stage timings:"]
+        for name, rec in self.stages.items():
+            rate = f", {rec.items_per_s:,.1f} items/s" if rec.items_per_s else ""
+            rss = f", peak RSS {rec.peak_rss_mb:,.0f} MiB" if rec.peak_rss_mb else ""
+            lines.append(f"  {name}: {rec.wall_s:.3f}s wall, {rec.cpu_s:.3f}s cpu{rate}{rss}")
+        return "\n".join(lines)
+
+
+def _metric_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name).strip("_").lower()
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _json_default(o: Any):
+    if hasattr(o, "item"):  # numpy scalars
+        return o.item()
+    return str(o)
+
+
+metrics = Metrics()
+stage = metrics.stage
+timed = metrics.timed
+
+
+def start_run(run: str, cfg: Any = None) -> Metrics:
+    """Reset :data:`metrics` for a script run using the ``metrics`` config group."""
+    opts = (cfg.get("metrics") if cfg is not None else None) or {}
+    labels = {}
+    if cfg is not None and cfg.get("dataset") is not None:
+        labels["scene"] = cfg.dataset.get("scene", "")
+    profile = opts.get("profile", False)
+    metrics.reset(
+        run,
+        labels=labels,
+        trace_memory=bool(opts.get("trace_memory", False)),
+        profile=profile if isinstance(profile, bool) else list(profile),
+    )
+    return metrics
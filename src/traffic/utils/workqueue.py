@@ -0,0 +1,308 @@
+"""File-system work queue for batch jobs shared by several workers or nodes.
+
+Everything lives in one directory (a shared mount for several nodes, any local directory
+for one machine):
+
+* ``items/<id>.json``: the work item (payload written by :meth:`WorkQueue.enqueue`);
+* ``leases/<id>.json``: who is working on it and until when. Created with ``O_EXCL`` so
+  exactly one worker wins; the holder renews it every ``ttl / 3`` seconds. A lease past
+  its expiry belongs to a crashed or hung worker: the next worker renames it away (the
+  rename is atomic, so only one worker can take it over) and claims the item itself;
+* ``work/<id>.<token>/``: a claim's scratch output directory;
+* ``out/<id>/``: the published outputs. On success the scratch directory is renamed into
+  place only if no other claim got there first, so every item has exactly one output even
+  when a worker that lost its lease still finishes;
+* ``done/<id>.json``: completion record (worker, start, end), created with ``O_EXCL``;
+* ``failed/<id>.json``: failed attempts; an item is retried until ``max_attempts``.
+
+Processing is at-least-once (a worker that lost its lease may still be running when another
+takes the item over); published outputs and the done record are exactly-once.
+
+Expiry compares wall-clock times written by different hosts, so ``ttl`` must be large
+compared with their clock skew.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+DIRS = ("items", "leases", "work", "out", "done", "failed")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def item_id(key: str) -> str:
+    """Readable, collision-safe id for an item key (e.g. a video path)."""
+    stem = re.sub(r"[^A-Za-z0-9_.-]+", "_", Path(key).stem)[:40] or "item"
+    return f"{stem}-{hashlib.sha1(key.encode()).hexdigest()[:8]}"
+
+
+def _read_json(path: Path) -> dict | None:
+    try:
+        return json.loads(path.read_text())
+    except (FileNotFoundError, json.JSONDecodeError):
+        # gone, or caught between create and write
+        return None
+
+
+def _write_json(path: Path, data: dict) -> None:
+    tmp = path.with_name(f".{path.name}.{uuid.uuid4().hex}")
+    tmp.write_text(json.dumps(data))
+    tmp.replace(path)
+
+
+def _create_json(path: Path, data: dict) -> bool:
+    """Write ``path`` only if it does not exist yet (atomic on local and NFSv3+ mounts)."""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f)
+    return True
+
+
+@dataclass
+class Lease:
+    item: str
+    worker: str
+    token: str
+    started: float
+    expires: float
+    payload: dict = field(default_factory=dict)
+    scratch: Path | None = None
+
+
+class WorkQueue:
+    def __init__(self, root: str | Path, ttl: float = 600.0, max_attempts: int = 3):
+        self.root = Path(root)
+        self.ttl = float(ttl)
+        self.max_attempts = int(max_attempts)
+        for d in DIRS:
+            (self.root / d).mkdir(parents=True, exist_ok=True)
+
+    def _path(self, kind: str, item: str, suffix: str = ".json") -> Path:
+        return self.root / kind / f"{item}{suffix}"
+
+    def enqueue(self, key: str, payload: dict) -> str:
+        """Add an item (no-op if ``key`` was queued before); returns its id."""
+        item = item_id(key)
+        _create_json(self._path("items", item), dict(key=key, payload=payload, queued=time.time()))
+        return item
+
+    def items(self) -> list[str]:
+        return sorted(p.stem for p in (self.root / "items").glob("*.json"))
+
+    def is_done(self, item: str) -> bool:
+        return self._path("done", item).exists()
+
+    def attempts(self, item: str) -> int:
+        rec = _read_json(self._path("failed", item))
+        return len(rec["errors"]) if rec else 0
+
+    def claim(self, worker: str | None = None) -> Lease | None:
+        """Lease the first item that is neither done, leased, nor out of attempts."""
+        worker = worker or default_worker_id()
+        for item in self.items():
+            if self.is_done(item) or self.attempts(item) >= self.max_attempts:
+                continue
+            lease = self._acquire(item, worker)
+            if lease is not None:
+                if self.is_done(item):  # finished between the check and the lease
+                    self.release(lease)
+                    continue
+                return lease
+        return None
+
+    def _acquire(self, item: str, worker: str) -> Lease | None:
+        path = self._path("leases", item)
+        now = time.time()
+        lease = Lease(item, worker, uuid.uuid4().hex[:12], now, now + self.ttl)
+        rec = dict(worker=worker, token=lease.token, started=now, expires=lease.expires)
+        if not _create_json(path, rec):
+            held = _read_json(path)
+            if held is None or held["expires"] > now:
+                return None
+            # expired: move it aside (only one contender's rename succeeds), then retry
+            stale = path.with_name(f".{path.name}.expired.{lease.token}")
+            try:
+                path.rename(stale)
+            except FileNotFoundError:
+                return None
+            taken = _read_json(stale)
+            stale.unlink(missing_ok=True)
+            if taken is not None and taken["expires"] > now:
+                _create_json(path, taken)  # renewed just before the rename: put it back
+                return None
+            if not _create_json(path, rec):
+                return None
+        item_rec = _read_json(self._path("items", item)) or {}
+        lease.payload = item_rec.get("payload", {})
+        lease.scratch = self.root / "work" / f"{item}.{lease.token}"
+        return lease
+
+    def holds(self, lease: Lease) -> bool:
+        rec = _read_json(self._path("leases", lease.item))
+        return rec is not None and rec["token"] == lease.token
+
+    def renew(self, lease: Lease) -> bool:
+        """Extend the lease; False if it expired and was taken over."""
+        if not self.holds(lease):
+            return False
+        lease.expires = time.time() + self.ttl
+        rec = dict(
+            worker=lease.worker, token=lease.token, started=lease.started, expires=lease.expires
+        )
+        _write_json(self._path("leases", lease.item), rec)
+        return True
+
+    def release(self, lease: Lease) -> None:
+        if self.holds(lease):
+            self._path("leases", lease.item).unlink(missing_ok=True)
+
+    def complete(self, lease: Lease, result: dict | None = None) -> bool:
+        """Publish the scratch outputs and mark the item done.
+
+        Returns False (and discards this claim's outputs) if another claim completed it.
+        """
+        out = self.root / "out" / lease.item
+        published = False  # False: another claim's outputs (or none) are in out/<id>
+        if lease.scratch is not None and lease.scratch.exists():
+            try:
+                lease.scratch.rename(out)
+                published = True
+            except OSError:  # out/<id> already exists
+                shutil.rmtree(lease.scratch, ignore_errors=True)
+        now = time.time()
+        rec = dict(
+            worker=lease.worker,
+            token=lease.token,
+            started=lease.started,
+            finished=now,
+            duration_s=now - lease.started,
+            result=result or {},
+        )
+        rec["published"] = published
+        won = _create_json(self._path("done", lease.item), rec)
+        self.release(lease)
+        return won
+
+    def fail(self, lease: Lease, error: str) -> None:
+        path = self._path("failed", lease.item)
+        rec = _read_json(path) or dict(errors=[])
+        rec["errors"].append(dict(worker=lease.worker, at=time.time(), error=error[-2000:]))
+        _write_json(path, rec)
+        if lease.scratch is not None:
+            shutil.rmtree(lease.scratch, ignore_errors=True)
+        self.release(lease)
+
+    def status(self, window_s: float = 3600.0) -> dict:
+        """Progress, active/expired leases, failures and recent throughput."""
+        now = time.time()
+        items = self.items()
+        done = {i: _read_json(self._path("done", i)) for i in items if self.is_done(i)}
+        done = {i: r for i, r in done.items() if r is not None}
+        leases = {}
+        for p in (self.root / "leases").glob("*.json"):
+            rec = _read_json(p)
+            if rec is not None:
+                leases[p.stem] = rec
+        failed = {i: self.attempts(i) for i in items if i not in done}
+        failed = {i: n for i, n in failed.items() if n}
+        gave_up = [i for i, n in failed.items() if n >= self.max_attempts]
+        active = {i: r for i, r in leases.items() if r["expires"] > now and i not in done}
+        expired = sorted(i for i, r in leases.items() if r["expires"] <= now and i not in done)
+        pending = len(items) - len(done) - len(gave_up)
+        finished = sorted(r["finished"] for r in done.values())
+        recent = [t for t in finished if t > now - window_s]
+        per_hour = len(recent) * 3600.0 / window_s
+        durations = [r["duration_s"] for r in done.values()]
+        return dict(
+            items=len(items),
+            done=len(done),
+            pending=pending,
+            running=len(active),
+            expired=expired,
+            failed=failed,
+            gave_up=gave_up,
+            workers=sorted({r["worker"] for r in active.values()}),
+            per_hour=per_hour,
+            mean_duration_s=sum(durations) / len(durations) if durations else None,
+            eta_h=pending / per_hour if per_hour > 0 else None,
+            running_items={
+                i: dict(worker=r["worker"], age_s=now - r["started"]) for i, r in active.items()
+            },
+        )
+
+
+class _Heartbeat(threading.Thread):
+    def __init__(self, queue: WorkQueue, lease: Lease):
+        super().__init__(daemon=True, name=f"lease-{lease.item}")
+        self.queue, self.lease = queue, lease
+        self.stop = threading.Event()
+        self.lost = False
+
+    def run(self) -> None:
+        while not self.stop.wait(self.queue.ttl / 3):
+            if not self.queue.renew(self.lease):
+                self.lost = True
+                return
+
+
+def run_worker(
+    queue: WorkQueue,
+    process: Callable[[str, dict, Path], dict | None],
+    worker: str | None = None,
+    max_items: int | None = None,
+    poll_s: float = 0.0,
+    log: Callable[[str], None] = print,
+) -> int:
+    """Claim and process items until none are left (or ``max_items``); returns the count.
+
+    ``process(item, payload, scratch)`` writes the item's outputs under ``scratch`` and
+    returns a small result dict for the done record; exceptions count as failed attempts.
+    With ``poll_s`` > 0 the worker keeps polling for new items (or expiring leases)
+    instead of exiting when the queue is drained.
+    """
+    worker = worker or default_worker_id()
+    n = 0
+    while max_items is None or n < max_items:
+        lease = queue.claim(worker)
+        if lease is None:
+            if poll_s <= 0:
+                return n
+            time.sleep(poll_s)
+            continue
+        lease.scratch.mkdir(parents=True, exist_ok=True)
+        beat = _Heartbeat(queue, lease)
+        beat.start()
+        try:
+            result = process(lease.item, lease.payload, lease.scratch)
+        except Exception:
+            beat.stop.set()
+            beat.join()
+            log(f"[{worker}] {lease.item} failed")
+            queue.fail(lease, traceback.format_exc())
+        else:
+            beat.stop.set()
+            beat.join()
+            if queue.complete(lease, result):
+                log(f"[{worker}] {lease.item} done")
+            else:
+                log(f"[{worker}] {lease.item} was completed by another worker; outputs discarded")
+        n += 1
+    return n
@@ -1,4 +1,6 @@
-import cv2
+from traffic.utils.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
 
 
 def draw_overlay(frame, pred_exit_point=None, alt_exit_point=None):
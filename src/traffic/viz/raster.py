@@ -0,0 +1,258 @@
+"""Pre-aggregated 2-D density rasters for trajectory and outlier plots.
+
+Instead of scattering millions of points, trajectory samples are binned once into a fixed
+grid with ``np.bincount``:
+
+* ``points`` / ``entry`` / ``exit``: sample, first-sample and last-sample counts
+* ``vx`` / ``vy``: per-cell velocity sums (``mean_velocity`` divides by ``points``)
+* ``points@c<k>`` / ``entry@c<k>`` / ``exit@c<k>``: the same counts per cluster label
+  (``c-1`` holds the OPTICS outliers)
+
+Coarser levels are 2x2 sum-pools of the finest grid. A scene's rasters are cached in
+``<processed>/rasters.npz`` together with the fingerprints of the trajectory partitions
+already ingested, so new partitions are added without re-reading history. Partitions are
+assumed to hold whole tracks (entry/exit are taken per partition).
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.io.serialization import read_parquet
+from traffic.io.sources import fingerprint, trajectory_sources
+
+RASTER_VERSION = 1
+
+
+class DensityRasters:
+    def __init__(
+        self, bounds: tuple[float, float, float, float], shape: tuple[int, int] = (256, 256)
+    ):
+        x0, y0, x1, y1 = map(float, bounds)
+        if not (x1 > x0 and y1 > y0):
+            raise ValueError(f"invalid raster bounds {bounds}")
+        self.bounds = (x0, y0, x1, y1)
+        self.shape = (int(shape[0]), int(shape[1]))  # (ny, nx)
+        self.layers: dict[str, np.ndarray] = {}
+        self.ingested: dict[str, str] = {}
+        self.meta: dict[str, str] = {}
+        self.n_out_of_bounds = 0
+        self._pyramid: dict[tuple[str, int], np.ndarray] = {}
+
+    @classmethod
+    def for_points(
+        cls, x: np.ndarray, y: np.ndarray, shape: tuple[int, int] = (256, 256), pad: float = 0.05
+    ) -> "DensityRasters":
+        """Bounds from the data extent (padded), for scenes without configured bounds."""
+        x0, x1 = float(np.nanmin(x)), float(np.nanmax(x))
+        y0, y1 = float(np.nanmin(y)), float(np.nanmax(y))
+        px, py = max(x1 - x0, 1e-9) * pad, max(y1 - y0, 1e-9) * pad
+        return cls((x0 - px, y0 - py, x1 + px, y1 + py), shape)
+
+    def cells(self, x: np.ndarray, y: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Flat cell index of each point and the mask of points inside the bounds.
+
+        The bounds are closed: points on the upper edge fall in the last row/column.
+        """
+        x0, y0, x1, y1 = self.bounds
+        ny, nx = self.shape
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        ok = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        cx = np.minimum(np.floor((x[ok] - x0) * (nx / (x1 - x0))), nx - 1)
+        cy = np.minimum(np.floor((y[ok] - y0) * (ny / (y1 - y0))), ny - 1)
+        return (cy * nx + cx).astype(np.int64), ok
+
+    def _add(self, name: str, counts: np.ndarray, dtype) -> None:
+        counts = counts.reshape(self.shape)
+        if name in self.layers:
+            self.layers[name] += counts.astype(self.layers[name].dtype, copy=False)
+        else:
+            self.layers[name] = counts.astype(dtype)
+        self._pyramid = {k: v for k, v in self._pyramid.items() if k[0] != name}
+
+    def accumulate(self, name: str, x, y, weights=None, groups=None) -> None:
+        """Bin points into layer ``name`` (or ``name@c<g>`` per value of ``groups``)."""
+        idx, ok = self.cells(x, y)
+        self.n_out_of_bounds += int((~ok).sum()) if weights is None and groups is None else 0
+        ncell = self.shape[0] * self.shape[1]
+        w = None if weights is None else np.asarray(weights, dtype=np.float64)[ok]
+        dtype = np.uint32 if w is None else np.float64
+        if groups is None:
+            self._add(name, np.bincount(idx, weights=w, minlength=ncell), dtype)
+            return
+        labels, slot = np.unique(np.asarray(groups)[ok], return_inverse=True)
+        flat = np.bincount(slot * ncell + idx, weights=w, minlength=len(labels) * ncell)
+        for i, lab in enumerate(labels):
+            self._add(f"{name}@c{int(lab)}", flat[i * ncell : (i + 1) * ncell], dtype)
+
+    def add_trajectories(self, trajs: pd.DataFrame, clusters: pd.DataFrame | None = None) -> None:
+        """Bin a long trajectories table (track_id, frame, x, y[, vx, vy])."""
+        if len(trajs) == 0:
+            return
+        trajs = trajs.sort_values(["track_id", "frame"], kind="stable")
+        tid = trajs["track_id"].to_numpy()
+        x, y = trajs["x"].to_numpy(), trajs["y"].to_numpy()
+        first = np.flatnonzero(np.r_[True, tid[1:] != tid[:-1]])
+        last = np.r_[first[1:] - 1, len(tid) - 1]
+
+        self.accumulate("points", x, y)
+        if "vx" in trajs and "vy" in trajs:
+            self.accumulate("vx", x, y, weights=trajs["vx"].to_numpy())
+            self.accumulate("vy", x, y, weights=trajs["vy"].to_numpy())
+        self.accumulate("entry", x[first], y[first])
+        self.accumulate("exit", x[last], y[last])
+        if clusters is not None and len(clusters):
+            ids = clusters["track_id"].to_numpy()
+            order = np.argsort(ids)
+            ids, labs = ids[order], clusters["cluster"].to_numpy()[order]
+            pos = np.clip(np.searchsorted(ids, tid), 0, len(ids) - 1)
+            known = ids[pos] == tid
+            lab = labs[pos]
+            self.accumulate("points", x[known], y[known], groups=lab[known])
+            fk, lk = first[known[first]], last[known[last]]
+            self.accumulate("entry", x[fk], y[fk], groups=lab[fk])
+            self.accumulate("exit", x[lk], y[lk], groups=lab[lk])
+
+    def level(self, name: str, lvl: int = 0) -> np.ndarray:
+        """Layer ``name`` sum-pooled ``lvl`` times by 2x2 (level 0 = finest)."""
+        if lvl == 0:
+            return self.layers[name]
+        key = (name, lvl)
+        if key not in self._pyramid:
+            a = self.level(name, lvl - 1)
+            ny, nx = (a.shape[0] + 1) // 2 * 2, (a.shape[1] + 1) // 2 * 2
+            pad = np.zeros((ny, nx), dtype=a.dtype)
+            pad[: a.shape[0], : a.shape[1]] = a
+            self._pyramid[key] = pad.reshape(ny // 2, 2, nx // 2, 2).sum(axis=(1, 3), dtype=a.dtype)
+        return self._pyramid[key]
+
+    def mean_velocity(self, lvl: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        n = self.level("points", lvl).astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.level("vx", lvl) / n, self.level("vy", lvl) / n
+
+    def clusters(self) -> list[int]:
+        return sorted({int(k.split("@c")[1]) for k in self.layers if "@c" in k})
+
+    def extent(self) -> tuple[float, float, float, float]:
+        """``imshow`` extent for image-style coordinates (y grows downwards)."""
+        x0, y0, x1, y1 = self.bounds
+        return (x0, x1, y1, y0)
+
+    def cell_centers(self, lvl: int = 0) -> tuple[np.ndarray, np.ndarray]:
+        ny, nx = self.level("points", lvl).shape
+        x0, y0, x1, y1 = self.bounds
+        sx = (x1 - x0) / self.shape[1] * 2**lvl
+        sy = (y1 - y0) / self.shape[0] * 2**lvl
+        return np.meshgrid(x0 + (np.arange(nx) + 0.5) * sx, y0 + (np.arange(ny) + 0.5) * sy)
+
+    def show(self, ax, name: str, lvl: int = 0, log: bool = True, **kw):
+        """Draw a layer on a matplotlib axis; zero cells are left transparent."""
+        a = self.level(name, lvl).astype(np.float64)
+        a = np.log1p(a) if log else a
+        kw.setdefault("interpolation", "nearest")
+        return ax.imshow(np.ma.masked_equal(a, 0), extent=self.extent(), **kw)
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        header = dict(
+            version=RASTER_VERSION,
+            bounds=self.bounds,
+            shape=self.shape,
+            ingested=self.ingested,
+            meta=self.meta,
+            n_out_of_bounds=self.n_out_of_bounds,
+        )
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, __header__=np.array(json.dumps(header)), **self.layers)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: str | Path) -> "DensityRasters":
+        with np.load(path) as z:
+            header = json.loads(str(z["__header__"]))
+            if header.get("version") != RASTER_VERSION:
+                raise ValueError(f"{path}: raster cache version {header.get('version')}")
+            self = cls(tuple(header["bounds"]), tuple(header["shape"]))
+            self.layers = {k: z[k] for k in z.files if k != "__header__"}
+        self.ingested = header["ingested"]
+        self.meta = header["meta"]
+        self.n_out_of_bounds = header["n_out_of_bounds"]
+        return self
+
+
+def _extent(paths: list[Path]) -> tuple[float, float, float, float]:
+    """``(x0, y0, x1, y1)`` of all samples in the trajectory files ``paths``."""
+    lo, hi = np.full(2, np.inf), np.full(2, -np.inf)
+    for p in paths:
+        xy = read_parquet(p, columns=["x", "y"]).to_numpy(dtype=np.float64)
+        if len(xy):
+            lo, hi = np.fmin(lo, np.nanmin(xy, axis=0)), np.fmax(hi, np.nanmax(xy, axis=0))
+    return (lo[0], lo[1], hi[0], hi[1])
+
+
+def update_scene_rasters(
+    processed: str | Path,
+    shape: tuple[int, int] = (256, 256),
+    bounds: tuple[float, float, float, float] | None = None,
+    cache_name: str = "rasters.npz",
+) -> DensityRasters:
+    """Load the scene's raster cache and ingest trajectory partitions it has not seen.
+
+    The cache is rebuilt from scratch when the grid settings or the cluster labels change,
+    or when an already-ingested partition was rewritten or removed (counts cannot be
+    subtracted). Without configured ``bounds`` the grid covers the padded extent of all
+    partitions; a new partition reaching outside it also triggers a rebuild.
+    """
+    processed = Path(processed)
+    cache = processed / cache_name
+    clusters_path = processed / "clusters.parquet"
+    clusters_fp = fingerprint(clusters_path) if clusters_path.exists() else ""
+    # keyed relative to processed/, so another working directory does not re-ingest them
+    sources = {p.relative_to(processed).as_posix(): p for p in trajectory_sources(processed)}
+
+    rasters = DensityRasters.load(cache) if cache.exists() else None
+    if rasters is not None:
+        stale = (
+            rasters.shape != tuple(shape)
+            or (bounds is not None and rasters.bounds != tuple(map(float, bounds)))
+            or rasters.meta.get("clusters") != clusters_fp
+            or bool(set(rasters.ingested) - set(sources))
+            or any(
+                k in rasters.ingested and rasters.ingested[k] != fingerprint(p)
+                for k, p in sources.items()
+            )
+        )
+        if stale:
+            rasters = None
+
+    todo = [k for k in sources if rasters is None or k not in rasters.ingested]
+    if not todo and rasters is not None:
+        return rasters
+    if not sources:
+        raise FileNotFoundError(f"no trajectories found under {processed}")
+    if rasters is not None and bounds is None:
+        x0, y0, x1, y1 = _extent([sources[k] for k in todo])
+        bx0, by0, bx1, by1 = rasters.bounds
+        if x0 < bx0 or y0 < by0 or x1 >= bx1 or y1 >= by1:
+            rasters, todo = None, list(sources)
+    if rasters is None:
+        if bounds is None:
+            x0, y0, x1, y1 = _extent(list(sources.values()))
+            rasters = DensityRasters.for_points(np.array([x0, x1]), np.array([y0, y1]), shape)
+        else:
+            rasters = DensityRasters(bounds, shape)
+        rasters.meta["clusters"] = clusters_fp
+    clusters = read_parquet(clusters_path) if clusters_path.exists() else None
+    cols = ["track_id", "frame", "x", "y", "vx", "vy"]
+    for k in todo:
+        rasters.add_trajectories(read_parquet(sources[k], columns=cols), clusters)
+        rasters.ingested[k] = fingerprint(sources[k])
+    rasters.save(cache)
+    return rasters
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from traffic.track.adaptive import AdaptiveController, Level
+from traffic.trajectories.build import build_trajectories
+
+LEVELS = [Level("yolo11x.pt", 1088), Level("yolo11x.pt", 640), Level("yolo11n.pt", 640)]
+
+
+def _simulate(ctrl: AdaptiveController, cost_ms: list[float], n: int, frame0: int = 0) -> int:
+    frame = frame0
+    for _ in range(n):
+        ctrl.observe(frame, cost_ms[ctrl.level] / 1e3)
+        frame += ctrl.stride
+    return frame
+
+
+def test_degrades_levels_then_stride_and_recovers():
+    ctrl = AdaptiveController(LEVELS, target_fps=30, max_stride=3, window=5, cooldown=5, reprobe=50)
+    # every level is too slow for 33 ms: cheapest level, then skip frames
+    frame = _simulate(ctrl, [200.0, 90.0, 50.0], 100)
+    actions = [d.action for d in ctrl.decisions]
+    assert actions[:3] == ["cheaper_level", "cheaper_level", "raise_stride"]
+    assert ctrl.level == 2 and ctrl.stride == 2
+    assert ctrl.decisions[0].budget_ms == 1000 / 30
+    # the machine gets faster: stride first, then better levels as far as they fit
+    n = len(ctrl.decisions)
+    _simulate(ctrl, [200.0, 15.0, 5.0], 200, frame)
+    later = [d.action for d in ctrl.decisions[n:]]
+    assert later[:2] == ["lower_stride", "better_level"]
+    assert ctrl.stride == 1 and ctrl.level == 1
+    # the best level is re-probed now and then but never kept
+    assert all(d.level != str(LEVELS[0]) or d.action == "better_level" for d in ctrl.decisions)
+
+
+def test_stable_when_within_budget():
+    ctrl = AdaptiveController(LEVELS, target_fps=30, window=5, cooldown=5)
+    _simulate(ctrl, [25.0, 10.0, 5.0], 200)
+    assert ctrl.decisions == [] and ctrl.level == 0 and ctrl.stride == 1
+
+
+def test_strided_frames_keep_velocity_scale():
+    frames = np.arange(0, 90, 3)
+    df = pd.DataFrame(dict(frame=frames, track_id=1, cx=2.0 * frames, cy=5.0))
+    (traj,) = build_trajectories(df, fps=30)
+    np.testing.assert_allclose(traj["vx"], 60.0)
+    np.testing.assert_allclose(traj["vy"], 0.0, atol=1e-9)
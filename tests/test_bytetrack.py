@@ -0,0 +1,97 @@
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+
+from traffic.detect.cache import DetectionCacheWriter
+from traffic.track.bytetrack import TRACK_COLUMNS, replay
+
+
+class _FakeTracker:
+    """Gives every box of an update a new id; logs what it was fed."""
+
+    instances: list = []
+
+    def __init__(self, args, frame_rate):
+        self.args, self.frame_rate = args, frame_rate
+        self.updates: list = []
+        self.next_id = 1
+        _FakeTracker.instances.append(self)
+
+    def update(self, dets, img=None):
+        self.updates.append(dets.conf.copy())
+        n = len(dets)
+        ids = np.arange(self.next_id, self.next_id + n)
+        self.next_id += n
+        return np.column_stack([dets.xyxy, ids, dets.conf, dets.cls, np.arange(n)])
+
+
+@pytest.fixture
+def fake_tracker(monkeypatch, tmp_path):
+    _FakeTracker.instances = []
+    try:
+        from ultralytics.trackers import track
+    except ImportError:  # provide just what make_tracker imports
+        track = types.ModuleType("ultralytics.trackers.track")
+        track.TRACKER_MAP = {}
+        utils = types.ModuleType("ultralytics.utils")
+        utils.IterableSimpleNamespace = types.SimpleNamespace
+        utils.yaml_load = lambda path: yaml.safe_load(Path(path).read_text())
+        checks = types.ModuleType("ultralytics.utils.checks")
+        checks.check_yaml = str
+        for name, mod in [
+            ("ultralytics", types.ModuleType("ultralytics")),
+            ("ultralytics.trackers", types.ModuleType("ultralytics.trackers")),
+            ("ultralytics.trackers.track", track),
+            ("ultralytics.utils", utils),
+            ("ultralytics.utils.checks", checks),
+        ]:
+            monkeypatch.setitem(sys.modules, name, mod)
+    monkeypatch.setitem(track.TRACKER_MAP, "fake", _FakeTracker)
+    cfg = tmp_path / "fake.yaml"
+    cfg.write_text("tracker_type: fake\ntrack_buffer: 30\n")
+    return str(cfg)
+
+
+def _cache():
+    w = DetectionCacheWriter(None, conf=0.01, classes=None)
+    w.add(0, [[0, 0, 10, 10], [20, 20, 40, 30]], [0.9, 0.05], [2, 7])
+    w.add(1, np.zeros((0, 4)), [], [])
+    w.add(3, [[5, 5, 15, 25]], [0.6], [2])  # frame 2: nothing recorded
+    w.add(4, [[1, 1, 2, 2]], [0.02], [5])
+    return w.close()
+
+
+def test_replay_feeds_every_cached_frame_to_the_tracker(fake_tracker):
+    cache = _cache()
+    df, n = replay(cache, fake_tracker, frame_rate=25, track_buffer=60)
+    (tracker,) = _FakeTracker.instances
+    assert tracker.frame_rate == 25 and tracker.args.track_buffer == 60
+    assert n == cache.n_frames == 5
+    # like ultralytics, frames without boxes do not update the tracker
+    assert [len(u) for u in tracker.updates] == [2, 1, 1]
+    assert list(df.columns) == TRACK_COLUMNS
+    assert df.dtypes[["frame", "track_id", "cls"]].tolist() == [np.int64] * 3
+    assert df["frame"].tolist() == [0, 0, 3, 4]
+    assert df["track_id"].tolist() == [1, 2, 3, 4]
+    assert df["cls"].tolist() == [2, 7, 2, 5]
+    row = df.iloc[2]
+    assert (row["cx"], row["cy"], row["w"], row["h"]) == (10, 15, 10, 20)
+
+
+def test_replay_filters_at_min_conf(fake_tracker):
+    df, n = replay(_cache(), fake_tracker, min_conf=0.5)
+    (tracker,) = _FakeTracker.instances
+    assert n == 5
+    assert [u.tolist() for u in tracker.updates] == [[pytest.approx(0.9)], [pytest.approx(0.6)]]
+    assert df["frame"].tolist() == [0, 3] and (df["conf"] >= 0.5).all()
+
+
+def test_unknown_tracker_type_is_rejected(fake_tracker, tmp_path):
+    cfg = tmp_path / "other.yaml"
+    cfg.write_text("tracker_type: nope\n")
+    with pytest.raises(ValueError, match="nope"):
+        replay(_cache(), str(cfg))
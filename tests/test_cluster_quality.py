@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import davies_bouldin_score, silhouette_score
+
+from traffic.cluster.quality import ClusterQuality, score_labelings
+
+
+def test_matches_sklearn_when_the_sample_covers_the_data():
+    X, y = make_blobs(1500, centers=5, n_features=4, random_state=0)
+    q = ClusterQuality(X, sample=len(X))
+    assert q.silhouette(y) == pytest.approx(silhouette_score(X, y))
+    assert q.davies_bouldin(y) == pytest.approx(davies_bouldin_score(X, y))
+    # a small sample stays close to the exact silhouette
+    assert ClusterQuality(X, sample=300).silhouette(y) == pytest.approx(
+        silhouette_score(X, y), abs=0.03
+    )
+
+
+def test_dbcv_ranks_labelings_and_penalizes_noise():
+    X, y = make_blobs(3000, centers=5, n_features=4, random_state=0)
+    rng = np.random.default_rng(0)
+    noisy = y.copy()
+    noisy[rng.random(len(y)) < 0.3] = -1
+    df = score_labelings(X, [y, noisy, rng.integers(0, 5, len(y)), np.zeros(len(y), int)])
+    assert df["dbcv"][0] > df["dbcv"][1] > 0 > df["dbcv"][2]
+    assert df["silhouette"][0] > df["silhouette"][2]
+    assert df["davies_bouldin"][0] < df["davies_bouldin"][2]
+    assert df.iloc[3][["silhouette", "davies_bouldin", "dbcv"]].isna().all()
+
+
+def test_parallel_scores_equal_serial():
+    X, y = make_blobs(2000, centers=4, n_features=4, random_state=2)
+    labelings = [y, np.where(y < 2, y, -1), y % 3]
+    cols = ["silhouette", "davies_bouldin", "dbcv"]
+    serial = score_labelings(X, labelings, n_jobs=1, sample=500)[cols]
+    parallel = score_labelings(X, labelings, n_jobs=2, sample=500)[cols]
+    np.testing.assert_allclose(parallel.to_numpy(), serial.to_numpy())
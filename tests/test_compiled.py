@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic.classify.compiled import (
+    CompiledKNN,
+    compile_model,
+    load_compiled,
+    save_compiled,
+)
+from traffic.classify.models import make_model
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def _xy(n_features: int, n: int = 600, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 1, size=(5, n_features))
+    y = rng.integers(0, 5, n) * 3 + 1  # non-contiguous labels
+    X = centers[(y - 1) // 3] + rng.normal(0, 0.7, size=(n, n_features))
+    return X.astype(np.float32), y
+
+
+@pytest.mark.parametrize("kind,n_features", [("mlp", 20), ("knn", 6), ("knn", 24)])
+def test_compiled_matches_sklearn_after_roundtrip(tmp_path, kind, n_features):
+    X, y = _xy(n_features)
+    clf = make_model(kind)
+    if kind == "mlp":
+        clf.set_params(max_iter=50)
+    clf.fit(X[:500], y[:500])
+    path = tmp_path / f"{kind}.npz"
+    save_compiled(compile_model(clf), path)
+    model = load_compiled(path)
+    if kind == "knn":
+        assert (model.tree is not None) == (n_features <= 15)
+    Xt = X[450:]  # includes exact training matches for the distance-weighted KNN
+    np.testing.assert_array_equal(model.predict(Xt), clf.predict(Xt))
+    np.testing.assert_allclose(model.predict_proba(Xt), clf.predict_proba(Xt), atol=1e-4)
+    np.testing.assert_array_equal(model.predict(Xt[:1]), clf.predict(Xt[:1]))
+
+
+def test_compile_rejects_unsupported():
+    X, y = _xy(4, n=50)
+    with pytest.raises(TypeError):
+        compile_model(make_model("dt").fit(X, y))
+    with pytest.raises(ValueError):
+        CompiledKNN(X, y, np.unique(y), weights="custom")
+
+
+def _train_script(tmp_path, *overrides):
+    processed = tmp_path / "processed" / "s"
+    processed.mkdir(parents=True)
+    X, y = _xy(4, n=120)
+    feats = pd.DataFrame(X, columns=[f"f{i}" for i in range(4)])
+    feats.insert(0, "track_id", np.arange(len(X)))
+    feats.to_parquet(processed / "features.parquet", index=False)
+    pd.DataFrame(dict(track_id=np.arange(len(X)), exit_group=y)).to_parquet(
+        processed / "exit_groups.parquet", index=False
+    )
+    env = dict(os.environ, PYTHONPATH=str(ROOT / "src"))
+    return (
+        subprocess.run(
+            [
+                sys.executable,
+                str(ROOT / "scripts" / "train_classifiers.py"),
+                "dataset=synthetic",
+                f"dataset.data_dir={tmp_path}",
+                "dataset.scene=s",
+                f"hydra.run.dir={tmp_path / 'hydra'}",
+                *overrides,
+            ],
+            cwd=tmp_path,
+            env=env,
+            capture_output=True,
+            text=True,
+        ),
+        processed,
+    )
+
+
+def test_train_script_skips_compiling_unsupported_kinds(tmp_path):
+    res, processed = _train_script(tmp_path, "clf.name=dt", "clf.compile=true")
+    assert res.returncode == 0, res.stderr
+    assert "Not compiling dt" in res.stdout and "balanced-accuracy" in res.stdout
+    assert not list(processed.glob("classifier_*.npz"))
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from traffic.detect.cache import (
+    DetectionCache,
+    DetectionCacheWriter,
+    cache_key,
+    cache_path,
+)
+from traffic.track.bytetrack import Detections
+
+
+def _boxes(n: int, rng) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    xy = rng.uniform(0, 1000, (n, 2))
+    xyxy = np.hstack([xy, xy + rng.uniform(10, 80, (n, 2))])
+    return xyxy, rng.uniform(0.01, 1, n), rng.choice([2, 5, 7], n)
+
+
+def test_cache_roundtrip(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / "detections" / "v.npz"
+    writer = DetectionCacheWriter(path, video="v.mp4", weights="yolo11n.pt", imgsz=640, conf=0.01)
+    frames = {0: _boxes(3, rng), 1: _boxes(0, rng), 4: _boxes(5, rng)}
+    for i, dets in frames.items():
+        writer.add(i, *dets)
+    with pytest.raises(ValueError):
+        writer.add(2, *_boxes(1, rng))
+    writer.close()
+
+    cache = DetectionCache.load(path)
+    assert cache.n_frames == 5 and len(cache) == 8
+    assert cache.meta["imgsz"] == 640
+    for i in range(5):
+        xyxy, conf, cls = cache.frame(i)
+        ref = frames.get(i, _boxes(0, rng))
+        np.testing.assert_allclose(xyxy, ref[0], rtol=1e-6)
+        np.testing.assert_allclose(conf, ref[1], rtol=1e-6)
+        np.testing.assert_array_equal(cls, ref[2])
+
+    _, conf, _ = cache.frame(4, min_conf=0.5)
+    assert (conf >= 0.5).all() and len(conf) == (frames[4][1] >= 0.5).sum()
+    df = cache.to_frame()
+    assert (df["track_id"] == -1).all()
+    assert df["frame"].tolist() == [0] * 3 + [4] * 5
+    xyxy = np.concatenate([frames[0][0], frames[4][0]])
+    np.testing.assert_allclose(df["w"], xyxy[:, 2] - xyxy[:, 0], rtol=1e-5)
+
+
+def test_cache_key_tracks_inputs(tmp_path):
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"\x00" * 5000)
+    key = cache_key(video, "yolo11n.pt", 640)
+    assert key.startswith("clip-")
+    assert key == cache_key(video, "yolo11n.pt", 640)
+    assert key != cache_key(video, "yolo11x.pt", 640)
+    assert key != cache_key(video, "yolo11n.pt", 1088)
+    video.write_bytes(b"\x01" * 5000)
+    assert key != cache_key(video, "yolo11n.pt", 640)
+    assert cache_path(tmp_path, video, "yolo11n.pt", 640).parent == tmp_path / "detections"
+
+
+def test_check_refuses_caches_a_live_run_would_not_reproduce():
+    cache = DetectionCacheWriter(None, conf=0.1, classes=[7, 2]).close()
+    cache.check(0.1, [2, 7])
+    cache.check(0.5, (7, 2))  # higher cut: filtered at replay time
+    with pytest.raises(ValueError, match="conf=0.1"):
+        cache.check(0.05, [2, 7])
+    with pytest.raises(ValueError, match="classes"):
+        cache.check(0.5, [2])
+    with pytest.raises(ValueError, match="classes"):
+        cache.check(0.5, None)
+    DetectionCacheWriter(None, conf=0.01, classes=None).close().check(0.3, None)
+
+
+def test_detections_adapter():
+    d = Detections(np.array([[10, 20, 30, 60]]), np.array([0.9]), np.array([2]))
+    np.testing.assert_allclose(d.xywh, [[20, 40, 20, 40]])
+    assert len(d) == 1 and len(d[d.conf > 0.95]) == 0
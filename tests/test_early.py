@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic.classify.early import early_prediction_curve
+from traffic.features.vector_specs import FVS
+from traffic.features.vectorize import featurize_flat, prefix_lengths
+from traffic.trajectories.build import (
+    build_trajectories,
+    prefix_states,
+    trajectories_to_frame,
+)
+from traffic.trajectories.flat import flatten_tracks
+
+
+def test_prefix_lengths_follow_frame_span_with_gaps():
+    df = pd.DataFrame(
+        dict(
+            track_id=[9, 9, 9, 5, 5, 5, 5, 5],
+            frame=[3, 4, 100, 10, 11, 12, 15, 20],
+            x=np.arange(8.0),
+            y=0.0,
+        )
+    )
+    flat = flatten_tracks(df, ("frame", "x", "y"))
+    n = prefix_lengths(flat, [0.0, 0.1, 0.5, 1.0])
+    np.testing.assert_array_equal(n, [[1, 1], [2, 2], [4, 2], [5, 3]])
+    # prefix end position of track 5 at 50% is its 4th sample (frame 15)
+    np.testing.assert_array_equal(featurize_flat(flat, FVS["Re"], n[2])[:, 0], [6.0, 1.0])
+
+
+def test_early_curve_improves_with_observation():
+    rng = np.random.default_rng(0)
+    rows, labels = [], []
+    for tid in range(240):
+        turn = tid % 2  # both groups share the first half of the path, then diverge
+        t = np.linspace(0, 1, 30)
+        y = np.where(t < 0.5, 0.0, (t - 0.5) * (1 if turn else -1)) + rng.normal(0, 0.01, 30)
+        rows.append(pd.DataFrame(dict(track_id=tid, frame=np.arange(30), x=t, y=y)))
+        labels.append(turn)
+    flat = flatten_tracks(pd.concat(rows), ("frame", "x", "y"))
+    curve = early_prediction_curve(
+        flat, np.array(labels), FVS["Re"], kinds=["knn"], fractions=[0.3, 0.9], repeats=1
+    )
+    acc = curve.set_index("fraction")["balanced_accuracy"]
+    assert acc[0.3] < 0.7 and acc[0.9] > 0.95
+    assert curve["mean_observed"].is_monotonic_increasing
+
+
+def test_prefix_states_match_trajectories_of_the_cut_track():
+    rng = np.random.default_rng(1)
+    rows = []
+    for tid, n in enumerate([1, 2, 3, 5, 9, 10, 17, 40]):
+        frame = np.sort(rng.choice(3 * n, n, replace=False))  # gappy
+        cx, cy = np.cumsum(rng.normal(2, 1, n)), rng.normal(0, 3, n).cumsum()
+        rows.append(pd.DataFrame(dict(track_id=tid, frame=frame, cx=cx, cy=cy)))
+    raw = flatten_tracks(pd.concat(rows), ("frame", "cx", "cy"))
+    for n in prefix_lengths(raw, [0.2, 0.5, 0.8, 1.0]):
+        got = prefix_states(raw, n, fps=30)
+        for i, k in enumerate(n):
+            (ref,) = build_trajectories(rows[i].iloc[:k], fps=30)
+            for col in ("x", "y"):
+                np.testing.assert_allclose(got[f"{col}_s"][i], ref[col][0])
+                np.testing.assert_allclose(got[f"{col}_m"][i], ref[col][k // 2])
+            for col in ("x", "y", "vx", "vy", "ax", "ay"):
+                np.testing.assert_allclose(got[f"{col}_e"][i], ref[col][-1], atol=1e-9)
+
+
+def test_stored_smoothing_leaks_into_prefix_velocity():
+    # constant speed, then a hard stop right after the cut
+    frame = np.arange(40)
+    cx = np.where(frame < 20, 2.0 * frame, 40.0)
+    df = pd.DataFrame(dict(track_id=0, frame=frame, cx=cx, cy=0.0))
+    stored = flatten_tracks(trajectories_to_frame(build_trajectories(df, fps=1)))
+    raw = flatten_tracks(df, ("frame", "cx", "cy"))
+    n = np.array([20])
+    leaked = featurize_flat(stored, FVS["ReVe"], n)[0, 2]
+    causal = featurize_flat(stored, FVS["ReVe"], n, prefix_states(raw, n, fps=1))[0, 2]
+    assert causal == pytest.approx(2.0) and leaked < 1.9
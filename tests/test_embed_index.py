@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.features.embed import resample_arclength
+from traffic.features.knn_index import TrajectoryIndex
+from traffic.trajectories.flat import flatten_tracks
+
+
+def _tracks() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = []
+    for tid in range(60):
+        n = int(rng.integers(5, 40))
+        t = np.linspace(0, 1, n)
+        # three families of straight paths plus noise; shuffled row order on purpose
+        angle = (tid % 3) * np.pi / 3
+        x = t * np.cos(angle) + rng.normal(0, 0.01, n)
+        y = t * np.sin(angle) + rng.normal(0, 0.01, n)
+        rows.append(pd.DataFrame(dict(track_id=tid, frame=np.arange(n), x=x, y=y)))
+    return pd.concat(rows).sample(frac=1.0, random_state=0)
+
+
+def test_resample_matches_per_track_interp():
+    flat = flatten_tracks(_tracks(), ("frame", "x", "y"))
+    out = resample_arclength(flat, n_points=8)
+    assert out.shape == (60, 8, 2) and out.dtype == np.float32
+    for i in (0, 17, 59):
+        tr = flat.track(flat.track_ids[i])
+        s = np.r_[0, np.cumsum(np.hypot(np.diff(tr["x"]), np.diff(tr["y"])))]
+        s_new = np.linspace(0, s[-1], 8)
+        np.testing.assert_allclose(out[i, :, 0], np.interp(s_new, s, tr["x"]), atol=1e-6)
+        np.testing.assert_allclose(out[i, :, 1], np.interp(s_new, s, tr["y"]), atol=1e-6)
+
+
+def test_index_similar_and_roundtrip(tmp_path: Path):
+    flat = flatten_tracks(_tracks(), ("frame", "x", "y"))
+    index = TrajectoryIndex.from_tracks(flat, n_points=8, n_components=4)
+    sim = index.similar(4, k=5)
+    assert len(sim) == 5 and 4 not in set(sim["track_id"])
+    # neighbours share the path family of the query
+    assert set(sim["track_id"] % 3) == {4 % 3}
+    assert sim["distance"].is_monotonic_increasing
+
+    index.save(tmp_path / "index.pkl")
+    loaded = TrajectoryIndex.load(tmp_path / "index.pkl")
+    pd.testing.assert_frame_equal(loaded.similar(4, k=5), sim)
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from omegaconf import OmegaConf
+
+from traffic.features.knn_index import TrajectoryIndex
+from traffic.io.serialization import write_parquet
+from traffic.io.sources import fingerprint
+from traffic.trajectories.flat import flatten_tracks
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+from explore_outliers import load_index  # noqa: E402
+
+sys.path.pop(0)
+
+
+def _tracks(n: int) -> pd.DataFrame:
+    t = np.linspace(0, 1, 10)
+    return pd.concat(
+        pd.DataFrame(dict(track_id=tid, frame=np.arange(10), x=t, y=t * (tid % 3)))
+        for tid in range(n)
+    )
+
+
+def test_saved_index_is_rebuilt_when_trajectories_change(tmp_path, capsys):
+    cfg = OmegaConf.create(dict(features=dict(embed=dict(n_points=8, n_components=4))))
+    src = tmp_path / "trajectories.parquet"
+    write_parquet(_tracks(20), src)
+    saved = TrajectoryIndex.from_tracks(flatten_tracks(_tracks(20), ("frame", "x", "y")), 8, 4)
+    saved.source = fingerprint(src)
+    saved.save(tmp_path / "trajectory_index.pkl")
+    assert len(load_index(cfg, tmp_path, _tracks(20))) == 20
+    assert "rebuilding" not in capsys.readouterr().out
+
+    trajs = _tracks(30)
+    write_parquet(trajs, src)
+    index = load_index(cfg, tmp_path, trajs)
+    assert "rebuilding" in capsys.readouterr().out
+    assert len(index) == 30 and len(index.similar(25, k=3)) == 3
+    with pytest.raises(KeyError):
+        saved.similar(25)
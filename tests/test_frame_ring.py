@@ -0,0 +1,128 @@
+import multiprocessing as mp
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from traffic.io.frame_ring import FrameRing, RingDecoder
+
+
+def _frame(i: int) -> np.ndarray:
+    return np.full((6, 8, 3), i % 256, dtype=np.uint8)
+
+
+def _read_all(ring: FrameRing, out) -> None:
+    c = ring.consumer()
+    consistent = True
+    for ref in c:
+        consistent &= bool(ref.array[0, 0, 0] == ref.frame_idx % 256)
+    out.put((c.received, c.dropped, consistent))
+    ring.detach()
+
+
+def test_views_are_zero_copy_and_released():
+    with FrameRing(3, (6, 8, 3)) as ring:
+        c = ring.consumer()
+        ring.write(_frame(7), frame_idx=70)
+        with c.get(timeout=1) as ref:
+            assert ref.frame_idx == 70 and ref.array[0, 0, 0] == 7
+            assert np.shares_memory(ref.array, ring._data)
+            with pytest.raises(ValueError):
+                ref.array[0, 0, 0] = 1
+            assert ring._refs[ref.slot] == 1
+        assert ring._refs.sum() == 0
+        with pytest.raises(TimeoutError):
+            c.get(timeout=0.01)
+
+
+def test_slow_consumer_drops_oldest_and_held_slots_survive():
+    with FrameRing(3, (6, 8, 3)) as ring:
+        slow, fast = ring.consumer(), ring.consumer()
+        ring.write(_frame(0))
+        held = slow.get()
+        for i in range(6):
+            if i:
+                assert ring.write(_frame(i)) == i
+            with fast.get() as ref:
+                assert ref.seq == i
+        # the held slot was never overwritten; the other two cycled through frames 1..5
+        assert held.array[0, 0, 0] == 0
+        held.release()
+        ref = slow.get()
+        assert ref.seq == 4 and slow.dropped == 3 and fast.dropped == 0
+        ref.release()
+        ring.close()
+        assert [r.seq for r in slow] == [5]
+        assert slow.get() is None
+
+
+def test_writer_waits_when_all_slots_held():
+    with FrameRing(2, (6, 8, 3)) as ring:
+        c = ring.consumer()
+        ring.write(_frame(0))
+        ring.write(_frame(1))
+        refs = [c.get(), c.get()]
+        assert ring.write(_frame(2), block=False) == -1
+        threading.Timer(0.05, refs[0].release).start()
+        assert ring.write(_frame(2), timeout=2) == 2
+        refs[1].release()
+
+
+def test_consumers_in_other_processes():
+    ctx = mp.get_context("spawn")
+    n = 200
+    with FrameRing(4, (6, 8, 3), ctx=ctx) as ring:
+        out = ctx.Queue()
+        procs = [ctx.Process(target=_read_all, args=(ring, out)) for _ in range(2)]
+        for p in procs:
+            p.start()
+        for i in range(n):
+            ring.write(_frame(i), frame_idx=i)
+        ring.close()
+        results = [out.get(timeout=60) for _ in procs]
+        for p in procs:
+            p.join(timeout=30)
+    for received, dropped, consistent in results:
+        assert received + dropped == n and received > 0 and consistent
+
+
+def _video(path: Path, n: int) -> Path:
+    cv2 = pytest.importorskip("cv2")
+    vw = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+    assert vw.isOpened()
+    for i in range(n):
+        vw.write(np.full((24, 32, 3), 20 * i, np.uint8))
+    vw.release()
+    return path
+
+
+def test_decoder_fills_ring_slots_in_place(tmp_path):
+    decoder = RingDecoder(str(_video(tmp_path / "v.avi", 6)), slots=2)
+    seen = []
+    for ref in decoder:
+        assert np.shares_memory(ref.array, decoder.ring._data)
+        seen.append((ref.frame_idx, int(ref.array.mean())))
+        ref.release()
+    assert [f for f, _ in seen] == list(range(6))
+    assert all(abs(v - 20 * f) <= 3 for f, v in seen)
+    assert decoder.ring.closed and decoder.ring.written == 6
+    decoder.close()
+    assert decoder.ring is None
+
+
+def test_renderer_takes_held_slots_and_releases_them(tmp_path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+    try:
+        from visualize import HeadlessRenderer
+    finally:
+        sys.path.pop(0)
+    decoder = RingDecoder(str(_video(tmp_path / "v.avi", 9)), slots=3)
+    renderer = HeadlessRenderer(tmp_path / "out.avi", [(0, 255, 0)], every=2, fourcc="MJPG")
+    for ref in decoder:
+        renderer.submit(ref.frame_idx, ref, [(2, 2, 10, 10, 0, 0.9, 1)])
+    renderer.close()
+    assert renderer.written == 5
+    assert decoder.ring._refs.sum() == 0
+    decoder.close()
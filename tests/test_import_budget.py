@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+HEAVY = ["torch", "ultralytics", "cv2", "matplotlib"]
+DEFERRED = ["sklearn", "scipy"]
+# generous: these stages only need numpy/pandas (+ hydra for the scripts) at start-up
+BUDGET_S = 3.0
+
+_PROBE = """
+import importlib.util, json, sys, time
+t0 = time.perf_counter()
+for name in sys.argv[1].split(","):
+    if name.endswith(".py"):
+        spec = importlib.util.spec_from_file_location("probe_" + name[:-3], "scripts/" + name)
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+    else:
+        importlib.import_module(name)
+print(json.dumps({"elapsed": time.perf_counter() - t0, "modules": sorted(sys.modules)}))
+"""
+
+
+def _probe(*targets: str) -> dict:
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(ROOT / "src"), str(ROOT / "scripts")]))
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE, ",".join(targets)],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    res["top"] = {m.split(".")[0] for m in res["modules"]}
+    return res
+
+
+def test_library_imports_are_light():
+    res = _probe(
+        "traffic.track.tracker_api",
+        "traffic.detect.ultralytics_runner",
+        "traffic.viz.overlay",
+        "traffic.trajectories.build",
+        "traffic.features.vectorize",
+        "traffic.cluster.optics",
+        "traffic.cluster.consolidate",
+        "traffic.classify.models",
+        "traffic.classify.evaluate",
+    )
+    assert not res["top"] & set(HEAVY + DEFERRED)
+    assert res["elapsed"] < BUDGET_S
+
+
+def test_non_vision_scripts_start_without_vision_stack():
+    res = _probe(
+        "gen_features.py",
+        "build_trajectories.py",
+        "run_cluster.py",
+        "train_classifiers.py",
+        "explore_outliers.py",
+        "run_track.py",
+    )
+    assert not res["top"] & set(HEAVY)
+    assert res["elapsed"] < BUDGET_S
@@ -0,0 +1,62 @@
+import asyncio
+import time
+
+import numpy as np
+
+from traffic.track.ingest import IngestSupervisor, SourceSpec
+
+
+def _frames(n: int):
+    return (np.full((2, 2), i, dtype=np.int32) for i in range(n))
+
+
+def test_slow_worker_drops_stale_frames_and_bounds_lag():
+    seen = []
+
+    def process(name, idx, frame):
+        assert frame[0, 0] == idx
+        seen.append(idx)
+        time.sleep(0.02)
+
+    spec = SourceSpec("cam", "fake", fps=200, queue_size=2, max_lag_s=0.03)
+    sup = IngestSupervisor([spec], process, opener=lambda s: _frames(60))
+    st = asyncio.run(sup.run())["cam"]
+    assert st.read == 60
+    assert st.processed == len(seen) < 60
+    assert st.processed + st.dropped_full + st.dropped_stale == 60
+    assert seen == sorted(seen)
+    # waited at most max_lag_s before processing started, plus the processing itself
+    assert max(st.lag_s) < 0.03 + 0.02 + 0.05
+
+
+def test_failed_source_is_reconnected():
+    opened = []
+
+    def opener(spec):
+        opened.append(spec.name)
+        if len(opened) == 1:
+            raise OSError("connection refused")
+        return _frames(5)
+
+    got = []
+    spec = SourceSpec("cam", "rtsp://x", reconnect_s=0.01, max_lag_s=10)
+    sup = IngestSupervisor([spec], lambda n, i, f: got.append(i), opener=opener)
+    st = asyncio.run(sup.run())["cam"]
+    assert st.restarts == 1 and "connection refused" in st.errors[0]
+    assert got == list(range(5))
+
+
+def test_sources_are_independent_and_duration_stops_loops():
+    counts = {"a": 0, "b": 0}
+
+    def process(name, idx, frame):
+        counts[name] += 1
+
+    specs = [
+        SourceSpec("a", "a", fps=100, loop=True, reconnect_s=0.0, max_lag_s=10),
+        SourceSpec("b", "b", fps=100, max_lag_s=10),
+    ]
+    sup = IngestSupervisor(specs, process, opener=lambda s: _frames(10))
+    stats = asyncio.run(sup.run(duration=0.4))
+    assert stats["b"].processed == 10 and stats["b"].restarts == 0
+    assert stats["a"].processed > 10 and stats["a"].restarts >= 1
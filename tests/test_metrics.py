@@ -0,0 +1,76 @@
+import json
+import threading
+from pathlib import Path
+
+from traffic.utils.metrics import Metrics
+
+
+def test_stage_counters_and_export(tmp_path: Path):
+    m = Metrics()
+    m.reset("unit", labels={"scene": "sample"}, trace_memory=True)
+    with m.stage("work") as st:
+        buf = [0] * 10_000
+        st.items = len(buf)
+    with m.stage("work", items=5):
+        pass
+    m.count("frames", 3)
+    m.observe("inference_ms", 2.0)
+    m.observe("inference_ms", 4.0)
+
+    snap = m.write(tmp_path)
+    assert snap["stages"]["work"]["calls"] == 2
+    assert snap["stages"]["work"]["items"] == 10_005
+    assert snap["stages"]["work"]["py_peak_mb"] > 0
+    assert snap["distributions"]["inference_ms"]["mean"] == 3.0
+
+    record = json.loads((tmp_path / "metrics.jsonl").read_text().splitlines()[-1])
+    assert record["run"] == "unit" and record["counters"]["frames"] == 3
+    prom = (tmp_path / "metrics_unit.prom").read_text()
+    assert 'traffic_stage_calls_total{run="unit",scene="sample",stage="work"} 2' in prom
+    assert "traffic_frames_total" in prom
+
+
+def test_timed_decorator_and_profiler(tmp_path: Path):
+    m = Metrics()
+    m.reset("prof", profile=["busy"])
+
+    @m.timed("busy")
+    def busy():
+        return sum(i * i for i in range(200_000))
+
+    busy()
+    m.write(tmp_path)
+    assert m.stages["busy"].calls == 1
+    assert (tmp_path / "profile_prof_busy.folded").exists()
+
+
+def test_nested_stage_keeps_the_outer_heap_peak():
+    m = Metrics()
+    m.reset("nested", trace_memory=True)
+    with m.stage("outer"):
+        big = bytearray(8 * 1024 * 1024)
+        del big
+        with m.stage("inner"):
+            small = bytearray(1024 * 1024)
+            with m.stage("innermost"):
+                pass
+            del small
+    assert m.stages["outer"].py_peak_mb >= 8
+    assert 1 <= m.stages["inner"].py_peak_mb < 8
+
+
+def test_counters_are_thread_safe():
+    m = Metrics()
+    m.reset("threads")
+
+    def work():
+        for _ in range(10_000):
+            m.count("n")
+            m.observe("v", 1.0)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert m.counters["n"] == 40_000 and m.dists["v"].count == 40_000
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from omegaconf import OmegaConf
+
+from traffic.detect.cache import DetectionCacheWriter
+from traffic.detect.motion import MotionGate, detection_recall
+from traffic.detect.roi import Roi
+
+
+def _frames(n: int, moving: range, seed: int = 0):
+    """Static noisy scene; a bright square crosses it during ``moving``."""
+    rng = np.random.default_rng(seed)
+    scene = rng.integers(40, 80, (360, 640, 3), dtype=np.uint8)
+    for i in range(n):
+        f = np.clip(scene + rng.normal(0, 3, scene.shape), 0, 255).astype(np.uint8)
+        if i in moving:
+            x = 20 + 12 * (i - moving.start)
+            f[150:210, x : x + 60] = 230
+        yield f
+
+
+def test_gate_skips_static_frames_and_strides_when_idle():
+    gate = MotionGate(idle_stride=10, warmup=2, hangover=3)
+    inferred = np.array([gate.update(f) for f in _frames(120, range(40, 80))])
+    assert inferred[:2].all() and inferred[40:83].all()
+    idle = np.flatnonzero(inferred[83:]) + 83
+    assert np.diff(idle).tolist() == [10] * (len(idle) - 1)
+    assert gate.n_frames == 120 and 0.5 < gate.skip_ratio < 0.8
+    log = gate.to_frame()
+    assert log["motion"][50] > 0.01 and log["motion"][20] < gate.min_area
+
+
+def test_motion_outside_the_roi_is_ignored():
+    roi = Roi([[0, 250], [640, 250], [640, 360], [0, 360]])
+    gate = MotionGate(roi, idle_stride=0, warmup=1, hangover=0)
+    inferred = [gate.update(f) for f in _frames(60, range(20, 40))]
+    assert sum(inferred) == 1
+
+
+def test_from_cfg():
+    assert MotionGate.from_cfg(OmegaConf.create({"motion_gate": None})) is None
+    gate = MotionGate.from_cfg(OmegaConf.create({"motion_gate": {"width": 96}}))
+    assert gate.width == 96 and gate.idle_stride == 15
+    with pytest.raises(ValueError):
+        MotionGate.from_cfg(OmegaConf.create({"motion_gate": {"alpha": 0.0}}))
+
+
+def test_detection_recall_matches_boxes_per_frame_and_class():
+    ref, gated = DetectionCacheWriter(None), DetectionCacheWriter(None)
+    box = np.array([[10, 10, 50, 50], [100, 100, 140, 140]], np.float32)
+    ref.add(0, box, np.ones(2), np.array([2, 2]))
+    gated.add(0, box + 2, np.ones(2), np.array([2, 7]))  # second box: wrong class
+    ref.add(1, box[:1], np.ones(1), np.array([2]))
+    gated.add(1, box[:1] + 30, np.ones(1), np.array([2]))  # moved away: IoU < 0.5
+    ref, gated = ref.close(), gated.close()
+    assert detection_recall(ref, gated) == dict(recall=1 / 3, reference_boxes=3, matched=1)
+    assert detection_recall(ref, gated, frames=[1])["recall"] == 0.0
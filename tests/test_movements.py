@@ -0,0 +1,148 @@
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from traffic.cluster import movements
+from traffic.cluster.movements import MovementCube, update_movement_cube
+from traffic.io.serialization import write_parquet
+
+
+def _trajs(n_tracks: int, first_id: int = 0, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for tid in range(first_id, first_id + n_tracks):
+        n = int(rng.integers(2, 40))
+        f0 = int(rng.integers(0, 3 * 900 * 10))
+        v = rng.lognormal(1.0, 0.4)
+        rows.append(
+            pd.DataFrame(dict(track_id=tid, frame=f0 + np.arange(n), vx=v * 0.6, vy=-v * 0.8))
+        )
+    return pd.concat(rows, ignore_index=True)
+
+
+def _reference(df: pd.DataFrame, labels: pd.DataFrame, fps: float, bin_s: float):
+    g = df.groupby("track_id")
+    per = pd.DataFrame(
+        dict(
+            speed=g.apply(lambda t: np.hypot(t["vx"], t["vy"]).mean()),
+            travel=(g["frame"].max() - g["frame"].min()) / fps,
+            bin=(g["frame"].min() // (bin_s * fps)).astype(np.int64),
+        )
+    ).reset_index()
+    per = per.merge(labels, on="track_id")
+    return per.groupby(["cluster", "bin"]).agg(
+        count=("speed", "size"),
+        speed_mean=("speed", "mean"),
+        speed_p85=("speed", lambda v: np.percentile(v, 85, method="inverted_cdf")),
+        travel_p50=("travel", lambda v: np.percentile(v, 50, method="inverted_cdf")),
+    )
+
+
+def test_cube_matches_pandas_and_merges_incrementally(tmp_path, monkeypatch):
+    parts = tmp_path / "trajectories"
+    a, b = _trajs(300), _trajs(200, first_id=1000, seed=1)
+    labels = pd.DataFrame(dict(track_id=np.r_[np.arange(300), np.arange(1000, 1190)]))
+    labels["cluster"] = labels["track_id"] % 4 - 1
+    write_parquet(labels, tmp_path / "clusters.parquet")
+    write_parquet(a, parts / "p0.parquet")
+    cube = update_movement_cube(tmp_path, bin_s=900, fps=10)
+    assert int(cube.stats["count"].sum()) == 300
+
+    write_parquet(b, parts / "p1.parquet")
+    cube = update_movement_cube(tmp_path, bin_s=900, fps=10)
+    assert len(cube.unlabeled) == 10  # ids 1190..1199 have no label
+
+    got = cube.to_frame((50, 85)).set_index(["cluster", "bin"])
+    ref = _reference(pd.concat([a, b]), labels, fps=10, bin_s=900)
+    got = got.loc[ref.index]
+    np.testing.assert_array_equal(got["count"], ref["count"])
+    np.testing.assert_allclose(got["speed_mean"], ref["speed_mean"])
+    np.testing.assert_allclose(got["speed_p85"], ref["speed_p85"], rtol=cube.alpha)
+    np.testing.assert_allclose(got["travel_p50"], ref["travel_p50"], rtol=cube.alpha)
+
+    # nothing new: served from the cache
+    mtime = os.stat(tmp_path / "movement_cube.npz").st_mtime_ns
+    update_movement_cube(tmp_path, bin_s=900, fps=10)
+    assert os.stat(tmp_path / "movement_cube.npz").st_mtime_ns == mtime
+
+    # labels for a new partition only: merged without touching history
+    c = _trajs(50, first_id=5000, seed=2)
+    write_parquet(c, parts / "p2.parquet")
+    more = pd.DataFrame(dict(track_id=np.arange(5000, 5050), cluster=7))
+    write_parquet(pd.concat([labels, more]), tmp_path / "clusters.parquet")
+    read = []
+    real = movements.read_parquet
+    monkeypatch.setattr(
+        movements,
+        "read_parquet",
+        lambda path, **kw: read.append(Path(path).name) or real(path, **kw),
+    )
+    cube = update_movement_cube(tmp_path, bin_s=900, fps=10)
+    assert int(cube.stats["count"].sum()) == 540
+    assert read == ["clusters.parquet", "p2.parquet"]
+
+    # a counted track changed label: rebuilt
+    labels["cluster"] = 0
+    write_parquet(labels, tmp_path / "clusters.parquet")
+    cube = update_movement_cube(tmp_path, bin_s=900, fps=10)
+    assert set(cube.to_frame()["cluster"]) == {0}
+
+
+def test_merging_in_pieces_equals_one_batch():
+    rng = np.random.default_rng(3)
+    n = 5000
+    lab = rng.integers(0, 3, (n, 2))
+    f0, speed, travel = rng.integers(0, 10**5, n), rng.gamma(3, 2, n), rng.uniform(1, 60, n)
+    one = MovementCube(("cluster", "exit_group"))
+    one.add_tracks(lab, f0, speed, travel)
+    pieces = MovementCube(("cluster", "exit_group"))
+    for idx in np.array_split(rng.permutation(n), 7):
+        pieces.add_tracks(lab[idx], f0[idx], speed[idx], travel[idx])
+    pd.testing.assert_frame_equal(one.to_frame(), pieces.to_frame())
+
+
+def test_removed_partition_rebuilds_and_keys_do_not_depend_on_cwd(tmp_path, monkeypatch):
+    parts = tmp_path / "trajectories"
+    labels = pd.DataFrame(dict(track_id=np.arange(2000), cluster=0))
+    write_parquet(labels, tmp_path / "clusters.parquet")
+    write_parquet(_trajs(10), parts / "p0.parquet")
+    write_parquet(_trajs(10, first_id=1000, seed=1), parts / "p1.parquet")
+    cube = update_movement_cube(tmp_path)
+    assert int(cube.stats["count"].sum()) == 20 and set(cube.ingested) == {
+        "trajectories/p0.parquet",
+        "trajectories/p1.parquet",
+    }
+
+    # the same scene reached through another relative path: nothing re-ingested
+    monkeypatch.chdir(tmp_path.parent)
+    cube = update_movement_cube(Path(tmp_path.name))
+    assert int(cube.stats["count"].sum()) == 20
+
+    (parts / "p0.parquet").unlink()
+    cube = update_movement_cube(tmp_path)
+    assert int(cube.stats["count"].sum()) == 10
+    assert set(cube.ingested) == {"trajectories/p1.parquet"}
+
+
+def test_empty_cube_keeps_its_ledger(tmp_path, monkeypatch):
+    parts = tmp_path / "trajectories"
+    write_parquet(
+        pd.DataFrame(dict(track_id=np.arange(100), cluster=0)), tmp_path / "clusters.parquet"
+    )
+    write_parquet(_trajs(1).iloc[:0], parts / "p0.parquet")  # no tracks yet
+    cube = update_movement_cube(tmp_path)
+    assert len(cube) == 0 and set(cube.ingested) == {"trajectories/p0.parquet"}
+
+    write_parquet(_trajs(5), parts / "p1.parquet")
+    read = []
+    real = movements.read_parquet
+    monkeypatch.setattr(
+        movements,
+        "read_parquet",
+        lambda path, **kw: read.append(Path(path).name) or real(path, **kw),
+    )
+    cube = update_movement_cube(tmp_path)
+    assert "p0.parquet" not in read and int(cube.stats["count"].sum()) == 5
+    assert set(cube.ingested) == {"trajectories/p0.parquet", "trajectories/p1.parquet"}
@@ -0,0 +1,84 @@
+import numpy as np
+
+from traffic.track.multistream import FrameReader, track_streams
+
+
+class _Boxes:
+    def __init__(self, values):
+        self.xyxy = np.array([[0, 0, 10, 10]] * len(values), dtype=np.float32)
+        self.conf = np.full(len(values), 0.9, dtype=np.float32)
+        self.cls = np.asarray(values, dtype=np.float32)
+
+    def __len__(self):
+        return len(self.conf)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+
+class _Result:
+    def __init__(self, frame):
+        # one box per frame whose class encodes (stream, frame) so routing is checkable
+        self.boxes = _Boxes([frame[0, 0]])
+
+
+class _Tracker:
+    def __init__(self):
+        self.seen = []
+
+    def update(self, frame_idx, xyxy, conf, cls, img=None):
+        self.seen.append((frame_idx, int(cls[0])))
+
+
+def test_batched_frames_route_to_their_stream():
+    lengths = {"a": 5, "b": 2, "c": 4}
+    streams = {
+        name: [np.full((4, 4), 10 * k + i, dtype=np.uint8) for i in range(n)]
+        for k, (name, n) in enumerate(lengths.items())
+    }
+    batches = []
+
+    def predict(frames):
+        batches.append(len(frames))
+        return [_Result(f) for f in frames]
+
+    readers = {
+        name: FrameReader(frames, queue_size=2, name=name) for name, frames in streams.items()
+    }
+    trackers = {name: _Tracker() for name in streams}
+    res = track_streams(readers, predict, trackers, max_batch=2)
+
+    for k, (name, n) in enumerate(lengths.items()):
+        assert trackers[name].seen == [(i, 10 * k + i) for i in range(n)]
+        assert res.stats[name].frames == n and res.stats[name].boxes == n
+    assert res.frames == 11
+    assert max(batches) == 2 and sum(batches) == 11
+    assert res.batches == len(batches)
+
+
+def test_max_frames_stops_each_stream():
+    frames = [np.zeros((2, 2), np.uint8)] * 10
+    readers = {s: FrameReader(iter(frames), queue_size=1, name=s) for s in "xy"}
+    trackers = {s: _Tracker() for s in "xy"}
+    res = track_streams(readers, lambda fs: [_Result(f) for f in fs], trackers, max_frames=3)
+    assert {s: st.frames for s, st in res.stats.items()} == {"x": 3, "y": 3}
+
+
+def test_closed_reader_does_not_block_and_releases_the_source():
+    released = []
+
+    def frames():
+        try:
+            while True:
+                yield np.zeros((2, 2), np.uint8)
+        finally:
+            released.append(True)
+
+    reader = FrameReader(frames(), queue_size=1, name="z")
+    assert reader.get() is not None
+    reader.close()  # queue left full, nobody reads any more
+    reader._thread.join(timeout=2.0)
+    assert not reader._thread.is_alive() and released == [True]
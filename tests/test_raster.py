@@ -0,0 +1,99 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from traffic.io.serialization import write_parquet
+from traffic.viz.raster import DensityRasters, update_scene_rasters
+
+
+def _trajs(n_tracks: int, first_id: int = 0, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for tid in range(first_id, first_id + n_tracks):
+        n = int(rng.integers(5, 30))
+        x, y = rng.uniform(0, 1, n), rng.uniform(0, 1, n)
+        rows.append(pd.DataFrame(dict(track_id=tid, frame=np.arange(n), x=x, y=y, vx=1.0, vy=-2.0)))
+    return pd.concat(rows, ignore_index=True)
+
+
+def test_counts_match_histogram2d_and_pyramid():
+    df = _trajs(50)
+    r = DensityRasters((0, 0, 1, 1), shape=(16, 16))
+    clusters = pd.DataFrame(dict(track_id=np.arange(50), cluster=np.arange(50) % 3 - 1))
+    r.add_trajectories(df, clusters)
+    ref, _, _ = np.histogram2d(df["y"], df["x"], bins=16, range=[[0, 1], [0, 1]])
+    np.testing.assert_array_equal(r.layers["points"], ref)
+    assert r.layers["entry"].sum() == r.layers["exit"].sum() == 50
+    assert r.clusters() == [-1, 0, 1]
+    assert sum(r.layers[f"points@c{c}"].sum() for c in r.clusters()) == len(df)
+    assert r.level("points", 2).shape == (4, 4) and r.level("points", 2).sum() == len(df)
+    u, v = r.mean_velocity(1)
+    hit = r.level("points", 1) > 0
+    np.testing.assert_allclose(u[hit], 1.0)
+    np.testing.assert_allclose(v[hit], -2.0)
+
+
+def test_upper_bound_falls_in_the_last_cell():
+    r = DensityRasters((0, 0, 1, 1), shape=(4, 4))
+    x = np.array([0.0, 1.0, 1.0, 0.5, 1.0 + 1e-9, np.nan])
+    y = np.array([0.0, 1.0, 0.5, 1.0, 0.5, 0.5])
+    r.accumulate("points", x, y)
+    ref, _, _ = np.histogram2d(y[:4], x[:4], bins=4, range=[[0, 1], [0, 1]])
+    np.testing.assert_array_equal(r.layers["points"], ref)
+    assert r.layers["points"][3, 3] == 1 and r.n_out_of_bounds == 2
+
+
+def test_scene_cache_is_incremental(tmp_path):
+    parts = tmp_path / "trajectories"
+    parts.mkdir()
+    write_parquet(_trajs(20), parts / "p0.parquet")
+    r = update_scene_rasters(tmp_path, shape=(8, 8), bounds=(0, 0, 1, 1))
+    assert list(r.ingested) == ["trajectories/p0.parquet"]
+
+    write_parquet(_trajs(30, first_id=100, seed=1), parts / "p1.parquet")
+    r = update_scene_rasters(tmp_path, shape=(8, 8), bounds=(0, 0, 1, 1))
+    assert len(r.ingested) == 2 and r.layers["entry"].sum() == 50
+
+    # unchanged inputs: served straight from the cache
+    mtime = os.stat(tmp_path / "rasters.npz").st_mtime_ns
+    again = update_scene_rasters(tmp_path, shape=(8, 8), bounds=(0, 0, 1, 1))
+    assert os.stat(tmp_path / "rasters.npz").st_mtime_ns == mtime
+    np.testing.assert_array_equal(again.layers["points"], r.layers["points"])
+
+    # new cluster labels invalidate the per-cluster layers -> full rebuild
+    labels = pd.DataFrame(dict(track_id=[0, 100], cluster=[2, -1]))
+    write_parquet(labels, tmp_path / "clusters.parquet")
+    r = update_scene_rasters(tmp_path, shape=(8, 8), bounds=(0, 0, 1, 1))
+    assert r.clusters() == [-1, 2] and r.layers["entry"].sum() == 50
+
+
+def test_removed_partition_rebuilds(tmp_path):
+    parts = tmp_path / "trajectories"
+    parts.mkdir()
+    write_parquet(_trajs(20), parts / "p0.parquet")
+    write_parquet(_trajs(30, first_id=100, seed=1), parts / "p1.parquet")
+    r = update_scene_rasters(tmp_path, shape=(8, 8), bounds=(0, 0, 1, 1))
+    assert r.layers["entry"].sum() == 50
+    (parts / "p0.parquet").unlink()
+    r = update_scene_rasters(tmp_path, shape=(8, 8), bounds=(0, 0, 1, 1))
+    assert r.layers["entry"].sum() == 30 and list(r.ingested) == ["trajectories/p1.parquet"]
+
+
+def test_unconfigured_bounds_grow_with_new_partitions(tmp_path):
+    parts = tmp_path / "trajectories"
+    parts.mkdir()
+    write_parquet(_trajs(20), parts / "p0.parquet")
+    r = update_scene_rasters(tmp_path, shape=(8, 8))
+    inside = _trajs(10, first_id=100, seed=1).assign(x=lambda d: d["x"] * 0.5 + 0.25)
+    write_parquet(inside, parts / "p1.parquet")
+    grown = update_scene_rasters(tmp_path, shape=(8, 8))
+    assert grown.bounds == r.bounds and grown.layers["entry"].sum() == 30
+
+    outside = _trajs(10, first_id=200, seed=2).assign(x=lambda d: d["x"] + 3.0)
+    write_parquet(outside, parts / "p2.parquet")
+    grown = update_scene_rasters(tmp_path, shape=(8, 8))
+    assert grown.bounds[2] > 4.0 and grown.n_out_of_bounds == 0
+    assert grown.layers["points"].sum() == sum(
+        len(pd.read_parquet(p)) for p in parts.glob("*.parquet")
+    )
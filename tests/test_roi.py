@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from omegaconf import OmegaConf
+
+from traffic.detect.roi import Roi, points_in_polygon
+
+
+def test_points_in_polygon_concave():
+    # L-shape: the notch at (3, 3) is outside
+    poly = np.array([[0, 0], [4, 0], [4, 2], [2, 2], [2, 4], [0, 4]], dtype=float)
+    x = np.array([1, 3, 3, 1, 5])
+    y = np.array([1, 1, 3, 3, 1])
+    assert points_in_polygon(x, y, poly).tolist() == [True, True, False, True, False]
+
+
+def test_crop_and_apply_map_back_to_full_frame():
+    roi = Roi([[100, 200], [500, 200], [500, 400], [100, 400]], pad=10)
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    assert roi.bbox(frame.shape) == (90, 190, 510, 410)
+    assert roi.crop(frame).shape == (220, 420, 3)
+    assert roi.area_fraction(frame.shape) == pytest.approx(220 * 420 / (720 * 1280))
+
+    # crop-relative boxes: one inside the polygon, one in the padding margin
+    xyxy = np.array([[100, 100, 140, 140], [0, 0, 12, 12]], dtype=np.float32)
+    out, conf, cls = roi.apply(frame.shape, xyxy, np.array([0.9, 0.8]), np.array([2, 7]))
+    np.testing.assert_allclose(out, [[190, 290, 230, 330]])
+    assert conf.tolist() == [0.9] and cls.tolist() == [2]
+
+
+def test_bbox_clipped_and_cfg_forms():
+    roi = Roi.from_cfg(OmegaConf.create({"roi": [[-50, -50], [60, 0], [0, 60]]}))
+    assert roi.bbox((100, 100)) == (0, 0, 76, 76)
+    roi = Roi.from_cfg(
+        OmegaConf.create({"roi": {"polygon": [[0, 0], [10, 0], [10, 10]], "anchor": "bottom"}})
+    )
+    assert roi.anchor == "bottom" and roi.pad == 16
+    assert Roi.from_cfg(OmegaConf.create({"roi": None})) is None
+    with pytest.raises(ValueError):
+        Roi([[0, 0], [1, 1]])
+    with pytest.raises(ValueError):
+        Roi([[2000, 2000], [2100, 2000], [2100, 2100]], pad=0).bbox((720, 1280))
@@ -0,0 +1,146 @@
+import argparse
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import run_scenes  # noqa: E402
+from run_scenes import (  # noqa: E402
+    MemoryBudget,
+    discover_scenes,
+    expected_mem_mb,
+    summarize,
+)
+
+sys.path.pop(0)
+
+
+def _start(budget: MemoryBudget, mb: float, log: list, name: str) -> threading.Thread:
+    def run():
+        budget.acquire(mb)
+        log.append(name)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return t
+
+
+def _settle() -> None:
+    time.sleep(0.05)
+
+
+def test_budget_blocks_until_reservations_fit():
+    budget, log = MemoryBudget(100), []
+    budget.acquire(60)
+    t = _start(budget, 50, log, "b")
+    _settle()
+    assert log == [] and budget.used_mb == 60
+    budget.release(60)
+    t.join(1)
+    assert log == ["b"] and budget.used_mb == 50
+    budget.release(50)
+    assert budget.used_mb == 0
+
+
+def test_oversized_reservation_runs_alone_and_is_not_starved():
+    budget, log = MemoryBudget(100), []
+    budget.acquire(40)
+    big = _start(budget, 500, log, "big")
+    _settle()
+    # fits next to the running 40 MiB, but queues behind the waiting oversized stage
+    small = _start(budget, 10, log, "small")
+    _settle()
+    assert log == []
+    budget.release(40)
+    big.join(1)
+    _settle()
+    assert log == ["big"] and budget.used_mb == 500
+    budget.release(500)
+    small.join(1)
+    assert log == ["big", "small"]
+
+
+def test_expected_mem_uses_the_largest_earlier_peak():
+    records = [
+        dict(run="run_cluster", peak_rss_mb=800.0),
+        dict(run="run_cluster", peak_rss_mb=1200.0),
+        dict(run="run_cluster", peak_rss_mb=None),
+        dict(run="gen_features", peak_rss_mb=5000.0),
+    ]
+    assert expected_mem_mb(records, "run_cluster", 2000, 1.25) == pytest.approx(1500)
+    assert expected_mem_mb(records, "train_classifiers", 2000, 1.25) == 2000
+    assert expected_mem_mb([], "run_cluster", 300, 1.25) == 300
+
+
+def test_discover_scenes_skips_defaults(tmp_path):
+    for name in ("defaults", "b_scene", "a_scene"):
+        (tmp_path / f"{name}.yaml").write_text("{}\n")
+    assert discover_scenes(tmp_path) == ["a_scene", "b_scene"]
+
+
+def test_summary_takes_the_latest_record_of_this_run(tmp_path):
+    recs = [
+        # older than this run: ignored
+        dict(run="run_cluster", started=5, elapsed_s=9.0, peak_rss_mb=900, gauges=dict(clusters=2)),
+        dict(
+            run="build_trajectories",
+            started=11,
+            elapsed_s=1.5,
+            peak_rss_mb=300,
+            counters=dict(tracks=40),
+        ),
+        dict(
+            run="run_cluster",
+            started=12,
+            elapsed_s=3.0,
+            peak_rss_mb=700,
+            counters=dict(tracks=38),
+            gauges=dict(clusters=5, outlier_pct=4.0),
+        ),
+        dict(
+            run="run_cluster",
+            started=13,
+            elapsed_s=2.0,
+            peak_rss_mb=650,
+            counters=dict(tracks=38),
+            gauges=dict(clusters=6, outlier_pct=5.0),
+        ),
+        dict(run="eval_early", started=14, elapsed_s=99.0, peak_rss_mb=9999),  # not a stage
+    ]
+    (tmp_path / "metrics.jsonl").write_text("".join(json.dumps(r) + "\n" for r in recs))
+    stages = ["build_trajectories", "run_cluster", "train_classifiers"]
+    row = summarize(dict(scene="s", status="ok", failed_stage=None), tmp_path, stages, since=10)
+    assert row["scene"] == "s" and row["status"] == "ok"
+    assert row["tracks"] == 38 and row["clusters"] == 6 and row["outlier_pct"] == 5.0
+    assert row["balanced_accuracy"] is None and row["train_classifiers_s"] is None
+    assert row["build_trajectories_s"] == 1.5 and row["run_cluster_s"] == 2.0
+    assert row["peak_rss_mb"] == 650
+
+
+def test_run_scene_stops_at_the_first_failing_stage(tmp_path, monkeypatch):
+    scripts = tmp_path / "scripts"
+    scripts.mkdir()
+    ran = tmp_path / "ran.txt"
+    for stage, rc in (("one", 0), ("two", 3), ("three", 0)):
+        (scripts / f"{stage}.py").write_text(
+            "import sys\n"
+            f"open({str(ran)!r}, 'a').write({stage!r} + ' ' + ' '.join(sys.argv[1:]) + '\\n')\n"
+            f"sys.exit({rc})\n"
+        )
+    monkeypatch.setattr(run_scenes, "SCRIPTS", scripts)
+    args = argparse.Namespace(
+        configs=str(tmp_path), default_mem_mb=10.0, headroom=1.0, overrides=["x=1"]
+    )
+    processed = tmp_path / "processed"
+    budget = MemoryBudget(100)
+    status = run_scenes.run_scene("s", ["one", "two", "three"], args, budget, processed)
+    assert status == dict(scene="s", status="failed", failed_stage="two")
+    lines = ran.read_text().splitlines()
+    assert [line.split()[0] for line in lines] == ["one", "two"]
+    assert lines[0].endswith(f"--config-path {tmp_path.resolve()} --config-name s x=1")
+    assert (processed / "logs" / "two.log").exists()
+    assert budget.used_mb == 0
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from traffic.classify.models import make_model
+from traffic.classify.search import (
+    FoldCache,
+    budget_schedule,
+    pareto_front,
+    successive_halving,
+)
+
+
+def test_make_model_overrides_defaults():
+    clf = make_model("knn", n_neighbors=3)
+    assert clf.n_neighbors == 3 and clf.weights == "distance"
+
+
+def test_budget_schedule_ends_at_full_budget():
+    rungs = budget_schedule(10_000, 50, eta=3, min_samples=300, max_folds=5, max_iter=500)
+    assert len(rungs) == 4
+    assert [r.n_samples for r in rungs] == sorted(r.n_samples for r in rungs)
+    assert rungs[-1].n_samples == 10_000 and rungs[-1].n_folds == 5 and rungs[-1].max_iter == 500
+    assert rungs[0].n_folds == 2
+
+
+def test_fold_cache_is_nested_and_reused():
+    y = np.repeat(np.arange(4), 100)
+    folds = FoldCache(y, seed=0)
+    small, big = folds.splits(100, 2), folds.splits(400, 5)
+    assert folds.splits(100, 2) is small
+    rows_small = np.sort(np.concatenate([te for _, te in small]))
+    rows_big = np.concatenate([te for _, te in big])
+    assert np.isin(rows_small, rows_big).all() and len(np.unique(rows_big)) == 400
+
+
+def test_pareto_front():
+    df = pd.DataFrame(
+        dict(
+            candidate=list("abcd"),
+            balanced_accuracy=[0.9, 0.8, 0.95, 0.85],
+            latency_us=[10.0, 5.0, 50.0, 20.0],
+        )
+    )
+    assert list(pareto_front(df)["candidate"]) == ["b", "a", "c"]
+
+
+def test_successive_halving_promotes_to_full_budget():
+    rng = np.random.default_rng(0)
+    y = rng.integers(0, 3, 900)
+    X_good = (y[:, None] + rng.normal(0, 0.3, (900, 2))).astype(np.float32)
+    X_noise = rng.normal(0, 1, (900, 2)).astype(np.float32)
+    space = {"knn": {"n_neighbors": [1, 5, 15]}, "dt": {"max_depth": [2, 8]}}
+    res = successive_halving(
+        {"good": X_good, "noise": X_noise}, y, kinds=["knn", "dt"], space=space, min_samples=100
+    )
+    h = res.history
+    assert h["rung"].max() >= 1 and (h.groupby("rung").size().diff().dropna() <= 0).all()
+    last = h[h["rung"] == h["rung"].max()]
+    assert (last["n_samples"] == 900).all() and (last["preset"] == "good").any()
+    assert res.front["balanced_accuracy"].max() > 0.8
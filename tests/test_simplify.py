@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from traffic.trajectories.flat import flatten_tracks
+from traffic.trajectories.simplify import douglas_peucker, resample
+
+
+def _trajs(n_tracks: int = 40, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+    for tid in range(n_tracks):
+        n = int(rng.integers(1, 200))
+        frame = np.cumsum(rng.integers(1, 3, n)) + int(rng.integers(0, 500))
+        heading = np.cumsum(rng.normal(0, 0.05, n))
+        x = np.cumsum(np.cos(heading)) + rng.normal(0, 0.05, n)
+        y = np.cumsum(np.sin(heading)) + rng.normal(0, 0.05, n)
+        rows.append(pd.DataFrame(dict(track_id=tid, frame=frame, x=x, y=y, vx=np.cos(heading))))
+    return pd.concat(rows, ignore_index=True).sample(frac=1.0, random_state=0)
+
+
+def _dp_reference(t, x, y, tol) -> set[int]:
+    """Recursive synchronized-distance Douglas-Peucker on one track."""
+    keep = {0, len(x) - 1}
+
+    def rec(a, b):
+        if b - a < 2:
+            return
+        u = (t[a + 1 : b] - t[a]) / (t[b] - t[a])
+        d = np.hypot(
+            x[a + 1 : b] - (x[a] + u * (x[b] - x[a])), y[a + 1 : b] - (y[a] + u * (y[b] - y[a]))
+        )
+        i = int(np.argmax(d))
+        if d[i] > tol:
+            keep.add(a + 1 + i)
+            rec(a, a + 1 + i)
+            rec(a + 1 + i, b)
+
+    rec(0, len(x) - 1)
+    return keep
+
+
+def _max_sed(orig: pd.DataFrame, simple: pd.DataFrame) -> float:
+    xi = np.interp(orig["frame"], simple["frame"], simple["x"])
+    yi = np.interp(orig["frame"], simple["frame"], simple["y"])
+    return float(np.hypot(orig["x"] - xi, orig["y"] - yi).max())
+
+
+def test_douglas_peucker_matches_recursive_reference_and_bounds_error():
+    df = _trajs()
+    flat = flatten_tracks(df, ("frame", "x", "y", "vx"))
+    out = douglas_peucker(flat, tol=0.2)
+    assert out.ratio < 0.7 and list(out.table.columns) == [
+        "track_id",
+        "frame",
+        "x",
+        "y",
+        "vx",
+        "max_err",
+    ]
+    for tid, g in out.table.groupby("track_id"):
+        tr = flat.track(tid)
+        kept = _dp_reference(tr["frame"].astype(float), tr["x"], tr["y"], 0.2)
+        np.testing.assert_array_equal(g["frame"], tr["frame"][sorted(kept)])
+        orig = pd.DataFrame(tr)
+        assert _max_sed(orig, g) <= g["max_err"].max() + 1e-12 <= 0.2 + 1e-12
+    perp = douglas_peucker(flat, 0.2, mode="perpendicular")
+    assert perp.table["max_err"].max() <= 0.2 and len(perp.table) < len(out.table)
+
+
+def test_resample_by_frame_and_distance():
+    df = _trajs(seed=1)
+    flat = flatten_tracks(df, ("frame", "x", "y"))
+    out = resample(flat, 4, by="frame")
+    for tid, g in out.table.groupby("track_id"):
+        tr = pd.DataFrame(flat.track(tid))
+        assert g["frame"].iloc[0] == tr["frame"].iloc[0]
+        assert g["frame"].iloc[-1] == tr["frame"].iloc[-1]
+        assert (np.diff(g["frame"].to_numpy())[:-1] == 4).all()
+        assert _max_sed(tr, g) <= g["max_err"].max() + 1e-9
+
+    by_dist = resample(flat, 0.5, by="distance").table
+    steps = by_dist.groupby("track_id").apply(
+        lambda g: np.hypot(np.diff(g["x"]), np.diff(g["y"])).max(initial=0.0)
+    )
+    assert (steps <= 0.5 + 1e-9).all()
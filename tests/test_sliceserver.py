@@ -0,0 +1,69 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic.io.sliceserver import SliceClient, SliceServer
+
+
+@pytest.fixture
+def scene(tmp_path):
+    rng = np.random.default_rng(0)
+    processed = tmp_path / "processed"
+    (processed / "trajectories").mkdir(parents=True)
+    n = 5000
+    trajs = pd.DataFrame(
+        dict(
+            track_id=np.repeat(np.arange(50), n // 50),
+            frame=np.tile(np.arange(n // 50), 50),
+            x=rng.random(n),
+            y=rng.random(n),
+        )
+    )
+    trajs.to_parquet(processed / "trajectories.parquet", index=False)
+    part = trajs.head(200).assign(track_id=lambda d: d["track_id"] + 1000)
+    part.to_parquet(processed / "trajectories" / "p1.parquet", index=False)
+    clusters = pd.DataFrame(dict(track_id=np.arange(50), cluster=np.arange(50) % 4))
+    clusters.to_parquet(processed / "clusters.parquet", index=False)
+
+    server = SliceServer(processed, tmp_path / "s.sock")
+    server.load()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not (tmp_path / "s.sock").exists():
+        time.sleep(0.01)
+    yield processed, pd.concat([trajs, part], ignore_index=True), clusters, server
+    server.shutdown()
+    thread.join()
+
+
+def test_projected_filtered_slices_match_pandas(scene):
+    processed, trajs, clusters, server = scene
+    client = SliceClient(server.path)
+    tables = client.tables()
+    assert tables["trajectories"]["rows"] == len(trajs) and "features" not in tables
+
+    got = client.frame("trajectories", ["track_id", "x"], [("frame", ">=", 90), ("x", "<", 0.5)])
+    want = trajs.loc[(trajs["frame"] >= 90) & (trajs["x"] < 0.5), ["track_id", "x"]]
+    pd.testing.assert_frame_equal(got, want.reset_index(drop=True))
+
+    got = client.scan("trajectories", ["track_id"], tracks=("clusters", [("cluster", "in", [1])]))
+    ids = clusters.loc[clusters["cluster"] == 1, "track_id"]
+    assert got.num_rows == trajs["track_id"].isin(ids).sum()
+    assert set(got["track_id"].to_pylist()) == set(ids)
+
+    either = [[("track_id", "==", 1000)], [("track_id", "==", 3)]]
+    assert client.scan("trajectories", filters=either, limit=150).num_rows == 150
+
+
+def test_errors_are_reported_and_rewritten_tables_reloaded(scene):
+    processed, _, clusters, server = scene
+    client = SliceClient(server.path)
+    with pytest.raises(RuntimeError, match="unknown table"):
+        client.scan("nope")
+    with pytest.raises(RuntimeError, match="zzz"):
+        client.scan("clusters", ["zzz"])
+    clusters.head(10).to_parquet(processed / "clusters.parquet", index=False)
+    assert client.scan("clusters").num_rows == 10
@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from traffic.detect.roi import points_in_polygon
+from traffic.io.serialization import read_parquet, write_parquet
+from traffic.trajectories.stindex import SegmentIndex, update_segment_index
+
+
+def _trajs(n_tracks: int, first_id: int = 0, seed: int = 0) -> pd.DataFrame:
+    """Straight-ish tracks with small steps, sorted by (track_id, frame)."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for tid in range(first_id, first_id + n_tracks):
+        n = int(rng.integers(1, 60))
+        f0 = int(rng.integers(0, 5000))
+        p = rng.uniform(0, 100, 2) + np.cumsum(rng.normal(0.8, 0.5, (n, 2)), axis=0)
+        rows.append(pd.DataFrame(dict(track_id=tid, frame=f0 + np.arange(n), x=p[:, 0], y=p[:, 1])))
+    return pd.concat(rows, ignore_index=True)
+
+
+def _brute(df: pd.DataFrame, polygon: np.ndarray, lo: int, hi: int) -> set[int]:
+    """Tracks with a point inside the polygon during the window (a subset of the answer)."""
+    inside = points_in_polygon(df["x"], df["y"], polygon) & df["frame"].between(lo, hi)
+    return set(df.loc[inside, "track_id"])
+
+
+POLY = np.array([[40.0, 40.0], [70.0, 45.0], [65.0, 80.0], [35.0, 70.0]])
+
+
+def test_query_matches_brute_force_and_prunes(tmp_path):
+    df = _trajs(400)
+    write_parquet(df, tmp_path / "trajectories.parquet")
+    index = update_segment_index(tmp_path, shape=(16, 16))
+    assert (
+        len(index)
+        == len(df) - df["track_id"].nunique() + (df.groupby("track_id").size() == 1).sum()
+    )
+
+    hits = index.query(POLY, frames=(1000, 3000))
+    found = set(hits["track_id"])
+    # every track with a sample inside is found; extra hits only cross the polygon between samples
+    assert _brute(df, POLY, 1000, 3000) <= found
+    assert index.last_scan["records"] < len(df) / 2
+
+    # slices hold the matching stretch of each track, read back from the parquet file
+    rows = index.read_slices(hits, columns=["track_id", "frame", "x", "y"])
+    assert set(rows["track_id"]) == found
+    assert rows["frame"].min() >= 1000 - 1 and rows["frame"].max() <= 3000 + 1
+    first = hits.iloc[0]
+    np.testing.assert_array_equal(
+        df.iloc[first.row_start : first.row_end]["frame"],
+        np.arange(first.frame_start, first.frame_end + 1),
+    )
+
+    # windows without data never touch a shard
+    assert index.query(POLY, frames=(10**7, 10**7 + 10)).empty
+    assert index.last_scan["shards"] == 0
+
+
+def test_index_is_incremental(tmp_path):
+    parts = tmp_path / "trajectories"
+    write_parquet(_trajs(100), parts / "p0.parquet")
+    index = update_segment_index(tmp_path, shape=(8, 8))
+    shard = tmp_path / "stindex" / f"{index.shards['trajectories/p0.parquet']['name']}.npy"
+    mtime = os.stat(shard).st_mtime_ns
+
+    write_parquet(_trajs(100, first_id=1000, seed=1), parts / "p1.parquet")
+    index = update_segment_index(tmp_path, shape=(8, 8))
+    assert sorted(index.shards) == ["trajectories/p0.parquet", "trajectories/p1.parquet"]
+    assert os.stat(shard).st_mtime_ns == mtime  # p0 was not re-read
+
+    both = pd.concat([read_parquet(p) for p in sorted(parts.glob("*.parquet"))])
+    found = set(SegmentIndex(tmp_path / "stindex").query(POLY)["track_id"])
+    assert _brute(both, POLY, 0, 10**9) <= found
+    assert any(t >= 1000 for t in found) and any(t < 1000 for t in found)
+
+    (parts / "p0.parquet").unlink()
+    index = update_segment_index(tmp_path, shape=(8, 8))
+    assert list(index.shards) == ["trajectories/p1.parquet"] and not shard.exists()
+    assert all(t >= 1000 for t in index.query(POLY)["track_id"])
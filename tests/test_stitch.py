@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from traffic.io.tracks_store import encode_tracks
+from traffic.synth.intersection import IntersectionSpec, generate_intersection
+from traffic.track.stitch import StitchParams, rewrite_ids, stitch_links
+
+
+def _track(tid, frames, x0, vx, y0=100.0, vy=0.0):
+    frames = np.asarray(frames)
+    return pd.DataFrame(
+        dict(
+            frame=frames,
+            track_id=tid,
+            cls=2,
+            conf=0.9,
+            cx=x0 + vx * (frames - frames[0]),
+            cy=y0 + vy * (frames - frames[0]),
+            w=40.0,
+            h=40.0,
+        )
+    )
+
+
+def test_chain_of_fragments_and_rewrite():
+    # one car broken into three ids, plus a car leaving next to one entering (opposite way)
+    df = pd.concat(
+        [
+            _track(5, range(0, 20), 0, 10),
+            _track(9, range(25, 40), 250, 10),
+            _track(2, range(45, 60), 450, 10),
+            _track(7, range(0, 20), 900, 10, y0=300),
+            _track(8, range(22, 40), 1100, -10, y0=300),
+        ]
+    )
+    ct = encode_tracks(df)
+    links = stitch_links(ct, StitchParams(max_gap=10)).set_index("track_id")
+    assert links.loc[[2, 5, 9], "stitched_id"].tolist() == [5, 5, 5]
+    assert links.loc[9, "linked_from"] == 5 and links.loc[2, "linked_from"] == 9
+    assert links.loc[8, "stitched_id"] == 8 and links.loc[8, "linked_from"] == -1
+
+    out = rewrite_ids(ct, links.loc[ct.track_ids, "stitched_id"].to_numpy())
+    assert out.track_ids.tolist() == [5, 7, 8]
+    back = out.to_frame()
+    car = back[back["track_id"] == 5]
+    assert car["frame"].tolist() == [*range(0, 20), *range(25, 40), *range(45, 60)]
+    np.testing.assert_allclose(car["cx"].iloc[20], 250.0)
+
+
+def test_recovers_synthetic_id_breaks():
+    df, truth = generate_intersection(IntersectionSpec(id_break_prob=0.2), n_tracks=600, seed=3)
+    links = stitch_links(encode_tracks(df))
+    vehicle = truth.set_index("track_id")["vehicle"]
+    linked = links[links["linked_from"] >= 0]
+    correct = vehicle[linked["track_id"]].to_numpy() == vehicle[linked["linked_from"]].to_numpy()
+    n_breaks = len(truth) - truth["vehicle"].nunique()
+    assert correct.mean() > 0.97
+    assert correct.sum() > 0.95 * n_breaks
@@ -0,0 +1,22 @@
+import numpy as np
+
+from traffic.synth.intersection import IntersectionSpec, generate_intersection
+
+
+def test_generator_layout_and_determinism():
+    spec = IntersectionSpec(id_break_prob=0.3, outlier_frac=0.1, normalized=True)
+    df, truth = generate_intersection(spec, n_tracks=200, seed=7)
+    df2, _ = generate_intersection(spec, n_tracks=200, seed=7)
+
+    assert list(df.columns) == ["frame", "track_id", "cls", "conf", "cx", "cy", "w", "h"]
+    assert df.equals(df2)
+    assert df["cx"].between(0, 1).all() and df["cy"].between(0, 1).all()
+    # frames are unique within a track and the table is frame ordered like run_track output
+    assert not df.duplicated(["track_id", "frame"]).any()
+    assert np.all(np.diff(df["frame"].to_numpy()) >= 0)
+
+    assert set(truth["track_id"]) == set(df["track_id"])
+    assert truth["vehicle"].nunique() == 200
+    # ID breaks produce extra fragments that point back to the same vehicle
+    assert len(truth) > 200
+    assert truth.loc[truth["is_outlier"], "movement"].eq("outlier").all()
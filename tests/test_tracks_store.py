@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from traffic.io.tracks_store import load_tracks, read_tracks, write_tracks
+
+
+def _detections() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = []
+    for tid in (7, 3, 12):
+        frames = np.sort(rng.choice(np.arange(100, 200), size=20, replace=False))
+        rows.append(
+            pd.DataFrame(
+                dict(
+                    frame=frames,
+                    track_id=tid,
+                    cls=rng.choice([2, 7, 5], size=20),
+                    conf=rng.uniform(0.01, 1, 20),
+                    cx=rng.uniform(0, 1920, 20),
+                    cy=rng.uniform(0, 1080, 20),
+                    w=rng.uniform(10, 200, 20),
+                    h=rng.uniform(10, 200, 20),
+                )
+            )
+        )
+    return pd.concat(rows).sample(frac=1.0, random_state=0)
+
+
+@pytest.mark.parametrize("coords,tol", [("float32", 1e-3), ("fixed", 0.02)])
+def test_roundtrip(tmp_path, coords, tol):
+    df = _detections()
+    path = tmp_path / "tracks.parquet"
+    write_tracks(df, path, coords=coords)
+    back = read_tracks(path)
+    ref = df.sort_values(["track_id", "frame"]).reset_index(drop=True)
+    assert list(back.columns) == ["frame", "track_id", "cls", "conf", "cx", "cy", "w", "h"]
+    for c in ("frame", "track_id", "cls"):
+        np.testing.assert_array_equal(back[c], ref[c])
+    for c in ("conf", "cx", "cy", "w", "h"):
+        np.testing.assert_allclose(back[c], ref[c], atol=tol)
+
+    ct = load_tracks(path)
+    np.testing.assert_array_equal(ct.track_ids, [3, 7, 12])
+    np.testing.assert_array_equal(ct.frame0, ref.groupby("track_id")["frame"].min())
+    assert ct.raw["cls_code"].dtype == np.uint8 and ct.raw["cx"].base is not None
+
+
+def test_plain_layout_still_reads(tmp_path):
+    df = _detections()
+    df.to_parquet(tmp_path / "tracks.parquet", index=False)
+    pd.testing.assert_frame_equal(
+        read_tracks(tmp_path / "tracks.parquet"), df.reset_index(drop=True)
+    )
+    assert len(load_tracks(tmp_path / "tracks.parquet")) == len(df)
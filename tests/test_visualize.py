@@ -0,0 +1,166 @@
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+import visualize  # noqa: E402
+from visualize import (  # noqa: E402
+    HeadlessRenderer,
+    draw_annotations,
+    draw_annotations_batched,
+)
+
+sys.path.pop(0)
+
+COLORS = [(0, 255, 0), None, (255, 0, 0)]
+
+
+class _Writer:
+    """cv2.VideoWriter stand-in: keeps the first pixel of every written frame."""
+
+    instances: list = []
+
+    def __init__(self, path, fourcc, fps, size, gate=None, fail=False):
+        self.frames, self.size, self.released = [], size, False
+        self.gate, self.fail = gate, fail
+        _Writer.instances.append(self)
+
+    def isOpened(self):
+        return True
+
+    def write(self, img):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise ValueError("encoder broke")
+        self.frames.append(int(img[0, 0, 0]))
+
+    def release(self):
+        self.released = True
+
+
+class _Ref:
+    """Stands in for a held FrameRing slot."""
+
+    def __init__(self, i: int):
+        self.array = _frame(i)
+        self.array.flags.writeable = False
+        self.released = 0
+
+    def release(self):
+        self.released += 1
+
+
+def _frame(i: int) -> np.ndarray:
+    img = np.zeros((40, 64, 3), np.uint8)
+    img[0, 0, 0] = i
+    return img
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    opts = {}
+    _Writer.instances = []
+    monkeypatch.setattr(visualize.cv2, "VideoWriter", lambda *a: _Writer(*a, **opts), raising=True)
+    return opts
+
+
+def test_every_n_writes_the_due_frames(tmp_path, writer):
+    r = HeadlessRenderer(tmp_path / "out.mp4", COLORS, fps=30, every=3)
+    queued = [r.submit(i, _frame(i), [(2, 2, 9, 9, 0, 0.9, 1)]) for i in range(10)]
+    r.close()
+    (w,) = _Writer.instances
+    assert w.frames == [0, 3, 6, 9] and w.released
+    assert queued == [i % 3 == 0 for i in range(10)]
+    assert r.written == r.submitted == 4 and r.fps == 10
+
+
+def test_drop_if_full_counts_drops_without_blocking(tmp_path, writer):
+    gate = threading.Event()
+    writer["gate"] = gate
+    r = HeadlessRenderer(tmp_path / "out.mp4", COLORS, queue_size=1, drop_if_full=True)
+    t0 = time.perf_counter()
+    queued = [r.submit(i, _frame(i), []) for i in range(20)]
+    assert time.perf_counter() - t0 < 1.0
+    assert r.dropped > 0 and r.dropped == queued.count(False)
+    gate.set()
+    r.close()
+    assert r.written + r.dropped == r.submitted == 20
+    assert _Writer.instances[0].frames == [i for i, q in enumerate(queued) if q]
+
+
+def test_frame_refs_are_released_on_skip_drop_and_error(tmp_path, writer):
+    gate = threading.Event()
+    writer.update(gate=gate)
+    r = HeadlessRenderer(tmp_path / "out.mp4", COLORS, every=2, queue_size=1, drop_if_full=True)
+    refs = [_Ref(i) for i in range(8)]
+    queued = [r.submit(i, ref, []) for i, ref in enumerate(refs)]
+    skipped = [ref for i, ref in enumerate(refs) if i % 2]
+    dropped = [ref for i, ref in enumerate(refs) if not i % 2 and not queued[i]]
+    assert skipped and dropped and all(ref.released == 1 for ref in skipped + dropped)
+    gate.set()
+    r.close()
+    assert all(ref.released == 1 for ref in refs)  # rendered ones after the copy
+    assert _Writer.instances[0].frames == [i for i, q in enumerate(queued) if q]
+
+    # the encoder fails: queued refs are handed back, later submits release and raise
+    gate.clear()
+    writer.update(fail=True)
+    r = HeadlessRenderer(tmp_path / "out.mp4", COLORS, queue_size=4)
+    refs = [_Ref(i) for i in range(4)]
+    for i, ref in enumerate(refs):
+        r.submit(i, ref, [])
+    gate.set()
+    r._thread.join(5)
+    late = _Ref(9)
+    with pytest.raises(RuntimeError):
+        r.submit(9, late, [])
+    with pytest.raises(RuntimeError):
+        r.close()
+    assert all(ref.released == 1 for ref in [*refs, late])
+
+
+def test_batched_drawing_matches_the_preview():
+    annos = [
+        (10.4, 30.7, 60.2, 80.9, 0, 0.91, 3),
+        (90, 60, 150, 110, 2, 0.5, None),
+        (100, 20, 150, 40, 7, 0.33, -1),  # no colour for class 7: grey
+    ]
+    names = ["car", "van", "bus"]
+    a = np.zeros((120, 160, 3), np.uint8)
+    b = a.copy()
+    draw_annotations(a, annos, COLORS, class_names=names)
+    draw_annotations_batched(b, annos, COLORS, class_names=names, conf_decimals=2)
+
+    text = np.zeros(a.shape[:2], bool)
+    for x1, y1, _, _, cls, conf, tid in annos:
+        txt = visualize.label_text(names[cls] if cls < len(names) else str(cls), conf, tid, 2)
+        (w, h), base = cv2.getTextSize(txt, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        x, y = int(x1), max(15, int(y1) - 5)
+        text[y - h - 1 : y + base + 2, x - 1 : x + w + 2] = True
+    # boxes: identical pixels
+    np.testing.assert_array_equal(a[~text], b[~text])
+    # labels: the cached sprites cover every full-strength anti-aliased pixel and nothing
+    # outside the anti-aliased glyphs
+    ink_a, ink_b = a.any(axis=2), b.any(axis=2)
+    full_a = np.zeros_like(ink_a)
+    for col in [(0, 255, 0), (255, 0, 0), (200, 200, 200)]:
+        full_a |= (a == col).all(axis=2)
+    assert not (ink_b & ~ink_a).any()
+    assert not (full_a & ~ink_b).any()
+    assert (ink_b & text).sum() > 50
+
+
+def test_unopenable_writer_fails_instead_of_counting_frames(tmp_path):
+    renderer = HeadlessRenderer(tmp_path / "out.unknown", [(0, 255, 0)], fourcc="ABCD")
+    renderer.submit(0, np.zeros((24, 32, 3), np.uint8), [])
+    with pytest.raises(RuntimeError) as err:
+        renderer.close()
+    assert isinstance(err.value.__cause__, OSError) and renderer.written == 0
+    with pytest.raises(RuntimeError):
+        renderer.submit(1, np.zeros((24, 32, 3), np.uint8), [])
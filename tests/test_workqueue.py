@@ -0,0 +1,64 @@
+import json
+import multiprocessing as mp
+import time
+from pathlib import Path
+
+from traffic.utils.workqueue import WorkQueue, run_worker
+
+
+def _process(item: str, payload: dict, scratch: Path) -> dict:
+    time.sleep(0.01)
+    (scratch / "out.json").write_text(json.dumps(payload))
+    return dict(n=payload["n"])
+
+
+def _worker(root: str, name: str) -> int:
+    return run_worker(WorkQueue(root, ttl=5.0), _process, worker=name, log=lambda m: None)
+
+
+def test_workers_share_the_queue_and_every_item_runs_once(tmp_path):
+    q = WorkQueue(tmp_path)
+    ids = [q.enqueue(f"/videos/cam{i}.mp4", dict(n=i)) for i in range(24)]
+    assert q.enqueue("/videos/cam0.mp4", dict(n=99)) == ids[0]  # re-enqueue is a no-op
+    with mp.get_context("spawn").Pool(3) as pool:
+        counts = pool.starmap(_worker, [(str(tmp_path), f"w{i}") for i in range(3)])
+    assert sum(counts) == 24
+    st = q.status()
+    assert st["done"] == 24 and st["pending"] == 0 and st["running"] == 0
+    assert st["per_hour"] > 0 and not list((tmp_path / "work").iterdir())
+    for i, item in enumerate(ids):
+        assert json.loads((tmp_path / "out" / item / "out.json").read_text())["n"] == i
+
+
+def test_expired_lease_is_taken_over_and_outputs_stay_unique(tmp_path):
+    q = WorkQueue(tmp_path, ttl=0.2)
+    q.enqueue("a.mp4", dict(n=1))
+    crashed = q.claim("crashed")
+    crashed.scratch.mkdir()
+    (crashed.scratch / "out.json").write_text("stale")
+    assert q.claim("other") is None  # still leased
+    assert q.status()["running"] == 1
+
+    time.sleep(0.3)
+    assert q.status()["expired"] == [crashed.item]
+    assert run_worker(q, _process, worker="other", log=lambda m: None) == 1
+    assert not q.renew(crashed)
+    # the crashed worker comes back and finishes late: its outputs are discarded
+    assert not q.complete(crashed)
+    assert json.loads((tmp_path / "out" / crashed.item / "out.json").read_text())["n"] == 1
+    assert json.loads((tmp_path / "done" / f"{crashed.item}.json").read_text())["worker"] == "other"
+
+
+def test_failures_are_retried_up_to_max_attempts(tmp_path):
+    q = WorkQueue(tmp_path, max_attempts=2)
+    item = q.enqueue("bad.mp4", dict(n=0))
+    calls = []
+
+    def boom(item, payload, scratch):
+        calls.append(item)
+        raise RuntimeError("decoder error")
+
+    assert run_worker(q, boom, log=lambda m: None) == 2
+    st = q.status()
+    assert calls == [item, item] and st["gave_up"] == [item] and st["pending"] == 0
+    assert "decoder error" in (tmp_path / "failed" / f"{item}.json").read_text()